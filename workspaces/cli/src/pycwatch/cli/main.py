@@ -1,6 +1,9 @@
 """Main CLI entrypoint."""
 
+import asyncio
+import contextlib
 from importlib.metadata import version
+from pathlib import Path
 from typing import Annotated, Optional
 
 import typer
@@ -11,6 +14,10 @@ from pycwatch.cli.markets import app as markets_app
 from pycwatch.cli.pairs import app as pairs_app
 from pycwatch.cli.utils import FormatOption, OutputFormat, echo, get_client
 from pycwatch.lib import CryptoWatchClient
+from pycwatch.lib.disk_cache import DiskCache
+from pycwatch.lib.endpoints import BASE_URL
+from pycwatch.lib.proxy import DEFAULT_PORT, CryptoWatchProxy
+from pycwatch.lib.ratelimit import AllowanceLimiter
 
 app = typer.Typer(name="PyCwatch CLI")
 app.add_typer(assets_app)
@@ -34,6 +41,23 @@ def info(ctx: typer.Context, style: FormatOption = OutputFormat.RECORDS) -> None
     echo(response.result, style)
 
 
+@app.command(name="serve-proxy")
+def serve_proxy(
+    host: Annotated[str, typer.Option(help="The interface to listen on")] = "127.0.0.1",
+    port: Annotated[int, typer.Option(help="The port to listen on")] = DEFAULT_PORT,
+    budget: Annotated[
+        Optional[float],
+        typer.Option(help="Credits to spend per day, by default all that remain"),
+    ] = None,
+    upstream: Annotated[str, typer.Option(help="The URL of the API")] = BASE_URL,
+) -> None:
+    """Serve the API to local clients through a caching proxy."""
+    proxy = CryptoWatchProxy(upstream, rate_limiter=AllowanceLimiter(budget=budget))
+    typer.echo(f"Serving {upstream} on http://{host}:{port}")
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(proxy.serve_forever(host, port))
+
+
 @app.callback()
 def main(
     ctx: typer.Context,
@@ -41,6 +65,15 @@ def main(
         Optional[bool],
         typer.Option("--version", callback=version_callback, is_eager=True),
     ] = None,
+    cache_dir: Annotated[
+        Optional[Path],
+        typer.Option(
+            "--cache-dir",
+            envvar="PYCW_CACHE_DIR",
+            help="Directory in which responses are cached between invocations",
+        ),
+    ] = None,
 ) -> None:
     """PyCwatch CLI."""
-    ctx.meta["client"] = CryptoWatchClient()
+    disk_cache = None if cache_dir is None else DiskCache(cache_dir)
+    ctx.meta["client"] = CryptoWatchClient(disk_cache=disk_cache)
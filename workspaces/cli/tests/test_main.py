@@ -1,3 +1,5 @@
+from pathlib import Path
+
 import pytest
 from typer.testing import CliRunner
 
@@ -15,3 +17,14 @@ def test_version(runner: CliRunner) -> None:
     """Verify that the version flag works."""
     result = runner.invoke(app, ["--version"])
     assert result.exit_code == 0
+
+
+def test_cache_dir(runner: CliRunner, tmp_path: Path) -> None:
+    """Verify that responses are cached in the cache directory."""
+    args = ["--cache-dir", str(tmp_path), "exchanges", "list", "-f", "json"]
+    first = runner.invoke(app, args)
+    second = runner.invoke(app, args)
+
+    assert first.exit_code == second.exit_code == 0
+    assert first.stdout == second.stdout
+    assert list(tmp_path.glob("*/*"))
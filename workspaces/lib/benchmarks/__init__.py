@@ -0,0 +1 @@
+"""Benchmarks and load tests, run as modules from ``workspaces/lib``."""
@@ -0,0 +1,52 @@
+"""Compare catalog lookups and snapshots with scanning the recorded lists.
+
+Run from ``workspaces/lib`` with ``python -m benchmarks.bench_catalog``.
+"""
+
+import tempfile
+from pathlib import Path
+from typing import Any, List
+
+from benchmarks.replay import best_time, load_data
+from pycwatch.lib.catalog import Catalog
+from pycwatch.lib.conversion import converter
+from pycwatch.lib.models import MarketMember
+
+
+def load_markets() -> List[MarketMember]:
+    """Load the recorded market list."""
+    data = load_data("list_markets")
+    return converter.structure(data["result"], List[MarketMember])
+
+
+def scan(markets: List[MarketMember]) -> Any:
+    """Find a market and the markets of an exchange by scanning the list."""
+    market = next(m for m in markets if m.exchange == "kraken" and m.pair == "btceur")
+    return market, [m for m in markets if m.exchange == "kraken"]
+
+
+def lookup(catalog: Catalog) -> Any:
+    """Find a market and the markets of an exchange in the catalog."""
+    return catalog.market("kraken", "btceur"), catalog.find_markets("kraken")
+
+
+def main() -> None:
+    """Print the time of lookups and of saving and loading a snapshot."""
+    markets = load_markets()
+    catalog = Catalog(markets=markets)
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "catalog.json.gz"
+        save = best_time(lambda: catalog.save(path), number=1)
+        load = best_time(lambda: Catalog.load(path), number=1)
+        size = path.stat().st_size
+    print(f"{len(markets)} markets")
+    print(f"scan the list:       {best_time(lambda: scan(markets), number=10):8.3f} ms")
+    print(
+        f"look up the catalog: {best_time(lambda: lookup(catalog), number=10):8.3f} ms"
+    )
+    print(f"save a snapshot:     {save:8.3f} ms, {size / 1024:.0f} KiB")
+    print(f"load a snapshot:     {load:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Benchmark the JSON decoders on the bodies of the recorded cassettes.
+
+Run from ``workspaces/lib`` with ``python -m benchmarks.bench_decoding``.
+"""
+
+import argparse
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import ujson
+
+from benchmarks.replay import CASSETTE_DIR, best_time, read_cassette
+from pycwatch.lib.decoding import DECODERS
+
+
+def load_bodies(cassette_dir: Path) -> List[Tuple[str, bytes]]:
+    """Load the largest response body of every cassette."""
+    bodies = []
+    for path in sorted(cassette_dir.glob("*.yml")):
+        contents = [body for _, _, body in read_cassette(path)]
+        if contents:
+            bodies.append((path.stem, max(contents, key=len)))
+    return bodies
+
+
+def ujson_text(content: bytes) -> object:
+    """Decode like the previous response handler, via text."""
+    return ujson.loads(content.decode())
+
+
+def time_decoder(func: Callable[[bytes], object], content: bytes, repeat: int) -> float:
+    """Time decoding a body, in milliseconds, over about 2 MB per run."""
+    number = max(1, 2_000_000 // max(len(content), 1))
+    return best_time(lambda: func(content), repeat, number)
+
+
+def main() -> None:
+    """Print a table of decode times per cassette."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--cassettes", type=Path, default=CASSETTE_DIR)
+    args = parser.parse_args()
+
+    decoders: Dict[str, Callable[[bytes], object]] = {"ujson (text)": ujson_text}
+    decoders.update(DECODERS)
+    header = f"{'cassette':<32}{'size':>10}" + "".join(
+        f"{name:>14}" for name in decoders
+    )
+    print(header)
+    print("-" * len(header))
+    for name, content in load_bodies(args.cassettes):
+        times = [time_decoder(func, content, args.repeat) for func in decoders.values()]
+        print(
+            f"{name:<32}{len(content):>10}"
+            + "".join(f"{time:>11.3f} ms" for time in times),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Compare the numeric backends and the JSON decoders on recorded responses.
+
+Run from ``workspaces/lib`` with ``python -m benchmarks.bench_numeric``.
+"""
+
+from typing import Any, Dict, Type
+
+from benchmarks.replay import best_time, load_body, load_data
+from pycwatch.lib.conversion import NumericBackend, converter, get_converter
+from pycwatch.lib.decoding import DECODERS, Decoder
+from pycwatch.lib.models import AllSummaries, MarketTradeList, OrderBook, Response
+
+CASES: Dict[str, Type[Any]] = {
+    "get_market_order_book": Response[OrderBook],
+    "get_market_trades": Response[MarketTradeList],
+    "get_all_market_summaries": Response[AllSummaries],
+}
+
+
+def time_backend(data: Any, response_cls: Type[Any], backend: NumericBackend) -> float:
+    """Time structuring a response with a numeric backend."""
+    backend_converter = get_converter(backend)
+    return best_time(lambda: backend_converter.structure(data, response_cls))
+
+
+def time_decoder(body: bytes, response_cls: Type[Any], decoder: Decoder) -> float:
+    """Time decoding and structuring a response into decimals."""
+    return best_time(lambda: converter.structure(decoder(body), response_cls))
+
+
+def main() -> None:
+    """Print the time to structure each response with each backend and decoder."""
+    print(f"{'response':<28}" + "".join(f"{b.value:>12}" for b in NumericBackend))
+    for name, response_cls in CASES.items():
+        data = load_data(name)
+        times = [time_backend(data, response_cls, b) for b in NumericBackend]
+        print(f"{name:<28}" + "".join(f"{t:>9.2f} ms" for t in times))
+    print()
+    print(f"{'decimal, decoded with':<28}" + "".join(f"{d:>12}" for d in DECODERS))
+    for name, response_cls in CASES.items():
+        body = load_body(name)
+        times = [time_decoder(body, response_cls, d) for d in DECODERS.values()]
+        print(f"{name:<28}" + "".join(f"{t:>9.2f} ms" for t in times))
+
+
+if __name__ == "__main__":
+    main()
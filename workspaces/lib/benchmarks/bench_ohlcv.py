@@ -0,0 +1,82 @@
+"""Compare structuring a year of one minute candles into models and arrays.
+
+Run from ``workspaces/lib`` with ``python -m benchmarks.bench_ohlcv``.
+"""
+
+import random
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+from benchmarks.replay import best_time
+from pycwatch.lib.arrays import ohlcv_arrays
+from pycwatch.lib.conversion import NumericBackend, get_converter
+from pycwatch.lib.decoding import get_decoder
+from pycwatch.lib.models import OHLCVDict
+
+MINUTES_PER_YEAR = 365 * 24 * 60
+
+
+def make_result(count: int = MINUTES_PER_YEAR) -> Dict[str, List[List[Any]]]:
+    """Create a decoded result of one minute candles with a random walk."""
+    random.seed(0)
+    rows = []
+    price = 26000.0
+    for index in range(count):
+        close = round(price * (1 + random.gauss(0, 0.001)), 2)
+        high = round(max(price, close) * 1.0005, 2)
+        low = round(min(price, close) * 0.9995, 2)
+        volume = round(random.random() * 10, 8)  # noqa: S311
+        rows.append(
+            [1660000000 + index * 60, price, high, low, close, volume, close * volume],
+        )
+        price = close
+    body = f'{{"60": {rows}}}'.encode()
+    return get_decoder()(body)  # type: ignore[no-any-return]
+
+
+def measure(func: Callable[[], Any], number: int = 3) -> Tuple[float, float]:
+    """Get the fastest run in milliseconds and the peak memory in MiB."""
+    elapsed = best_time(func, repeat=number)
+    tracemalloc.start()
+    result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, peak / 2**20
+
+
+def structure_models(
+    result: Dict[str, List[List[Any]]],
+    backend: NumericBackend,
+) -> Callable[[], Any]:
+    """Create a function that structures the candles into models."""
+    converter = get_converter(backend)
+    return lambda: converter.structure(result, OHLCVDict)
+
+
+def structure_arrays(
+    result: Dict[str, List[List[Any]]],
+    backend: NumericBackend,
+) -> Callable[[], Any]:
+    """Create a function that converts the candles into arrays."""
+    return lambda: ohlcv_arrays(result, backend)
+
+
+def main() -> None:
+    """Print the time and peak memory of each way to hold the candles."""
+    result = make_result()
+    cases = (
+        ("models, decimal", structure_models(result, NumericBackend.DECIMAL)),
+        ("models, float", structure_models(result, NumericBackend.FLOAT)),
+        ("arrays, float", structure_arrays(result, NumericBackend.FLOAT)),
+        ("arrays, fixed", structure_arrays(result, NumericBackend.FIXED)),
+    )
+    print(f"{len(result['60'])} candles")
+    print(f"{'path':<20}{'time':>14}{'peak memory':>16}")
+    for name, func in cases:
+        elapsed, peak = measure(func)
+        print(f"{name:<20}{elapsed:>11.1f} ms{peak:>12.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Compare depth queries on order book models and on the columnar order book.
+
+Run from ``workspaces/lib`` with ``python -m benchmarks.bench_orderbook``.
+"""
+
+from decimal import Decimal
+from typing import Any, List, Tuple
+
+from benchmarks.replay import CASSETTE_DIR, best_time, read_cassette
+from pycwatch.lib.conversion import converter
+from pycwatch.lib.decoding import get_decoder
+from pycwatch.lib.models import OrderBook, OrderBookItem
+from pycwatch.lib.orderbook import ColumnarOrderBook, calculate_liquidities
+
+AMOUNTS = [0.1, 1, 5, 10, 25]
+
+
+def load_books() -> List[Tuple[str, Any]]:
+    """Load the decoded order books of the cassette."""
+    books = []
+    for uri, _, body in read_cassette(CASSETTE_DIR / "get_market_order_book.yml"):
+        data = get_decoder()(body)
+        if "result" in data:
+            books.append((uri.split("/")[-2], data["result"]))
+    return books
+
+
+def vwap_loop(levels: List[OrderBookItem], amount: Decimal) -> Decimal:
+    """Walk the levels until an amount is filled."""
+    remaining, cost = amount, Decimal(0)
+    for level in levels:
+        filled = min(remaining, level.amount)
+        cost += filled * level.price
+        remaining -= filled
+        if not remaining:
+            break
+    return cost / amount
+
+
+def query_models(book: OrderBook) -> Any:
+    """Compute the spread, cumulative depth and fill prices with loops."""
+    spread = book.asks[0].price - book.bids[0].price
+    depth, total = [], Decimal(0)
+    for level in book.asks:
+        total += level.amount
+        depth.append(total)
+    vwaps = [vwap_loop(book.asks, Decimal(str(amount))) for amount in AMOUNTS]
+    return spread, depth, vwaps
+
+
+def query_columns(book: ColumnarOrderBook) -> Any:
+    """Compute the spread, cumulative depth and fill prices with NumPy."""
+    return book.spread, book.cumulative_depth("ask"), book.vwap("ask", AMOUNTS)
+
+
+def time_paths(result: Any) -> Tuple[float, float, float, float]:
+    """Time building each representation and querying it."""
+    model = converter.structure(result, OrderBook)
+    columns = ColumnarOrderBook.from_result(result)
+    return (
+        best_time(lambda: converter.structure(result, OrderBook), number=20),
+        best_time(lambda: query_models(model), number=20),
+        best_time(lambda: ColumnarOrderBook.from_result(result), number=20),
+        best_time(lambda: query_columns(columns), number=20),
+    )
+
+
+def main() -> None:
+    """Print the time to build and query each book."""
+    print(
+        f"{'market':<10}{'levels':>8}{'model':>12}{'query':>12}"
+        f"{'columnar':>12}{'query':>12}",
+    )
+    for market, result in load_books():
+        levels = len(result["asks"]) + len(result["bids"])
+        times = time_paths(result)
+        print(f"{market:<10}{levels:>8}" + "".join(f"{t:>9.3f} ms" for t in times))
+    books = {
+        market: ColumnarOrderBook.from_result(result) for market, result in load_books()
+    }
+    batch = best_time(lambda: calculate_liquidities(books), number=20)
+    print(f"liquidity of all books in one batch: {batch:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Compare request throughput of the default and a sized connection pool.
+
+The replay server answers every price request after a short delay, over
+keep-alive connections. The server speaks plain HTTP, so each new connection
+costs less than one to the API, which also needs a TLS handshake. Run from
+``workspaces/lib`` with ``python -m benchmarks.bench_pool``.
+"""
+
+import threading
+import time
+from typing import Optional, Tuple
+
+from benchmarks.replay import ReplayConfig, ReplayServer
+from pycwatch.lib import CryptoWatchClient
+
+LATENCY = 0.02
+REQUESTS = 600
+CONCURRENCY = [1, 4, 16, 64]
+
+
+def run(
+    server: ReplayServer,
+    concurrency: int,
+    pool_maxsize: Optional[int],
+) -> Tuple[float, int]:
+    """Send the requests and get the requests per second and connections opened."""
+    options = {} if pool_maxsize is None else {"pool_maxsize": pool_maxsize}
+    client = CryptoWatchClient(
+        base_url=server.url,
+        coalesce_requests=False,
+        **options,  # type: ignore[arg-type]
+    )
+    if pool_maxsize is not None:
+        client.prewarm(pool_maxsize)
+    server.connections.clear()
+    markets = [("kraken", "btceur")] * REQUESTS
+    started = time.perf_counter()
+    # map grows the pool to the number of workers, so send from plain threads
+    # to measure the default pool as it is
+    chunks = [markets[i::concurrency] for i in range(concurrency)]
+    threads = [
+        threading.Thread(
+            target=lambda chunk=chunk: [client.get_market_price(*m) for m in chunk],
+        )
+        for chunk in chunks
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    client.get_session().close()
+    return REQUESTS / elapsed, len(server.connections)
+
+
+def main() -> None:
+    """Print the requests per second and connections by concurrency."""
+    server = ReplayServer(ReplayConfig(latency=LATENCY))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"{'threads':>8}{'default pool':>24}{'sized, pre-warmed pool':>30}")
+    for concurrency in CONCURRENCY:
+        default = run(server, concurrency, None)
+        sized = run(server, concurrency, concurrency)
+        print(
+            f"{concurrency:>8}"
+            f"{default[0]:>10.0f} req/s {default[1]:>4} conn"
+            f"{sized[0]:>16.0f} req/s {sized[1]:>4} conn",
+        )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Compare success rate and latency with and without retries and hedging.
+
+The replay server answers most price requests quickly, some of them only
+after a long stall, and fails others with a 503. Run from ``workspaces/lib``
+with ``python -m benchmarks.bench_resilience``.
+"""
+
+import statistics
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from apiclient.exceptions import APIRequestError
+
+from benchmarks.replay import ReplayConfig, ReplayServer
+from pycwatch.lib import CryptoWatchClient
+from pycwatch.lib.resilience import HedgePolicy, RetryPolicy
+
+LATENCY = 0.005
+STALL = 0.25
+STALL_RATE = 0.02
+ERROR_RATE = 0.05
+REQUESTS = 1000
+
+
+def run(
+    server: ReplayServer,
+    retry: Optional[RetryPolicy],
+    hedge: Optional[HedgePolicy],
+) -> Tuple[float, List[float], int]:
+    """Send the requests and get the success rate, latencies and requests sent."""
+    client = CryptoWatchClient(
+        base_url=server.url,
+        retry=retry,
+        hedge=hedge,
+        coalesce_requests=False,
+    )
+    server.rng.seed(0)
+    server.requests.clear()
+    latencies = []
+    succeeded = 0
+    for _ in range(REQUESTS):
+        started = time.perf_counter()
+        try:
+            client.get_market_price("kraken", "btceur")
+        except APIRequestError:
+            pass
+        else:
+            succeeded += 1
+        latencies.append(time.perf_counter() - started)
+    client.get_session().close()
+    return succeeded / REQUESTS, latencies, len(server.requests)
+
+
+def main() -> None:
+    """Print the success rate and latency quantiles of each policy."""
+    config = ReplayConfig(
+        latency=LATENCY,
+        error_rate=ERROR_RATE,
+        stall=STALL,
+        stall_rate=STALL_RATE,
+    )
+    server = ReplayServer(config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    policies: Dict[str, Tuple[Optional[RetryPolicy], Optional[HedgePolicy]]] = {
+        "none": (None, None),
+        "retry": (RetryPolicy(backoff=0.01), None),
+        "retry + hedge": (RetryPolicy(backoff=0.01), HedgePolicy()),
+    }
+    print(f"{'policy':>14}{'success':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'sent':>7}")
+    for name, (retry, hedge) in policies.items():
+        success, latencies, sent = run(server, retry, hedge)
+        p50, p95, p99 = (
+            statistics.quantiles(latencies, n=100)[q - 1] * 1000 for q in (50, 95, 99)
+        )
+        print(
+            f"{name:>14}{success:>9.1%}"
+            f"{p50:>7.1f}ms{p95:>7.1f}ms{p99:>7.1f}ms{sent:>7}",
+        )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
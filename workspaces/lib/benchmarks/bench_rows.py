@@ -0,0 +1,81 @@
+"""Compare per-row and bulk structuring of list-encoded rows.
+
+Run from ``workspaces/lib`` with ``python -m benchmarks.bench_rows``.
+"""
+
+from typing import Any, Callable, List, Tuple, Type
+
+import attrs
+import cattrs
+
+from benchmarks.replay import CASSETTE_DIR, best_time, read_cassette
+from pycwatch.lib.conversion import converter
+from pycwatch.lib.decoding import get_decoder
+from pycwatch.lib.models import (
+    MarketTradeList,
+    OrderBookArray,
+    OrderBookItem,
+    Trade,
+)
+
+
+def load_rows(name: str, select: Callable[[Any], List[Any]]) -> List[Any]:
+    """Load the rows of all responses of a cassette."""
+    rows = []
+    for _, _, body in read_cassette(CASSETTE_DIR / f"{name}.yml"):
+        data = get_decoder()(body)
+        if isinstance(data.get("result"), (list, dict)):
+            rows.extend(select(data["result"]))
+    return rows
+
+
+def make_per_row_structure(row_cls: Type[Any]) -> Callable[[List[Any]], List[Any]]:
+    """Create a function that dispatches for every row and every field."""
+    types = [field.type for field in attrs.fields(row_cls)]
+
+    def structure_row(row: List[Any], _: Any) -> Any:
+        return row_cls(
+            *[converter.structure(value, type_) for value, type_ in zip(row, types)],
+        )
+
+    row_converter = cattrs.Converter()
+    row_converter.register_structure_hook(row_cls, structure_row)
+    return lambda rows: [row_converter.structure(row, row_cls) for row in rows]
+
+
+def time_paths(
+    rows: List[Any],
+    row_cls: Type[Any],
+    list_type: Any,
+) -> Tuple[float, float]:
+    """Time structuring rows one by one and as a whole list."""
+    structure_per_row = make_per_row_structure(row_cls)
+    return (
+        best_time(lambda: structure_per_row(rows), number=10),
+        best_time(lambda: converter.structure(rows, list_type), number=10),
+    )
+
+
+def main() -> None:
+    """Print the time to structure the rows of each cassette."""
+    cases = (
+        (
+            "get_market_order_book",
+            lambda result: result["asks"] + result["bids"],
+            OrderBookItem,
+            OrderBookArray,
+        ),
+        ("get_market_trades", lambda result: result, Trade, MarketTradeList),
+    )
+    print(f"{'rows':<24}{'count':>8}{'per row':>14}{'bulk':>14}{'speedup':>10}")
+    for name, select, row_cls, list_type in cases:
+        rows = load_rows(name, select)
+        per_row, bulk = time_paths(rows, row_cls, list_type)
+        print(
+            f"{name:<24}{len(rows):>8}{per_row:>11.2f} ms{bulk:>11.2f} ms"
+            f"{per_row / bulk:>9.1f}x",
+        )
+
+
+if __name__ == "__main__":
+    main()
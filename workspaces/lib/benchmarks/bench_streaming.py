@@ -0,0 +1,86 @@
+"""Compare streaming and buffered parsing of the largest recorded responses.
+
+Run from ``workspaces/lib`` with ``python -m benchmarks.bench_streaming``.
+"""
+
+import time
+import tracemalloc
+from typing import Any, Callable, Iterator, Tuple, Type
+
+from benchmarks.replay import load_body
+from pycwatch.lib.conversion import converter
+from pycwatch.lib.decoding import get_decoder
+from pycwatch.lib.models import (
+    AllPrices,
+    AllSummaries,
+    MarketList,
+    MarketMember,
+    MarketSummary,
+    PaginatedResponse,
+    Price,
+    Response,
+)
+from pycwatch.lib.streaming import STREAM_CHUNK_SIZE, ResultStreamParser
+
+CASES: Tuple[Tuple[str, Type[Any], Type[Any]], ...] = (
+    ("get_all_market_summaries", Response[AllSummaries], MarketSummary),
+    ("get_all_market_prices", PaginatedResponse[AllPrices], Price),
+    ("list_markets", PaginatedResponse[MarketList], MarketMember),
+)
+
+
+def chunks(body: bytes) -> Iterator[bytes]:
+    """Split a body like a streamed response."""
+    for pos in range(0, len(body), STREAM_CHUNK_SIZE):
+        yield body[pos : pos + STREAM_CHUNK_SIZE]
+
+
+def buffered(body: bytes, response_cls: Type[Any]) -> Iterator[Any]:
+    """Buffer, parse and structure the whole response, then yield its members."""
+    data = b"".join(chunks(body))
+    result = converter.structure(get_decoder()(data), response_cls).result
+    yield from result.items() if isinstance(result, dict) else result
+
+
+def streamed(body: bytes, item_cls: Type[Any]) -> Iterator[Any]:
+    """Parse and structure the members while the chunks arrive."""
+    parser = ResultStreamParser()
+    for chunk in chunks(body):
+        for key, value in parser.feed(chunk):
+            yield key, converter.structure(value, item_cls)
+    parser.close()
+
+
+def measure(items: Callable[[], Iterator[Any]]) -> Tuple[float, float, int]:
+    """Get the time to the first and last member, and the peak memory."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    iterator = items()
+    next(iterator)
+    first = time.perf_counter() - start
+    for _ in iterator:
+        pass
+    last = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return first * 1000, last * 1000, peak
+
+
+def main() -> None:
+    """Print the latency and memory of both modes for each response."""
+    print(f"{'response':<26}{'mode':<10}{'first':>12}{'last':>12}{'peak':>12}")
+    for name, response_cls, item_cls in CASES:
+        body = load_body(name)
+        for mode, items in (
+            ("buffered", lambda: buffered(body, response_cls)),  # noqa: B023
+            ("streamed", lambda: streamed(body, item_cls)),  # noqa: B023
+        ):
+            first, last, peak = measure(items)
+            print(
+                f"{name:<26}{mode:<10}{first:>9.1f} ms{last:>9.1f} ms"
+                f"{peak / 2**20:>9.1f} MB",
+            )
+
+
+if __name__ == "__main__":
+    main()
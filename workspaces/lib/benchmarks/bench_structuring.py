@@ -0,0 +1,53 @@
+"""Compare eager, lazy and raw structuring of recorded responses.
+
+Run from ``workspaces/lib`` with ``python -m benchmarks.bench_structuring``.
+"""
+
+from typing import Any, Callable, Dict, Tuple, Type
+
+from benchmarks.replay import best_time, load_data
+from pycwatch.lib.conversion import converter
+from pycwatch.lib.lazy import make_lazy_response, make_raw_response
+from pycwatch.lib.models import AllSummaries, Asset, MarketList, PaginatedResponse
+from pycwatch.lib.models import Response as APIResponse
+
+# the response model of each cassette, and how a caller reads one value from it
+CASES: Dict[str, Tuple[Type[Any], Callable[[Any], Any]]] = {
+    "get_all_market_summaries": (
+        APIResponse[AllSummaries],
+        lambda response: response.result["kraken:btceur"].price.last,
+    ),
+    "list_markets": (
+        PaginatedResponse[MarketList],
+        lambda response: response.result[0].pair,
+    ),
+    "get_asset": (
+        APIResponse[Asset],
+        lambda response: response.result.markets.base[0].route,
+    ),
+}
+
+
+def time_modes(
+    data: Any,
+    response_cls: Type[Any],
+    read: Callable[[Any], Any],
+) -> Tuple[float, float, float]:
+    """Time structuring a response and reading a value from it in each mode."""
+    return (
+        best_time(lambda: read(converter.structure(data, response_cls))),
+        best_time(lambda: read(make_lazy_response(data, response_cls))),
+        best_time(lambda: make_raw_response(data).result),
+    )
+
+
+def main() -> None:
+    """Print the time to structure each response and read one value from it."""
+    print(f"{'response':<28}{'eager':>12}{'lazy':>12}{'raw':>12}")
+    for name, (response_cls, read) in CASES.items():
+        eager, lazy, raw = time_modes(load_data(name), response_cls, read)
+        print(f"{name:<28}{eager:>9.2f} ms{lazy:>9.2f} ms{raw:>9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""Drive the clients at a target request rate against the replay server.
+
+Requests are started on a fixed schedule, whether or not earlier ones have
+finished, and their latency is measured from the time they were due. A client
+that falls behind therefore shows it in its latency, instead of quietly sending
+fewer requests. Requests rejected with a 429 are counted apart from other
+errors. Run from ``workspaces/lib`` with
+``python -m benchmarks.loadtest --rps 200 --duration 10 --latency 0.02``.
+"""
+
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, List, Optional, Tuple
+
+import attrs
+from apiclient.exceptions import APIRequestError
+
+from benchmarks.replay import ReplayConfig, ReplayServer
+from pycwatch.lib import CryptoWatchClient
+from pycwatch.lib.async_client import AsyncCryptoWatchClient
+from pycwatch.lib.exceptions import RateLimitError
+from pycwatch.lib.ratelimit import AllowanceLimiter
+
+EXCHANGE = "kraken"
+PAIR = "btceur"
+
+
+@attrs.define()
+class LoadResult:
+    """The outcome of a load test."""
+
+    client: str
+    elapsed: float
+    latencies: List[float] = attrs.field(factory=list)
+    rejected: int = 0
+    errors: int = 0
+
+    @property
+    def throughput(self) -> float:
+        """The requests completed per second."""
+        return len(self.latencies) / self.elapsed
+
+    def quantiles(self) -> Optional[Tuple[float, float, float]]:
+        """The 50th, 95th and 99th percentiles of the latencies, in seconds.
+
+        There are none if fewer than two requests succeeded.
+        """
+        if len(self.latencies) < 2:  # noqa: PLR2004
+            return None
+        cuts = statistics.quantiles(self.latencies, n=100)
+        return cuts[49], cuts[94], cuts[98]
+
+    def fail(self, exc: APIRequestError) -> None:
+        """Count a failed request, as rejected if it was rate limited."""
+        if isinstance(exc, RateLimitError):
+            self.rejected += 1
+        else:
+            self.errors += 1
+
+
+def sync_calls(client: CryptoWatchClient) -> List[Callable[[], Any]]:
+    """Get the mix of calls that is sent with the sync client."""
+    return [
+        lambda: client.get_market_price(EXCHANGE, PAIR),
+        lambda: client.get_market_summary(EXCHANGE, PAIR),
+        lambda: client.get_market_order_book(EXCHANGE, PAIR),
+        lambda: client.list_exchanges(),
+    ]
+
+
+def async_calls(client: AsyncCryptoWatchClient) -> List[Callable[[], Any]]:
+    """Get the mix of calls that is sent with the async client."""
+    return [
+        lambda: client.get_market_price(EXCHANGE, PAIR),
+        lambda: client.get_market_summary(EXCHANGE, PAIR),
+        lambda: client.get_market_order_book(EXCHANGE, PAIR),
+        lambda: client.list_exchanges(),
+    ]
+
+
+def run_sync(
+    url: str,
+    rps: float,
+    duration: float,
+    concurrency: int,
+    rate_limiter: Optional[AllowanceLimiter],
+) -> LoadResult:
+    """Send requests with the sync client from a pool of threads."""
+    client = CryptoWatchClient(
+        base_url=url,
+        pool_maxsize=concurrency,
+        rate_limiter=rate_limiter,
+        coalesce_requests=False,
+    )
+    calls = sync_calls(client)
+    result = LoadResult("sync", duration)
+    lock = threading.Lock()
+
+    def send(call: Callable[[], Any], due: float) -> None:
+        try:
+            call()
+        except APIRequestError as exc:
+            with lock:
+                result.fail(exc)
+        else:
+            with lock:
+                result.latencies.append(time.perf_counter() - due)
+
+    with ThreadPoolExecutor(concurrency) as executor:
+        started = time.perf_counter()
+        futures = []
+        for index in range(int(rps * duration)):
+            due = started + index / rps
+            time.sleep(max(0.0, due - time.perf_counter()))
+            futures.append(executor.submit(send, calls[index % len(calls)], due))
+        wait(futures)
+        result.elapsed = time.perf_counter() - started
+    client.get_session().close()
+    return result
+
+
+async def run_async(
+    url: str,
+    rps: float,
+    duration: float,
+    concurrency: int,
+    rate_limiter: Optional[AllowanceLimiter],
+) -> LoadResult:
+    """Send requests with the async client from a single event loop."""
+    result = LoadResult("async", duration)
+    semaphore = asyncio.Semaphore(concurrency)
+    async with AsyncCryptoWatchClient(
+        base_url=url,
+        max_connections=concurrency,
+        max_keepalive_connections=concurrency,
+        rate_limiter=rate_limiter,
+        coalesce_requests=False,
+    ) as client:
+        calls = async_calls(client)
+
+        async def send(call: Callable[[], Any], due: float) -> None:
+            async with semaphore:
+                try:
+                    await call()
+                except APIRequestError as exc:
+                    result.fail(exc)
+                else:
+                    result.latencies.append(time.perf_counter() - due)
+
+        started = time.perf_counter()
+        tasks = []
+        for index in range(int(rps * duration)):
+            due = started + index / rps
+            await asyncio.sleep(max(0.0, due - time.perf_counter()))
+            tasks.append(asyncio.create_task(send(calls[index % len(calls)], due)))
+        await asyncio.gather(*tasks)
+        result.elapsed = time.perf_counter() - started
+    return result
+
+
+def main() -> None:
+    """Print the throughput and latency quantiles of each client."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rps", type=float, default=200.0, help="target rate")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds")
+    parser.add_argument("--client", choices=("sync", "async", "both"), default="both")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds")
+    parser.add_argument("--jitter", type=float, default=0.01, help="seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--allowance", type=float, help="credits, unlimited if unset")
+    parser.add_argument(
+        "--budget",
+        type=float,
+        help="pace the clients to spend at most this many credits per window",
+    )
+    parser.add_argument("--window", type=float, default=60.0, help="seconds")
+    args = parser.parse_args()
+    config = ReplayConfig(args.latency, args.jitter, args.error_rate, args.allowance)
+    server = ReplayServer(config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    load = (args.rps, args.duration, args.concurrency)
+
+    def limiter() -> Optional[AllowanceLimiter]:
+        if args.budget is None:
+            return None
+        return AllowanceLimiter(budget=args.budget, window=args.window, burst=1.0)
+
+    results = []
+    if args.client in ("sync", "both"):
+        results.append(run_sync(server.url, *load, limiter()))
+    if args.client in ("async", "both"):
+        results.append(asyncio.run(run_async(server.url, *load, limiter())))
+    print(f"target {args.rps:.0f} req/s for {args.duration:.0f}s")
+    print(
+        f"{'client':>7}{'ok':>7}{'429':>7}{'errors':>8}{'req/s':>8}"
+        f"{'p50':>9}{'p95':>9}{'p99':>9}",
+    )
+    for result in results:
+        cuts = result.quantiles()
+        latencies = (
+            "".join(f"{cut * 1000:>7.1f}ms" for cut in cuts)
+            if cuts is not None
+            else f"{'-':>9}" * 3
+        )
+        print(
+            f"{result.client:>7}{len(result.latencies):>7}{result.rejected:>7}"
+            f"{result.errors:>8}{result.throughput:>8.1f}{latencies}",
+        )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
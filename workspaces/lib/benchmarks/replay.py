@@ -0,0 +1,254 @@
+"""Serve the recorded cassettes from a local server that behaves like the API.
+
+Every response recorded under ``tests/vcr_cassettes`` is served at the path and
+query of its request, or at its path alone if the query was not recorded. The
+server can delay responses, stall or fail a share of them with a 503, and track
+an allowance: each response reports its cost and the credits that remain in its
+allowance, and once they run out requests are rejected with a 429, as the API
+does. Faults that are queued apply to the next requests, one each. The test
+suite and the benchmarks share this server, and the benchmarks also load
+their cassettes and time their runs with the helpers here. Point a client at it with
+``base_url``. Run from ``workspaces/lib`` with
+``python -m benchmarks.replay --port 8080 --latency 0.05``.
+"""
+
+import argparse
+import json
+import random
+import socket
+import threading
+import time
+import timeit
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+import attrs
+from vcr.persisters.filesystem import FilesystemPersister
+from vcr.serializers import yamlserializer
+
+from pycwatch.lib.decoding import get_decoder
+from pycwatch.lib.proxy import match_endpoint
+from pycwatch.lib.ratelimit import DEFAULT_COST, DEFAULT_COSTS
+
+CASSETTE_DIR = Path(__file__).parents[1] / "tests" / "vcr_cassettes"
+ALLOWANCE = b'"allowance":'
+UPGRADE = "For unlimited API access, create an account at https://cryptowat.ch"
+
+Responses = Dict[str, Tuple[int, bytes]]
+
+
+@attrs.frozen()
+class ReplayConfig:
+    """How the replay server behaves.
+
+    A share of ``error_rate`` requests fail with a 503, and a further share of
+    ``stall_rate`` requests are answered only after ``stall`` seconds.
+    """
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    allowance: Optional[float] = None
+    seed: int = 0
+    stall: float = 0.0
+    stall_rate: float = 0.0
+
+
+@attrs.frozen()
+class Fault:
+    """A delay, and an error status to answer with instead of the response."""
+
+    status: Optional[int] = None
+    headers: Dict[str, str] = attrs.Factory(dict)
+    delay: float = 0.0
+
+
+def read_cassette(file: Path) -> List[Tuple[str, int, bytes]]:
+    """Read the URI, status and body of every recorded response of a cassette."""
+    requests, recorded = FilesystemPersister.load_cassette(
+        file.as_posix(),
+        yamlserializer,
+    )
+    entries = []
+    for request, response in zip(requests, recorded):
+        body = response["body"]["string"]
+        entries.append(
+            (
+                request.uri,
+                response["status"]["code"],
+                body.encode() if isinstance(body, str) else body,
+            ),
+        )
+    return entries
+
+
+def load_body(name: str) -> bytes:
+    """Load the body of the first response of a cassette."""
+    _, _, body = read_cassette(CASSETTE_DIR / f"{name}.yml")[0]
+    return body
+
+
+def load_data(name: str) -> Any:
+    """Load and decode the body of the first response of a cassette."""
+    return get_decoder()(load_body(name))
+
+
+def best_time(func: Callable[[], Any], repeat: int = 5, number: int = 1) -> float:
+    """Get the fastest of several runs of a function, in milliseconds per call."""
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / number * 1000
+
+
+def load_cassette(file: Path) -> Responses:
+    """Load the status and body of the responses of a cassette.
+
+    Responses are keyed by the path and query of their request, and by the
+    path alone for the first response recorded at a path.
+    """
+    responses: Responses = {}
+    for uri, status, body in read_cassette(file):
+        url = urlsplit(uri)
+        responses.setdefault(url.path, (status, body))
+        if url.query:
+            responses[f"{url.path}?{url.query}"] = (status, body)
+    return responses
+
+
+def load_responses(directory: Path = CASSETTE_DIR) -> Responses:
+    """Load the status and body of every recorded response by its path and query."""
+    responses: Responses = {}
+    for file in sorted(directory.glob("*.yml")):
+        for target, entry in load_cassette(file).items():
+            responses.setdefault(target, entry)
+    return responses
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    """Serve the recorded response for the path of a request."""
+
+    protocol_version = "HTTP/1.1"
+    server: "ReplayServer"
+
+    def setup(self) -> None:
+        """Send the headers and body without waiting for acknowledgements."""
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_GET(self) -> None:  # noqa: N802
+        """Reply with the recorded response, an error, or 404."""
+        self.server.connections.add(self.client_address)
+        status, headers, body = self.server.respond(self.path)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: object) -> None:
+        """Keep the output quiet."""
+
+
+class ReplayServer(ThreadingHTTPServer):
+    """A local server that replays the recorded responses of the API.
+
+    It serves every cassette by default, or only the ``responses`` given and
+    the cassettes loaded later.
+    """
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(
+        self,
+        config: ReplayConfig = ReplayConfig(),  # noqa: B008
+        host: str = "127.0.0.1",
+        port: int = 0,
+        responses: Optional[Responses] = None,
+    ) -> None:
+        super().__init__((host, port), ReplayHandler)
+        self.config = config
+        self.responses = load_responses() if responses is None else dict(responses)
+        self.remaining = config.allowance
+        self.rng = random.Random(config.seed)
+        self.lock = threading.Lock()
+        self.faults: Deque[Fault] = deque()
+        self.requests: List[str] = []
+        self.connections: Set[Tuple[str, int]] = set()
+
+    @property
+    def url(self) -> str:
+        """The base URL of the server."""
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def load_cassette(self, cassette_file: str) -> None:
+        """Serve the responses of a cassette, over those loaded before."""
+        self.responses.update(load_cassette(CASSETTE_DIR / cassette_file))
+
+    def respond(self, target: str) -> Tuple[int, Dict[str, str], bytes]:
+        """Wait for the latency and get the status, headers and body of a request."""
+        path = urlsplit(target).path
+        endpoint = match_endpoint(path)
+        cost = DEFAULT_COSTS.get(endpoint or "", DEFAULT_COST)
+        config = self.config
+        with self.lock:
+            self.requests.append(target)
+            fault = self.faults.popleft() if self.faults else None
+            delay = config.latency + self.rng.uniform(0, config.jitter)
+            roll = self.rng.random()
+            failed = roll < config.error_rate
+            if config.error_rate <= roll < config.error_rate + config.stall_rate:
+                delay = config.stall
+            rejected = failed or (fault is not None and fault.status is not None)
+            exhausted = self.remaining is not None and self.remaining < cost
+            if self.remaining is not None and not (rejected or exhausted):
+                self.remaining -= cost
+            remaining = self.remaining
+        time.sleep(delay + (0.0 if fault is None else fault.delay))
+        if fault is not None and fault.status is not None:
+            return fault.status, fault.headers, b"{}"
+        if failed:
+            return 503, {}, b'{"error":"Service Unavailable"}'
+        if exhausted:
+            return 429, {}, b'{"error":"Out of allowance"}'
+        status, body = self.responses.get(
+            target,
+            self.responses.get(path, (404, b'{"error":"Not Found"}')),
+        )
+        if remaining is None or status != 200:  # noqa: PLR2004
+            return status, {}, body
+        return status, {}, self._with_allowance(body, cost, remaining)
+
+    @staticmethod
+    def _with_allowance(body: bytes, cost: float, remaining: float) -> bytes:
+        """Replace the recorded allowance of a body with the tracked one."""
+        start = body.rfind(ALLOWANCE)
+        if start < 0:
+            return body
+        allowance = {"cost": cost, "remaining": round(remaining, 9), "upgrade": UPGRADE}
+        return body[:start] + ALLOWANCE + json.dumps(allowance).encode() + b"}"
+
+
+def main() -> None:
+    """Serve the cassettes until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--allowance", type=float, help="credits, unlimited if unset")
+    args = parser.parse_args()
+    config = ReplayConfig(args.latency, args.jitter, args.error_rate, args.allowance)
+    server = ReplayServer(config, port=args.port)
+    print(f"Replaying {len(server.responses)} responses on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,8 @@ if sys.version_info < (3, 8):
 else:
     from importlib.metadata import version
 
+from pycwatch.lib.async_client import AsyncCryptoWatchClient
 from pycwatch.lib.client import CryptoWatchClient
 
 __version__ = version("pycwatch-lib")
-__all__ = ("CryptoWatchClient",)
+__all__ = ("AsyncCryptoWatchClient", "CryptoWatchClient")
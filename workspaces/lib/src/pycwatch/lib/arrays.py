@@ -0,0 +1,112 @@
+"""Columnar NumPy representations of list-encoded results."""
+
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Union
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    HAS_NUMPY = False
+else:
+    HAS_NUMPY = True
+
+from pycwatch.lib.conversion import FIXED_POINT_SCALE, NumericBackend
+
+if TYPE_CHECKING:
+    import numpy.typing as npt
+
+    OHLCVArrays = Dict[str, npt.NDArray[np.void]]
+
+OHLCV_FIELDS = (
+    "close_time",
+    "open_price",
+    "high_price",
+    "low_price",
+    "close_price",
+    "volume",
+    "quote_volume",
+)
+
+
+def require_numpy() -> None:
+    """Raise an error if NumPy is not installed."""
+    if not HAS_NUMPY:  # pragma: no cover
+        msg = "NumPy is required for arrays, install pycwatch-lib[numpy]"
+        raise ImportError(msg)
+
+
+def _check_backend(numeric_backend: Union[NumericBackend, str]) -> NumericBackend:
+    """Check that a numeric backend can be used for arrays."""
+    backend = NumericBackend(numeric_backend)
+    if backend == NumericBackend.DECIMAL:
+        msg = "Arrays hold float or fixed point numbers, not decimals"
+        raise ValueError(msg)
+    return backend
+
+
+def ohlcv_dtype(
+    numeric_backend: Union[NumericBackend, str] = NumericBackend.FLOAT,
+) -> "np.dtype[np.void]":
+    """
+    Get the dtype of OHLCV arrays.
+
+    Close times are int64. Prices and volumes are float64, or int64 in units of
+    1e-8 for the fixed point backend.
+    """
+    require_numpy()
+    backend = _check_backend(numeric_backend)
+    value_type = np.float64 if backend == NumericBackend.FLOAT else np.int64
+    return np.dtype(
+        [(OHLCV_FIELDS[0], np.int64)]
+        + [(name, value_type) for name in OHLCV_FIELDS[1:]],
+    )
+
+
+def ohlcv_array(
+    rows: List[List[Any]],
+    numeric_backend: Union[NumericBackend, str] = NumericBackend.FLOAT,
+) -> "npt.NDArray[np.void]":
+    """
+    Build a structured array from list-encoded candles.
+
+    The rows are converted in one pass by NumPy, without creating an object per
+    candle. Columns are read by name, e.g. ``array["close_price"]``. Fixed point
+    values are scaled from float64, so they are exact up to about 15 significant
+    digits.
+
+    Args:
+        rows: The candles of one period as returned by the API.
+        numeric_backend: ``float`` or ``fixed``.
+
+    Returns:
+        A contiguous structured array with one record per candle.
+    """
+    dtype = ohlcv_dtype(numeric_backend)
+    values = np.array(rows, dtype=np.float64).reshape(-1, len(OHLCV_FIELDS))
+    # the records have the same layout as the rows of values, so the columns are
+    # converted in place and the buffer is reused for the structured array
+    as_int = values.view(np.int64)
+    as_int[:, 0] = values[:, 0].astype(np.int64)
+    if dtype["open_price"] == np.int64:
+        for index in range(1, len(OHLCV_FIELDS)):
+            column = np.rint(values[:, index] * FIXED_POINT_SCALE)
+            as_int[:, index] = column.astype(np.int64)
+    return values.view(dtype).reshape(-1)
+
+
+def ohlcv_arrays(
+    result: Mapping[str, List[List[Any]]],
+    numeric_backend: Union[NumericBackend, str] = NumericBackend.FLOAT,
+) -> "OHLCVArrays":
+    """
+    Build structured arrays from the decoded result of an OHLCV request.
+
+    Args:
+        result: The candles of each period, keyed by the period in seconds.
+        numeric_backend: ``float`` or ``fixed``.
+
+    Returns:
+        A structured array of candles for each period.
+    """
+    return {
+        period: ohlcv_array(rows, numeric_backend) for period, rows in result.items()
+    }
@@ -0,0 +1,884 @@
+"""The module that holds the asynchronous API client."""
+
+import asyncio
+import functools
+import logging
+import time
+from types import TracebackType
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    Union,
+    cast,
+)
+
+import attrs
+from apiclient.client import DEFAULT_TIMEOUT
+from apiclient.exceptions import UnexpectedError
+from apiclient.response import Response as APIClientResponse
+from apiclient.utils.typing import JsonType
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    HAS_HTTPX = False
+else:
+    HAS_HTTPX = True
+
+from pycwatch.lib.arrays import ohlcv_arrays, ohlcv_dtype
+from pycwatch.lib.cache import CacheKey, ResponseCache
+from pycwatch.lib.client import (
+    APIErrorHandler,
+    BaseClient,
+    ItemT,
+    ResponseCls,
+    ResponseT,
+    get_authentication_method,
+    unstructure_params,
+)
+from pycwatch.lib.coalescing import AsyncSingleFlight
+from pycwatch.lib.config import settings
+from pycwatch.lib.conversion import NumericBackend, get_converter
+from pycwatch.lib.decoding import (
+    AUTO,
+    decode_response,
+    get_decoder,
+    get_parse_float,
+)
+from pycwatch.lib.disk_cache import DiskCache
+from pycwatch.lib.endpoints import BASE_URL, Endpoint
+from pycwatch.lib.lazy import StructureMode
+from pycwatch.lib.models import (
+    AllPrices,
+    AllSummaries,
+    Asset,
+    AssetList,
+    AssetMember,
+    AssetPathParams,
+    Exchange,
+    ExchangeList,
+    ExchangeMarkets,
+    ExchangePathParams,
+    Info,
+    Market,
+    MarketList,
+    MarketMember,
+    MarketPathParams,
+    MarketPrice,
+    MarketSummariesQueryParams,
+    MarketSummary,
+    MarketTradeList,
+    OHLCVDict,
+    OHLCVQueryParams,
+    OrderBook,
+    OrderBookCalculator,
+    OrderBookCalculatorQueryParams,
+    OrderBookLiquidity,
+    OrderBookQueryParams,
+    PaginatedResponse,
+    PaginationQueryParams,
+    Pair,
+    PairList,
+    PairMember,
+    PairPathParams,
+    Price,
+    Response,
+    ResponseRoot,
+    TradeQueryParams,
+)
+from pycwatch.lib.orderbook import ColumnarOrderBook
+from pycwatch.lib.pagination import aiter_pages
+from pycwatch.lib.planning import (
+    DEFAULT_CONCURRENCY,
+    BatchPlanner,
+    MarketKey,
+    price_key,
+    summary_key,
+)
+from pycwatch.lib.ratelimit import AllowanceLimiter
+from pycwatch.lib.resilience import (
+    HedgePolicy,
+    LatencyTracker,
+    RetryPolicy,
+    hedged_call_async,
+    retry_call_async,
+)
+from pycwatch.lib.streaming import STREAM_CHUNK_SIZE, ResultKey, ResultStreamParser
+
+if TYPE_CHECKING:
+    from pycwatch.lib.arrays import OHLCVArrays
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPXResponse(APIClientResponse):
+    """Response wrapper that exposes an httpx response to apiclient."""
+
+    def __init__(self, response: "httpx.Response") -> None:
+        self._response = response
+
+    def get_original(self) -> Any:
+        """Return the underlying httpx response."""
+        return self._response
+
+    def get_status_code(self) -> int:
+        """Return the status code of the response."""
+        return self._response.status_code
+
+    def get_raw_data(self) -> str:
+        """Return the content of the response as text."""
+        return self._response.text
+
+    def get_json(self) -> JsonType:
+        """Return the json-encoded content of the response."""
+        return self._response.json()
+
+    def get_status_reason(self) -> str:
+        """Return the textual representation of the status code."""
+        return self._response.reason_phrase
+
+    def get_requested_url(self) -> str:
+        """Return the url to which the request was made."""
+        return str(self._response.url)
+
+
+class AsyncCryptoWatchClient(BaseClient):
+    """The asynchronous CryptoWatch client class.
+
+    Requests are sent through a pooled ``httpx.AsyncClient``, so many calls can be
+    in flight concurrently on a single event loop. Use the client as an async
+    context manager or call :meth:`aclose` to release the connection pool.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        api_key: Optional[str] = None,
+        *,
+        base_url: str = BASE_URL,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        timeout: float = DEFAULT_TIMEOUT,
+        transport: Optional["httpx.AsyncBaseTransport"] = None,
+        retry: Optional[RetryPolicy] = None,
+        hedge: Optional[HedgePolicy] = None,
+        rate_limiter: Optional[AllowanceLimiter] = None,
+        cache: Optional[ResponseCache] = None,
+        disk_cache: Optional[DiskCache] = None,
+        coalesce_requests: bool = True,
+        json_decoder: str = AUTO,
+        structure_mode: Union[StructureMode, str] = StructureMode.EAGER,
+        numeric_backend: Union[NumericBackend, str] = NumericBackend.DECIMAL,
+    ) -> None:
+        if not HAS_HTTPX:  # pragma: no cover
+            msg = (
+                "The async client requires httpx, "
+                "install it with `pip install pycwatch-lib[async]`."
+            )
+            raise ImportError(msg)
+
+        api_key = api_key or settings.CW_API_KEY
+        self._api_key = api_key
+        self._base_url = base_url.rstrip("/")
+        self._retry = retry
+        self._hedge = hedge
+        self._latencies = LatencyTracker()
+        self._refresh_tasks: Set["asyncio.Future[None]"] = set()
+        self._rate_limiter = rate_limiter
+        self._cache = cache
+        self._disk_cache = disk_cache
+        self._structure_mode = StructureMode(structure_mode)
+        self._numeric_backend = NumericBackend(numeric_backend)
+        self._converter = get_converter(self._numeric_backend)
+        self._single_flight = AsyncSingleFlight() if coalesce_requests else None
+        self._planner = BatchPlanner()
+        self._json_decoder = json_decoder
+        self._decoder = get_decoder(json_decoder)
+        self._authentication_method = get_authentication_method(api_key)
+        self._http_client = httpx.AsyncClient(
+            headers=self._authentication_method.get_headers(),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+            ),
+            timeout=timeout,
+            transport=transport,
+        )
+
+    async def __aenter__(self) -> "AsyncCryptoWatchClient":
+        """Enter the client context."""
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        """Close the client when leaving the context."""
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Cancel the background refreshes and close the connection pool."""
+        for task in list(self._refresh_tasks):
+            task.cancel()
+        await self._http_client.aclose()
+
+    async def get_info(self) -> ResponseRoot[Info]:
+        """Get the allowance and status information by requesting root."""
+        return await self._make_request(Endpoint.root, ResponseRoot[Info])
+
+    async def list_assets(
+        self,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> PaginatedResponse[AssetList]:
+        """List all available assets."""
+        params = PaginationQueryParams(cursor=cursor, limit=limit)
+        return await self._make_request(
+            Endpoint.list_assets,
+            PaginatedResponse[AssetList],
+            params=params,
+        )
+
+    async def get_asset(self, asset_code: str) -> Response[Asset]:
+        """Get information about a specific asset."""
+        return await self._make_request(
+            Endpoint.asset_detail,
+            Response[Asset],
+            path_params=AssetPathParams(asset_code=asset_code),
+        )
+
+    async def list_pairs(
+        self,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> PaginatedResponse[PairList]:
+        """List all available pairs."""
+        params = PaginationQueryParams(cursor=cursor, limit=limit)
+        return await self._make_request(
+            Endpoint.list_pairs,
+            PaginatedResponse[PairList],
+            params=params,
+        )
+
+    async def get_pair(self, pair: str) -> Response[Pair]:
+        """Get information about a specific pair."""
+        return await self._make_request(
+            Endpoint.pair_detail,
+            Response[Pair],
+            path_params=PairPathParams(pair=pair),
+        )
+
+    async def list_markets(
+        self,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> PaginatedResponse[MarketList]:
+        """List all markets."""
+        params = PaginationQueryParams(cursor=cursor, limit=limit)
+        return await self._make_request(
+            Endpoint.list_markets,
+            PaginatedResponse[MarketList],
+            params=params,
+        )
+
+    async def get_market(self, exchange: str, pair: str) -> Response[Market]:
+        """Get information about a specific market."""
+        return await self._make_request(
+            Endpoint.market_detail,
+            Response[Market],
+            path_params=MarketPathParams(exchange=exchange, pair=pair),
+        )
+
+    async def get_market_price(
+        self,
+        exchange: str,
+        pair: str,
+    ) -> Response[MarketPrice]:
+        """Get the last available price for a market."""
+        return await self._make_request(
+            Endpoint.market_price,
+            Response[MarketPrice],
+            path_params=MarketPathParams(exchange=exchange, pair=pair),
+        )
+
+    async def get_all_market_prices(
+        self,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> PaginatedResponse[AllPrices]:
+        """Get all market prices."""
+        params = PaginationQueryParams(cursor=cursor, limit=limit)
+        return await self._make_request(
+            Endpoint.all_market_prices,
+            PaginatedResponse[AllPrices],
+            params=params,
+        )
+
+    async def get_market_trades(
+        self,
+        exchange: str,
+        pair: str,
+        since: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> Response[MarketTradeList]:
+        """Get recent trades for a market."""
+        params = TradeQueryParams(since=since, limit=limit)
+        return await self._make_request(
+            Endpoint.list_market_trades,
+            Response[MarketTradeList],
+            params=params,
+            path_params=MarketPathParams(exchange=exchange, pair=pair),
+        )
+
+    async def get_market_summary(
+        self,
+        exchange: str,
+        pair: str,
+    ) -> Response[MarketSummary]:
+        """Get a 24h summary of a specific market."""
+        return await self._make_request(
+            Endpoint.market_summary,
+            Response[MarketSummary],
+            path_params=MarketPathParams(exchange=exchange, pair=pair),
+        )
+
+    async def get_all_market_summaries(
+        self,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+        key_by: Optional[str] = None,
+    ) -> Response[AllSummaries]:
+        """Get 24h summaries of all markets."""
+        params = MarketSummariesQueryParams(
+            cursor=cursor,
+            limit=limit,
+            key_by=key_by,
+        )
+        return await self._make_request(
+            Endpoint.all_market_summaries,
+            Response[AllSummaries],
+            params=params,
+        )
+
+    async def get_market_prices(
+        self,
+        markets: Iterable[MarketKey],
+        max_concurrency: int = DEFAULT_CONCURRENCY,
+        errors: Optional[Dict[MarketKey, Exception]] = None,
+    ) -> AllPrices:
+        """
+        Get the prices of several markets with the cheapest requests.
+
+        The markets are requested one by one concurrently, or the prices of all
+        markets are requested at once when that costs less of the allowance.
+
+        Args:
+            markets: The exchange and pair of each market.
+            max_concurrency: The number of single requests in flight at once.
+            errors: If given, the markets whose own request fails are left out and
+                their exception is stored here by market, instead of raised.
+
+        Returns:
+            The prices keyed like :meth:`get_all_market_prices`, without the
+            markets the bulk endpoint does not list.
+        """
+        keys = list(dict.fromkeys(markets))
+        plan = self._planner.plan(
+            Endpoint.market_price,
+            Endpoint.all_market_prices,
+            len(keys),
+            max_concurrency,
+        )
+        if not plan.bulk:
+            responses = await self._map_markets(
+                self.get_market_price,
+                Endpoint.market_price,
+                keys,
+                max_concurrency,
+                errors,
+            )
+            return {
+                price_key(key): r.result.price
+                for key, r in zip(keys, responses)
+                if r is not None
+            }
+
+        started = time.perf_counter()
+        pages = [page async for page in aiter_pages(self.get_all_market_prices)]
+        self._observe_call(Endpoint.all_market_prices, pages, started)
+        names = {price_key(key) for key in keys}
+        return {
+            name: price
+            for page in pages
+            for name, price in page.result.items()
+            if name in names
+        }
+
+    async def get_market_summaries(
+        self,
+        markets: Iterable[MarketKey],
+        max_concurrency: int = DEFAULT_CONCURRENCY,
+        errors: Optional[Dict[MarketKey, Exception]] = None,
+    ) -> AllSummaries:
+        """
+        Get the 24h summaries of several markets with the cheapest requests.
+
+        Like :meth:`get_market_prices`, but for summaries.
+
+        Args:
+            markets: The exchange and pair of each market.
+            max_concurrency: The number of single requests in flight at once.
+            errors: If given, the markets whose own request fails are left out and
+                their exception is stored here by market, instead of raised.
+
+        Returns:
+            The summaries keyed like :meth:`get_all_market_summaries`, without the
+            markets the bulk endpoint does not list.
+        """
+        keys = list(dict.fromkeys(markets))
+        plan = self._planner.plan(
+            Endpoint.market_summary,
+            Endpoint.all_market_summaries,
+            len(keys),
+            max_concurrency,
+        )
+        if not plan.bulk:
+            responses = await self._map_markets(
+                self.get_market_summary,
+                Endpoint.market_summary,
+                keys,
+                max_concurrency,
+                errors,
+            )
+            return {
+                summary_key(key): r.result
+                for key, r in zip(keys, responses)
+                if r is not None
+            }
+
+        started = time.perf_counter()
+        response = await self.get_all_market_summaries()
+        self._observe_call(Endpoint.all_market_summaries, [response], started)
+        names = {summary_key(key) for key in keys}
+        return {
+            name: summary for name, summary in response.result.items() if name in names
+        }
+
+    async def get_market_order_book(  # noqa: PLR0913
+        self,
+        exchange: str,
+        pair: str,
+        depth: Optional[int] = None,
+        span: Optional[float] = None,
+        limit: Optional[int] = None,
+    ) -> Response[OrderBook]:
+        """Get the order book for a specific market."""
+        params = OrderBookQueryParams(depth=depth, span=span, limit=limit)
+        return await self._make_request(
+            Endpoint.market_orderbook,
+            Response[OrderBook],
+            params=params,
+            path_params=MarketPathParams(exchange=exchange, pair=pair),
+        )
+
+    async def get_columnar_order_book(  # noqa: PLR0913
+        self,
+        exchange: str,
+        pair: str,
+        depth: Optional[int] = None,
+        span: Optional[float] = None,
+        limit: Optional[int] = None,
+    ) -> Response[ColumnarOrderBook]:
+        """Get the order book for a specific market as arrays of prices and amounts."""
+        params = OrderBookQueryParams(depth=depth, span=span, limit=limit)
+        response = await self.with_structure(StructureMode.RAW)._make_request(
+            Endpoint.market_orderbook,
+            Response[OrderBook],
+            params=params,
+            path_params=MarketPathParams(exchange=exchange, pair=pair),
+        )
+        return self._make_columnar_response(response, ColumnarOrderBook.from_result)
+
+    async def get_market_order_book_liquidity(
+        self,
+        exchange: str,
+        pair: str,
+    ) -> Response[OrderBookLiquidity]:
+        """Get liquidity sums at several basis point levels in the order book."""
+        return await self._make_request(
+            Endpoint.market_orderbook_liquidity,
+            Response[OrderBookLiquidity],
+            path_params=MarketPathParams(exchange=exchange, pair=pair),
+        )
+
+    async def calculate_quote(
+        self,
+        exchange: str,
+        pair: str,
+        amount: float,
+    ) -> Response[OrderBookCalculator]:
+        """Get a live quote from the order book for a given buy & sell amount."""
+        params = OrderBookCalculatorQueryParams(amount=amount)
+        return await self._make_request(
+            Endpoint.market_orderbook_calculator,
+            Response[OrderBookCalculator],
+            params=params,
+            path_params=MarketPathParams(exchange=exchange, pair=pair),
+        )
+
+    async def get_ohlcv(  # noqa: PLR0913
+        self,
+        exchange: str,
+        pair: str,
+        before: Optional[int] = None,
+        after: Optional[int] = None,
+        periods: Optional[List[Union[str, int]]] = None,
+    ) -> Response[OHLCVDict]:
+        """Get a market's OHLCV candlestick data."""
+        params = OHLCVQueryParams(
+            before=before,
+            after=after,
+            periods=periods,
+        )
+        return await self._make_request(
+            Endpoint.market_ohlc,
+            Response[OHLCVDict],
+            params=params,
+            path_params=MarketPathParams(exchange=exchange, pair=pair),
+        )
+
+    async def get_ohlcv_arrays(  # noqa: PLR0913
+        self,
+        exchange: str,
+        pair: str,
+        before: Optional[int] = None,
+        after: Optional[int] = None,
+        periods: Optional[List[Union[str, int]]] = None,
+        numeric_backend: Union[NumericBackend, str] = NumericBackend.FLOAT,
+    ) -> "Response[OHLCVArrays]":
+        """Get a market's OHLCV candlestick data as NumPy structured arrays."""
+        ohlcv_dtype(numeric_backend)
+        params = OHLCVQueryParams(
+            before=before,
+            after=after,
+            periods=periods,
+        )
+        response = await self.with_structure(StructureMode.RAW)._make_request(
+            Endpoint.market_ohlc,
+            Response[OHLCVDict],
+            params=params,
+            path_params=MarketPathParams(exchange=exchange, pair=pair),
+        )
+        return self._make_columnar_response(
+            response,
+            functools.partial(ohlcv_arrays, numeric_backend=numeric_backend),
+        )
+
+    async def list_exchanges(self) -> Response[ExchangeList]:
+        """List all exchanges."""
+        return await self._make_request(Endpoint.list_exchanges, Response[ExchangeList])
+
+    async def get_exchange(self, exchange: str) -> Response[Exchange]:
+        """Get information about a specific exchange."""
+        return await self._make_request(
+            Endpoint.exchange_detail,
+            Response[Exchange],
+            path_params=ExchangePathParams(exchange=exchange),
+        )
+
+    async def list_exchange_markets(self, exchange: str) -> Response[ExchangeMarkets]:
+        """List all markets available on a given exchange."""
+        return await self._make_request(
+            Endpoint.exchange_markets,
+            Response[ExchangeMarkets],
+            path_params=ExchangePathParams(exchange=exchange),
+        )
+
+    async def iter_assets(
+        self,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[AssetMember]:
+        """Iterate over all assets, following the pagination cursor.
+
+        `limit` sets the page size. The next page is fetched while the current
+        one is being consumed.
+        """
+        async for page in aiter_pages(lambda cursor: self.list_assets(cursor, limit)):
+            for asset in page.result:
+                yield asset
+
+    async def iter_pairs(
+        self,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[PairMember]:
+        """Iterate over all pairs, following the pagination cursor."""
+        async for page in aiter_pages(lambda cursor: self.list_pairs(cursor, limit)):
+            for pair in page.result:
+                yield pair
+
+    async def iter_markets(
+        self,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[MarketMember]:
+        """Iterate over all markets, following the pagination cursor."""
+        async for page in aiter_pages(lambda cursor: self.list_markets(cursor, limit)):
+            for market in page.result:
+                yield market
+
+    async def iter_market_prices(
+        self,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[Tuple[str, Price]]:
+        """Iterate over all market prices, following the pagination cursor."""
+        pages = aiter_pages(lambda cursor: self.get_all_market_prices(cursor, limit))
+        async for page in pages:
+            for item in page.result.items():
+                yield item
+
+    async def stream_all_market_summaries(
+        self,
+        key_by: Optional[str] = None,
+    ) -> AsyncIterator[Tuple[str, MarketSummary]]:
+        """Stream the 24h summaries of all markets while they are received."""
+        params = MarketSummariesQueryParams(key_by=key_by)
+        async for key, summary in self._stream_request(
+            Endpoint.all_market_summaries,
+            MarketSummary,
+            params=params,
+        ):
+            yield str(key), summary
+
+    async def stream_all_market_prices(self) -> AsyncIterator[Tuple[str, Price]]:
+        """Stream the prices of all markets while they are received."""
+        async for key, price in self._stream_request(
+            Endpoint.all_market_prices,
+            Price,
+        ):
+            yield str(key), price
+
+    async def stream_markets(self) -> AsyncIterator[MarketMember]:
+        """Stream all markets while they are received."""
+        async for _, market in self._stream_request(
+            Endpoint.list_markets, MarketMember
+        ):
+            yield market
+
+    async def _make_request(
+        self,
+        endpoint: str,
+        response_cls: Type[ResponseCls],
+        params: Optional[attrs.AttrsInstance] = None,
+        path_params: Optional[attrs.AttrsInstance] = None,
+    ) -> ResponseCls:
+        """Make a request to the API.
+
+        Cached responses are returned right away and identical requests that are
+        in flight at the same time share a single call to the API.
+        """
+        params_dict = unstructure_params(params)
+        request_key = self._get_request_key(
+            endpoint,
+            response_cls,
+            params_dict,
+            path_params,
+        )
+        cached = self._get_cached(request_key)
+        if cached is not None:
+            return cast(ResponseCls, cached)
+
+        async def send() -> ResponseCls:
+            url = self._format_endpoint(endpoint, path_params)
+            stored = None
+            if self._disk_cache is not None:
+                # file IO blocks, so it is kept off the event loop
+                stored = await asyncio.get_running_loop().run_in_executor(
+                    None,
+                    functools.partial(
+                        self._read_disk_cache, endpoint, url, params_dict
+                    ),
+                )
+            response = self._structure_response(
+                await self._send_get(endpoint, url, params_dict)
+                if stored is None
+                else stored,
+                response_cls,
+            )
+            if stored is None:
+                self._update_rate_limiter(endpoint, response)
+            self._set_cached(request_key, response)
+            return response
+
+        stale = self._get_stale(request_key)
+        if stale is not None:
+            self._revalidate(request_key, send)
+            return cast(ResponseCls, stale)
+        if self._single_flight is None:
+            return await send()
+        return await self._single_flight.do(request_key, send)
+
+    def _revalidate(
+        self,
+        request_key: CacheKey,
+        send: Callable[[], Awaitable[Any]],
+    ) -> None:
+        """Refresh a stale response in a task, unless it already is."""
+        cache = self._cache
+        if cache is None or not cache.begin_refresh(request_key):
+            return
+
+        async def refresh() -> None:
+            failed = True
+            try:
+                await send()
+                failed = False
+            except Exception as exc:  # noqa: BLE001
+                # the caller has already been served
+                logger.warning("Refreshing %s failed: %r", request_key, exc)
+            finally:
+                cache.end_refresh(request_key, failed=failed)
+
+        task = asyncio.ensure_future(refresh())
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    async def _send_get(
+        self,
+        endpoint: str,
+        url: str,
+        params: Optional[Dict[str, Any]],
+    ) -> JsonType:
+        """Send a GET request, with the retries and hedging of the client."""
+
+        async def attempt() -> JsonType:
+            if self._rate_limiter is not None:
+                await self._rate_limiter.acquire_async(endpoint)
+            return await self._get(url, params=params, endpoint=endpoint)
+
+        hedge = self._hedge
+        call = attempt
+        if hedge is not None:
+            call = functools.partial(self._hedged, hedge, endpoint, attempt)
+        if self._retry is None:
+            return await call()
+        return await retry_call_async(call, self._retry)
+
+    async def _hedged(
+        self,
+        hedge: HedgePolicy,
+        endpoint: str,
+        attempt: Callable[[], Awaitable[JsonType]],
+    ) -> JsonType:
+        """Make an attempt, and a duplicate if it is slower than usual."""
+
+        async def timed() -> JsonType:
+            started = time.perf_counter()
+            result = await attempt()
+            self._latencies.observe(endpoint, time.perf_counter() - started)
+            return result
+
+        delay = hedge.delay(self._latencies, endpoint)
+        if delay is None:
+            return await timed()
+        return await hedged_call_async(timed, delay)
+
+    async def _map_markets(  # noqa: PLR0913
+        self,
+        method: Callable[[str, str], Awaitable[ResponseT]],
+        endpoint: str,
+        keys: List[MarketKey],
+        max_concurrency: int,
+        errors: Optional[Dict[MarketKey, Exception]] = None,
+    ) -> List[Optional[ResponseT]]:
+        """Await a single market method for each market concurrently."""
+        semaphore = asyncio.Semaphore(max(max_concurrency, 1))
+
+        async def call(key: MarketKey) -> Optional[ResponseT]:
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    response = await method(*key)
+                except Exception as exc:  # noqa: BLE001
+                    if errors is None:
+                        raise
+                    errors[key] = exc
+                    return None
+            self._observe_call(endpoint, [response], started)
+            return response
+
+        return list(await asyncio.gather(*(call(key) for key in keys)))
+
+    async def _stream_request(
+        self,
+        endpoint: str,
+        item_cls: Type[ItemT],
+        params: Optional[attrs.AttrsInstance] = None,
+    ) -> AsyncIterator[Tuple[ResultKey, ItemT]]:
+        """Make a request to the API and parse the result while it is received.
+
+        Streamed responses are neither cached nor coalesced.
+        """
+        if self._rate_limiter is not None:
+            await self._rate_limiter.acquire_async(endpoint)
+        parser = ResultStreamParser(parse_float=get_parse_float(self._json_decoder))
+        try:
+            async with self._http_client.stream(
+                "GET",
+                self._format_endpoint(endpoint),
+                params=unstructure_params(params),
+            ) as http_response:
+                response = HTTPXResponse(http_response)
+                status_code = response.get_status_code()
+                if status_code < 200 or status_code >= 300:  # noqa: PLR2004
+                    await http_response.aread()
+                    raise APIErrorHandler.get_exception(response)
+                async for chunk in http_response.aiter_bytes(STREAM_CHUNK_SIZE):
+                    for key, value in self._parse_chunk(parser, chunk):
+                        yield key, self._structure_item(value, item_cls)
+        except httpx.HTTPError as exc:
+            msg = f"Error when contacting '{endpoint}'"
+            raise UnexpectedError(msg) from exc
+        for key, value in self._parse_chunk(parser, None):
+            yield key, self._structure_item(value, item_cls)
+        self._finish_stream(endpoint, parser)
+
+    async def _get(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        endpoint: Optional[str] = None,
+    ) -> JsonType:
+        """Send a GET request and decode the response data.
+
+        The undecoded body is stored in the disk cache if the endpoint is cached.
+        """
+        try:
+            response = HTTPXResponse(await self._http_client.get(url, params=params))
+        except httpx.HTTPError as exc:
+            msg = f"Error when contacting '{url}'"
+            raise UnexpectedError(msg) from exc
+        status_code = response.get_status_code()
+        if status_code < 200 or status_code >= 300:  # noqa: PLR2004
+            raise APIErrorHandler.get_exception(response)
+        if endpoint is not None and self._disk_cache is not None:
+            await asyncio.get_running_loop().run_in_executor(
+                None,
+                functools.partial(
+                    self._write_disk_cache,
+                    endpoint,
+                    url,
+                    params,
+                    response.get_original().content,
+                ),
+            )
+        return decode_response(response, self._decoder)
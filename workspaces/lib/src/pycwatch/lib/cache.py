@@ -0,0 +1,197 @@
+"""In-memory caching of structured responses."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Mapping, Optional, Set, Tuple
+
+import attrs
+
+from pycwatch.lib.endpoints import Endpoint
+
+ONE_HOUR = 3600.0
+
+# endpoints whose results rarely change, and summaries which may be a little stale
+DEFAULT_TTLS: Dict[str, float] = {
+    Endpoint.list_assets: ONE_HOUR,
+    Endpoint.asset_detail: ONE_HOUR,
+    Endpoint.list_pairs: ONE_HOUR,
+    Endpoint.pair_detail: ONE_HOUR,
+    Endpoint.list_markets: ONE_HOUR,
+    Endpoint.market_detail: ONE_HOUR,
+    Endpoint.list_exchanges: ONE_HOUR,
+    Endpoint.exchange_detail: ONE_HOUR,
+    Endpoint.exchange_markets: ONE_HOUR,
+    Endpoint.market_summary: 5.0,
+}
+
+# live market data, worth caching briefly when stale values are served while they
+# are refreshed, and cached by default when they are
+LIVE_TTLS: Dict[str, float] = {
+    Endpoint.market_price: 1.0,
+    Endpoint.all_market_prices: 1.0,
+    Endpoint.market_summary: 1.0,
+    Endpoint.market_orderbook: 1.0,
+}
+
+
+@attrs.frozen()
+class CacheKey:
+    """Identifies a request, and the response cached for it."""
+
+    endpoint: str
+    path_params: Tuple[Tuple[str, Any], ...]
+    params: Tuple[Tuple[str, Any], ...]
+    extra: Tuple[Hashable, ...] = ()
+
+
+def make_cache_key(
+    endpoint: str,
+    path_params: Optional[Mapping[str, Any]],
+    params: Optional[Mapping[str, Any]],
+    *extra: Any,
+) -> CacheKey:
+    """
+    Build the key under which a response is cached.
+
+    Args:
+        endpoint: The endpoint template that is requested.
+        path_params: The unstructured path parameters.
+        params: The unstructured query parameters.
+        extra: Anything else the result depends on, e.g. the response class.
+
+    Returns:
+        A hashable key.
+    """
+    return CacheKey(
+        endpoint,
+        tuple(sorted((path_params or {}).items())),
+        tuple(sorted((params or {}).items())),
+        extra,
+    )
+
+
+@attrs.define()
+class CacheStats:
+    """Counters of a response cache."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    stale: int = 0
+    refresh_errors: int = 0
+
+
+@attrs.define()
+class CacheEntry:
+    """A cached value and the time at which it expires."""
+
+    value: Any
+    expires_at: float
+
+
+class ResponseCache:
+    """
+    A size bounded LRU cache with per-endpoint time to live.
+
+    The cache holds already structured results, so a hit skips the HTTP request as
+    well as structuring. Endpoints without a positive TTL are not cached. Cached
+    objects are shared between callers and must not be mutated.
+
+    With a positive ``max_staleness`` the cache serves stale values while they are
+    revalidated: a value that expired less than ``max_staleness`` seconds ago is
+    returned right away by the client, which refreshes it in the background, once
+    per key at a time. If the refresh fails, the stale value is dropped, or kept
+    until it is too stale when ``stale_if_error`` is set, and the failure is
+    counted in ``stats.refresh_errors``. Unless ``ttls`` are given, this mode
+    also caches the live market data of ``LIVE_TTLS``.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        ttls: Optional[Mapping[str, float]] = None,
+        maxsize: int = 1024,
+        clock: Callable[[], float] = time.monotonic,
+        *,
+        max_staleness: float = 0.0,
+        stale_if_error: bool = False,
+    ) -> None:
+        if ttls is None:
+            ttls = {**DEFAULT_TTLS, **LIVE_TTLS} if max_staleness > 0 else DEFAULT_TTLS
+        self.ttls = dict(ttls)
+        self.maxsize = maxsize
+        self.max_staleness = max_staleness
+        self.stale_if_error = stale_if_error
+        self.stats = CacheStats()
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[CacheKey, CacheEntry]" = OrderedDict()
+        self._refreshing: Set[CacheKey] = set()
+
+    def __len__(self) -> int:
+        """Get the number of cached values."""
+        return len(self._entries)
+
+    def is_cached(self, endpoint: str) -> bool:
+        """Check whether responses of an endpoint are cached."""
+        return self.ttls.get(endpoint, 0) > 0
+
+    def get(self, key: CacheKey) -> Optional[Any]:
+        """Get a cached value, or `None` if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at <= self._clock():
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry.value
+
+    def get_stale(self, key: CacheKey) -> Optional[Any]:
+        """Get an expired value that may still be served, or `None`."""
+        with self._lock:
+            entry = self._entries.get(key)
+            now = self._clock()
+            if (
+                entry is None
+                or entry.expires_at > now
+                or entry.expires_at + self.max_staleness <= now
+            ):
+                return None
+            self._entries.move_to_end(key)
+            self.stats.stale += 1
+            return entry.value
+
+    def begin_refresh(self, key: CacheKey) -> bool:
+        """Claim the refresh of a value, unless it is already being refreshed."""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, key: CacheKey, *, failed: bool = False) -> None:
+        """Release the refresh of a value, and drop it if the refresh failed."""
+        with self._lock:
+            self._refreshing.discard(key)
+            if failed:
+                self.stats.refresh_errors += 1
+                if not self.stale_if_error:
+                    self._entries.pop(key, None)
+
+    def set(self, key: CacheKey, value: Any) -> None:
+        """Cache a value, using the TTL of the endpoint in its key."""
+        ttl = self.ttls.get(key.endpoint, 0)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = CacheEntry(value, self._clock() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def clear(self) -> None:
+        """Remove all cached values."""
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,403 @@
+"""An indexed catalog of the assets, pairs and markets of the API."""
+
+import functools
+import gzip
+import operator
+import os
+import tempfile
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
+
+import attrs
+import ujson
+
+from pycwatch.lib.models import AssetMember, MarketMember, PairMember
+
+if TYPE_CHECKING:
+    from pycwatch.lib.async_client import AsyncCryptoWatchClient
+    from pycwatch.lib.client import CryptoWatchClient
+
+SNAPSHOT_VERSION = 1
+
+MemberT = TypeVar("MemberT", AssetMember, PairMember, MarketMember)
+CatalogMember = Union[AssetMember, PairMember, MarketMember]
+KeyFunc = Callable[[Any], Hashable]
+
+
+@functools.lru_cache(maxsize=None)
+def _row_fields(cls: Any) -> Tuple[Tuple[str, Optional[Type[Any]]], ...]:
+    """Get the names of the fields of a model, and their type if it is a model."""
+    return tuple(
+        (field.name, field.type if attrs.has(field.type) else None)
+        for field in attrs.fields(cls)
+    )
+
+
+def _to_row(member: Any) -> List[Any]:
+    """Convert a model to a list of its values, in the order of its fields."""
+    return [
+        _to_row(getattr(member, name)) if model else getattr(member, name)
+        for name, model in _row_fields(member.__class__)
+    ]
+
+
+def _from_row(cls: Any, row: List[Any]) -> Any:
+    """Create a model from a list of its values."""
+    return cls(
+        **{
+            name: _from_row(model, value) if model else value
+            for (name, model), value in zip(_row_fields(cls), row)
+        },
+    )
+
+
+class _Index(Generic[MemberT]):
+    """Members of one kind by id, with secondary indexes that are kept in sync."""
+
+    def __init__(
+        self,
+        unique: Dict[str, KeyFunc],
+        groups: Dict[str, KeyFunc],
+    ) -> None:
+        self._unique_keys = unique
+        self._group_keys = groups
+        self.by_id: Dict[int, MemberT] = {}
+        self.unique: Dict[str, Dict[Hashable, MemberT]] = {name: {} for name in unique}
+        self.groups: Dict[str, Dict[Hashable, Dict[int, MemberT]]] = {
+            name: {} for name in groups
+        }
+
+    def add(self, member: MemberT) -> None:
+        """Index a member, replacing the member with the same id."""
+        self.remove(member.id_)
+        self.by_id[member.id_] = member
+        for name, key in self._unique_keys.items():
+            self.unique[name][key(member)] = member
+        for name, key in self._group_keys.items():
+            self.groups[name].setdefault(key(member), {})[member.id_] = member
+
+    def remove(self, id_: int) -> Optional[MemberT]:
+        """Remove a member from all indexes."""
+        member = self.by_id.pop(id_, None)
+        if member is None:
+            return None
+        for name, key in self._unique_keys.items():
+            if self.unique[name].get(key(member)) is member:
+                del self.unique[name][key(member)]
+        for name, key in self._group_keys.items():
+            group = self.groups[name][key(member)]
+            del group[id_]
+            if not group:
+                del self.groups[name][key(member)]
+        return member
+
+    def update(self, members: Iterable[MemberT]) -> Set[str]:
+        """Replace all members, only touching those that changed."""
+        changed = set()
+        seen = set()
+        for member in members:
+            seen.add(member.id_)
+            current = self.by_id.get(member.id_)
+            if current != member:
+                if current is not None:
+                    changed.add(current.route)
+                self.add(member)
+                changed.add(member.route)
+        for id_ in set(self.by_id) - seen:
+            removed = self.remove(id_)
+            if removed is not None:
+                changed.add(removed.route)
+        return changed
+
+    def group(self, name: str, key: Hashable) -> List[MemberT]:
+        """Get the members that share a key."""
+        return list(self.groups[name].get(key, {}).values())
+
+
+class Catalog:
+    """
+    The assets, pairs and markets of the API, indexed for fast lookups.
+
+    Lookups by id, symbol, route, exchange and base or quote asset are dict
+    accesses instead of a request and a scan of the list. The catalog can be
+    refreshed from the API, which only reindexes what changed, and saved to and
+    loaded from a compact snapshot so that a process does not have to download
+    the lists when it starts.
+    """
+
+    def __init__(
+        self,
+        assets: Iterable[AssetMember] = (),
+        pairs: Iterable[PairMember] = (),
+        markets: Iterable[MarketMember] = (),
+    ) -> None:
+        self._assets: _Index[AssetMember] = _Index(
+            unique={
+                "symbol": operator.attrgetter("symbol"),
+                "route": operator.attrgetter("route"),
+            },
+            groups={},
+        )
+        self._pairs: _Index[PairMember] = _Index(
+            unique={
+                "symbol": operator.attrgetter("symbol"),
+                "route": operator.attrgetter("route"),
+            },
+            groups={
+                "base": operator.attrgetter("base.symbol"),
+                "quote": operator.attrgetter("quote.symbol"),
+            },
+        )
+        self._markets: _Index[MarketMember] = _Index(
+            unique={
+                "market": operator.attrgetter("exchange", "pair"),
+                "route": operator.attrgetter("route"),
+            },
+            groups={
+                "exchange": operator.attrgetter("exchange"),
+                "pair": operator.attrgetter("pair"),
+            },
+        )
+        self.update(assets, pairs, markets)
+
+    def __repr__(self) -> str:
+        """Show the number of members of each kind."""
+        return (
+            f"Catalog({len(self._assets.by_id)} assets, {len(self._pairs.by_id)} "
+            f"pairs, {len(self._markets.by_id)} markets)"
+        )
+
+    @classmethod
+    def fetch(cls, client: "CryptoWatchClient") -> "Catalog":
+        """Build a catalog from the list endpoints."""
+        catalog = cls()
+        catalog.refresh(client)
+        return catalog
+
+    @classmethod
+    async def fetch_async(cls, client: "AsyncCryptoWatchClient") -> "Catalog":
+        """Build a catalog from the list endpoints with the async client."""
+        catalog = cls()
+        await catalog.refresh_async(client)
+        return catalog
+
+    def refresh(self, client: "CryptoWatchClient") -> Set[str]:
+        """
+        Update the catalog from the list endpoints.
+
+        Args:
+            client: The client that fetches the lists.
+
+        Returns:
+            The routes of the members that were added, changed or removed.
+        """
+        return self.update(
+            list(client.iter_assets()),
+            list(client.iter_pairs()),
+            list(client.iter_markets()),
+        )
+
+    async def refresh_async(self, client: "AsyncCryptoWatchClient") -> Set[str]:
+        """Update the catalog from the list endpoints with the async client."""
+        return self.update(
+            [asset async for asset in client.iter_assets()],
+            [pair async for pair in client.iter_pairs()],
+            [market async for market in client.iter_markets()],
+        )
+
+    def update(
+        self,
+        assets: Optional[Iterable[AssetMember]] = None,
+        pairs: Optional[Iterable[PairMember]] = None,
+        markets: Optional[Iterable[MarketMember]] = None,
+    ) -> Set[str]:
+        """
+        Replace the members of some kinds, reindexing only those that changed.
+
+        Args:
+            assets: All assets, or `None` to keep the current ones.
+            pairs: All pairs, or `None` to keep the current ones.
+            markets: All markets, or `None` to keep the current ones.
+
+        Returns:
+            The routes of the members that were added, changed or removed.
+        """
+        changed: Set[str] = set()
+        if assets is not None:
+            changed |= self._assets.update(assets)
+        if pairs is not None:
+            changed |= self._pairs.update(pairs)
+        if markets is not None:
+            changed |= self._markets.update(markets)
+        return changed
+
+    @property
+    def assets(self) -> List[AssetMember]:
+        """All assets."""
+        return list(self._assets.by_id.values())
+
+    @property
+    def pairs(self) -> List[PairMember]:
+        """All pairs."""
+        return list(self._pairs.by_id.values())
+
+    @property
+    def markets(self) -> List[MarketMember]:
+        """All markets."""
+        return list(self._markets.by_id.values())
+
+    @property
+    def exchanges(self) -> List[str]:
+        """The symbols of the exchanges that have markets."""
+        return [str(exchange) for exchange in self._markets.groups["exchange"]]
+
+    def asset(self, key: Union[int, str]) -> Optional[AssetMember]:
+        """Get an asset by id or symbol."""
+        if isinstance(key, int):
+            return self._assets.by_id.get(key)
+        return self._assets.unique["symbol"].get(key)
+
+    def pair(self, key: Union[int, str]) -> Optional[PairMember]:
+        """Get a pair by id or symbol."""
+        if isinstance(key, int):
+            return self._pairs.by_id.get(key)
+        return self._pairs.unique["symbol"].get(key)
+
+    def market(
+        self, key: Union[int, str], pair: Optional[str] = None
+    ) -> Optional[MarketMember]:
+        """
+        Get a market by id, or by exchange and pair.
+
+        >>> catalog = Catalog(markets=[MarketMember(1, "kraken", "btceur", True, "")])
+        >>> catalog.market("kraken", "btceur").id_
+        1
+        """
+        if isinstance(key, int):
+            return self._markets.by_id.get(key)
+        return self._markets.unique["market"].get((key, pair))
+
+    def route(self, route: str) -> Optional[CatalogMember]:
+        """Get an asset, pair or market by its route."""
+        return (
+            self._markets.unique["route"].get(route)
+            or self._pairs.unique["route"].get(route)
+            or self._assets.unique["route"].get(route)
+        )
+
+    def find_pairs(
+        self,
+        base: Optional[str] = None,
+        quote: Optional[str] = None,
+    ) -> List[PairMember]:
+        """Get the pairs with a base and or quote asset, given by symbol."""
+        if base is None and quote is None:
+            return self.pairs
+        if base is None:
+            return self._pairs.group("quote", quote)
+        pairs = self._pairs.group("base", base)
+        return [pair for pair in pairs if quote is None or pair.quote.symbol == quote]
+
+    def find_markets(
+        self,
+        exchange: Optional[str] = None,
+        base: Optional[str] = None,
+        quote: Optional[str] = None,
+        *,
+        active: Optional[bool] = None,
+    ) -> List[MarketMember]:
+        """
+        Get the markets on an exchange, and or with a base and or quote asset.
+
+        Args:
+            exchange: The symbol of the exchange.
+            base: The symbol of the base asset.
+            quote: The symbol of the quote asset.
+            active: Only get active, or inactive, markets.
+
+        Returns:
+            The matching markets.
+        """
+        if base is None and quote is None:
+            markets = (
+                self.markets
+                if exchange is None
+                else self._markets.group("exchange", exchange)
+            )
+        else:
+            markets = [
+                market
+                for pair in self.find_pairs(base, quote)
+                for market in self._markets.group("pair", pair.symbol)
+                if exchange is None or market.exchange == exchange
+            ]
+        if active is None:
+            return markets
+        return [market for market in markets if market.active == active]
+
+    def save(self, path: Union[str, "os.PathLike[str]"]) -> None:
+        """
+        Save a snapshot of the catalog.
+
+        The snapshot is gzipped JSON with the values of each member as a list, and
+        replaces the file atomically.
+
+        Args:
+            path: The file to write.
+        """
+        data = {
+            "version": SNAPSHOT_VERSION,
+            "assets": [_to_row(asset) for asset in self.assets],
+            "pairs": [_to_row(pair) for pair in self.pairs],
+            "markets": [_to_row(market) for market in self.markets],
+        }
+        target = Path(path)
+        fd, temp = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.")
+        try:
+            with os.fdopen(fd, "wb") as file, gzip.GzipFile(
+                fileobj=file,
+                mode="wb",
+                mtime=0,
+            ) as compressed:
+                compressed.write(ujson.dumps(data).encode())
+            os.replace(temp, target)
+        except BaseException:
+            os.unlink(temp)
+            raise
+
+    @classmethod
+    def load(cls, path: Union[str, "os.PathLike[str]"]) -> "Catalog":
+        """
+        Load a catalog from a snapshot.
+
+        Args:
+            path: The file written by :meth:`save`.
+
+        Returns:
+            The catalog.
+        """
+        with gzip.open(path, "rb") as file:
+            data = ujson.loads(file.read())
+        if data.get("version") != SNAPSHOT_VERSION:
+            msg = f"Unsupported catalog snapshot version: {data.get('version')}"
+            raise ValueError(msg)
+        return cls(
+            [_from_row(AssetMember, row) for row in data["assets"]],
+            [_from_row(PairMember, row) for row in data["pairs"]],
+            [_from_row(MarketMember, row) for row in data["markets"]],
+        )
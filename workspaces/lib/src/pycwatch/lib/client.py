@@ -1,32 +1,92 @@
 """The module that holds the API client."""
 
-from typing import Any, List, Optional, Type, TypeVar, Union
+import contextlib
+import copy
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import TracebackType
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    ClassVar,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+    cast,
+)
+from urllib.parse import urlsplit
 
 import attrs
 import cattrs
+import requests
 import ujson
 from apiclient import APIClient
-from apiclient.authentication_methods import HeaderAuthentication, NoAuthentication
-from apiclient.exceptions import ResponseParseError
+from apiclient.authentication_methods import (
+    BaseAuthenticationMethod,
+    HeaderAuthentication,
+    NoAuthentication,
+)
+from apiclient.client import DEFAULT_TIMEOUT
+from apiclient.error_handlers import ErrorHandler
+from apiclient.exceptions import APIRequestError, ResponseParseError, UnexpectedError
+from apiclient.response import RequestsResponse
 from apiclient.response import Response as APIClientResponse
 from apiclient.response_handlers import BaseResponseHandler
 from apiclient.utils.typing import JsonType
+from cattrs import Converter
+from requests.adapters import DEFAULT_POOLSIZE, HTTPAdapter
 
+from pycwatch.lib.arrays import ohlcv_arrays, ohlcv_dtype
+from pycwatch.lib.cache import CacheKey, ResponseCache, make_cache_key
+from pycwatch.lib.coalescing import SingleFlight
 from pycwatch.lib.config import settings
-from pycwatch.lib.conversion import converter
-from pycwatch.lib.endpoints import Endpoint
-from pycwatch.lib.exceptions import ResponseStructureError
+from pycwatch.lib.conversion import NumericBackend, converter, get_converter
+from pycwatch.lib.decoding import (
+    AUTO,
+    Decoder,
+    decode_response,
+    get_decoder,
+    get_parse_float,
+)
+from pycwatch.lib.disk_cache import DiskCache
+from pycwatch.lib.endpoints import BASE_URL, Endpoint
+from pycwatch.lib.exceptions import RateLimitError, ResponseStructureError
+from pycwatch.lib.fanout import MapResult, fan_out
+from pycwatch.lib.lazy import (
+    RawResponse,
+    StructureMode,
+    lazy_structure,
+    make_lazy_response,
+    make_raw_response,
+)
 from pycwatch.lib.models import (
+    Allowance,
     AllPrices,
     AllSummaries,
     Asset,
     AssetList,
+    AssetMember,
+    AssetPathParams,
     Exchange,
     ExchangeList,
     ExchangeMarkets,
+    ExchangePathParams,
     Info,
     Market,
     MarketList,
+    MarketMember,
+    MarketPathParams,
     MarketPrice,
     MarketSummariesQueryParams,
     MarketSummary,
@@ -42,55 +102,500 @@ from pycwatch.lib.models import (
     PaginationQueryParams,
     Pair,
     PairList,
+    PairMember,
+    PairPathParams,
+    Price,
     Response,
     ResponseRoot,
     TradeQueryParams,
 )
+from pycwatch.lib.orderbook import ColumnarOrderBook
+from pycwatch.lib.pagination import iter_pages
+from pycwatch.lib.planning import (
+    DEFAULT_CONCURRENCY,
+    BatchPlanner,
+    MarketKey,
+    price_key,
+    summary_key,
+)
+from pycwatch.lib.ratelimit import AllowanceLimiter
+from pycwatch.lib.resilience import (
+    HedgePolicy,
+    LatencyTracker,
+    RetryPolicy,
+    hedged_call,
+    parse_retry_after,
+    retry_call,
+)
+from pycwatch.lib.streaming import STREAM_CHUNK_SIZE, ResultKey, ResultStreamParser
+
+if TYPE_CHECKING:
+    from pycwatch.lib.arrays import OHLCVArrays
 
 ResponseCls = TypeVar("ResponseCls", bound=ResponseRoot[Any])
+ItemT = TypeVar("ItemT")
+ColumnsT = TypeVar("ColumnsT")
+ResponseT = TypeVar("ResponseT")
+T = TypeVar("T")
+ClientT = TypeVar("ClientT", bound="BaseClient")
+
+# threads that refresh stale responses in the background
+REFRESH_WORKERS = 4
+
+logger = logging.getLogger(__name__)
 
 
-class UJSONResponseHandler(BaseResponseHandler):
+class JSONResponseHandler(BaseResponseHandler):
+    """JSON response handler that decodes the response body from bytes."""
+
+    decoder: ClassVar[Decoder] = staticmethod(ujson.loads)
+
+    @classmethod
+    def get_request_data(cls, response: APIClientResponse) -> Optional[JsonType]:
+        """Attempt to decode the response data."""
+        return decode_response(response, cls.decoder)
+
+
+class UJSONResponseHandler(JSONResponseHandler):
     """JSON response handler that uses ujson."""
 
+
+class APIErrorHandler(ErrorHandler):
+    """Error handler that tells how long to wait when rate limited."""
+
     @staticmethod
-    def get_request_data(response: APIClientResponse) -> Optional[JsonType]:
-        """Attempt to decode the response data."""
-        raw_data = response.get_raw_data()
-        if raw_data == "":
+    def get_exception(response: APIClientResponse) -> APIRequestError:
+        """Get the exception for an error response."""
+        exception = ErrorHandler.get_exception(response)
+        if response.get_status_code() != 429:  # noqa: PLR2004
+            return exception
+        headers = getattr(response.get_original(), "headers", {})
+        return RateLimitError(
+            message=exception.message,
+            status_code=exception.status_code,
+            info=exception.info,
+            retry_after=parse_retry_after(headers.get("Retry-After")),
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def get_response_handler(json_decoder: str) -> Type[JSONResponseHandler]:
+    """Get a response handler that uses the given JSON decoder."""
+    return type(
+        f"{json_decoder.capitalize()}ResponseHandler",
+        (JSONResponseHandler,),
+        {"decoder": staticmethod(get_decoder(json_decoder))},
+    )
+
+
+def get_authentication_method(api_key: Optional[str]) -> BaseAuthenticationMethod:
+    """Get the authentication method to use for the given API key."""
+    if not api_key:
+        return NoAuthentication()
+    return HeaderAuthentication(
+        token=api_key,
+        parameter="X-CW-API-Key",
+        scheme=None,
+    )
+
+
+def unstructure_params(
+    params: Optional[attrs.AttrsInstance],
+) -> Optional[Dict[str, Any]]:
+    """Unstructure query parameters, dropping the ones that are not set."""
+    if params is None:
+        return None
+    params_dict = converter.unstructure(params)
+    return {key: value for key, value in params_dict.items() if value is not None}
+
+
+class BaseClient:
+    """Functionality shared by the synchronous and asynchronous clients."""
+
+    _api_key: Optional[str]
+    _rate_limiter: Optional[AllowanceLimiter]
+    _cache: Optional[ResponseCache]
+    _disk_cache: Optional[DiskCache]
+    _structure_mode: StructureMode
+    _numeric_backend: NumericBackend
+    _json_decoder: str
+    _converter: Converter
+    _planner: BatchPlanner
+    _base_url: str
+    _retry: Optional[RetryPolicy]
+    _hedge: Optional[HedgePolicy]
+    _latencies: LatencyTracker
+
+    @property
+    def is_authenticated(self) -> bool:
+        """Check whether an API has been provided."""
+        return self._api_key is not None
+
+    @property
+    def rate_limiter(self) -> Optional[AllowanceLimiter]:
+        """The limiter that paces the requests of this client, if any."""
+        return self._rate_limiter
+
+    @property
+    def cache(self) -> Optional[ResponseCache]:
+        """The cache that holds the responses of this client, if any."""
+        return self._cache
+
+    @property
+    def disk_cache(self) -> Optional[DiskCache]:
+        """The on-disk cache of response bodies, if any."""
+        return self._disk_cache
+
+    @property
+    def base_url(self) -> str:
+        """The URL the endpoints of the API are requested from."""
+        return self._base_url
+
+    @property
+    def retry(self) -> Optional[RetryPolicy]:
+        """The policy for retrying failed requests, if any."""
+        return self._retry
+
+    @property
+    def hedge(self) -> Optional[HedgePolicy]:
+        """The policy for duplicating slow requests, if any."""
+        return self._hedge
+
+    @property
+    def latencies(self) -> LatencyTracker:
+        """The latencies of the recent requests, when they are hedged."""
+        return self._latencies
+
+    @property
+    def planner(self) -> BatchPlanner:
+        """The planner that chooses how this client requests many markets."""
+        return self._planner
+
+    @property
+    def numeric_backend(self) -> NumericBackend:
+        """How this client represents prices, amounts and other decimal numbers."""
+        return self._numeric_backend
+
+    @property
+    def structure_mode(self) -> StructureMode:
+        """How this client turns responses into Python objects."""
+        return self._structure_mode
+
+    def with_structure(self: ClientT, mode: Union[StructureMode, str]) -> ClientT:
+        """
+        Get a copy of the client that structures responses differently.
+
+        The copy shares its connections, cache and rate limiter with the client.
+        In lazy mode, methods return views with the attributes of the usual models
+        that structure each attribute when it is first read. In raw mode, they
+        return a :class:`~pycwatch.lib.lazy.RawResponse` holding the decoded
+        result.
+
+        Args:
+            mode: The structure mode of the copy.
+
+        Returns:
+            The copy of the client.
+        """
+        client = copy.copy(self)
+        client._structure_mode = StructureMode(mode)
+        return client
+
+    def _format_endpoint(
+        self,
+        endpoint: str,
+        path_params: Optional[attrs.AttrsInstance] = None,
+    ) -> str:
+        """Get the URL of an endpoint on the base URL, with its path parameters."""
+        if self._base_url != BASE_URL and endpoint.startswith(BASE_URL):
+            endpoint = self._base_url + endpoint[len(BASE_URL) :]
+        if path_params is None:
+            return endpoint
+        return endpoint.format(**converter.unstructure(path_params))
+
+    def _get_request_key(
+        self,
+        endpoint: str,
+        response_cls: Type[Any],
+        params: Optional[Dict[str, Any]],
+        path_params: Optional[attrs.AttrsInstance],
+    ) -> CacheKey:
+        """Get the key that identifies a request."""
+        return make_cache_key(
+            endpoint,
+            unstructure_params(path_params),
+            params,
+            response_cls,
+            self._structure_mode,
+            self._numeric_backend,
+        )
+
+    def _get_cached(self, request_key: CacheKey) -> Optional[Any]:
+        """Get a cached response."""
+        if self._cache is None or not self._cache.is_cached(request_key.endpoint):
+            return None
+        return self._cache.get(request_key)
+
+    def _get_stale(self, request_key: CacheKey) -> Optional[Any]:
+        """Get a stale response that may be served while it is refreshed."""
+        if self._cache is None or not self._cache.is_cached(request_key.endpoint):
+            return None
+        return self._cache.get_stale(request_key)
+
+    def _read_disk_cache(
+        self,
+        endpoint: str,
+        url: str,
+        params: Optional[Dict[str, Any]],
+    ) -> Optional[JsonType]:
+        """Get the decoded body of a request from the disk cache."""
+        if self._disk_cache is None or not self._disk_cache.is_cached(endpoint):
             return None
+        body = self._disk_cache.get(endpoint, urlsplit(url).path, params)
+        if body is None:
+            return None
+        return cast(JsonType, get_decoder(self._json_decoder)(body))
+
+    def _write_disk_cache(
+        self,
+        endpoint: str,
+        url: str,
+        params: Optional[Dict[str, Any]],
+        body: bytes,
+    ) -> None:
+        """Store the body of a request in the disk cache."""
+        if self._disk_cache is None:
+            return
+        # a cache that cannot be written to only costs the next request
+        with contextlib.suppress(OSError):
+            self._disk_cache.set(endpoint, urlsplit(url).path, params, body)
+
+    def _set_cached(self, request_key: CacheKey, response: Any) -> None:
+        """Cache a response."""
+        if self._cache is not None:
+            self._cache.set(request_key, response)
+
+    def _update_rate_limiter(self, endpoint: str, response: ResponseRoot[Any]) -> None:
+        """Let the rate limiter know about the allowance returned with a response."""
+        allowance = getattr(response, "allowance", None)
+        if self._rate_limiter is not None and allowance is not None:
+            self._rate_limiter.update(endpoint, allowance)
+
+    def _structure_response(
+        self,
+        response: JsonType,
+        response_cls: Type[ResponseCls],
+    ) -> ResponseCls:
+        """Structure the response."""
+        if self._structure_mode == StructureMode.RAW:
+            return cast(ResponseCls, make_raw_response(response))
+        if self._structure_mode == StructureMode.LAZY:
+            return cast(
+                ResponseCls,
+                make_lazy_response(response, response_cls, self._converter),
+            )
+        try:
+            return self._converter.structure(
+                response,
+                response_cls,
+            )
+        except cattrs.errors.ClassValidationError as exc:
+            msg = f"Failed to structure response: '{response}'"
+            raise ResponseStructureError(msg) from exc
+
+    def _structure_item(self, value: Any, item_cls: Type[ItemT]) -> ItemT:
+        """Structure a member of a streamed result."""
+        if self._structure_mode == StructureMode.RAW:
+            return cast(ItemT, value)
+        if self._structure_mode == StructureMode.LAZY:
+            return cast(ItemT, lazy_structure(value, item_cls, self._converter))
+        try:
+            return self._converter.structure(value, item_cls)
+        except cattrs.errors.ClassValidationError as exc:
+            msg = f"Failed to structure result member: '{value}'"
+            raise ResponseStructureError(msg) from exc
+
+    @staticmethod
+    def _make_columnar_response(
+        response: ResponseRoot[Any],
+        convert: Callable[[Any], ColumnsT],
+    ) -> Response[ColumnsT]:
+        """Convert the result of a raw response into a columnar representation."""
+        raw = cast(RawResponse, response)
+        if raw.allowance is None:
+            msg = f"Failed to structure response: '{raw}'"
+            raise ResponseStructureError(msg)
+        try:
+            result = convert(raw.result)
+        except (AttributeError, KeyError, TypeError, ValueError) as exc:
+            msg = f"Failed to structure result: '{raw.result}'"
+            raise ResponseStructureError(msg) from exc
+        return Response(result=result, allowance=raw.allowance)
+
+    def _observe_call(
+        self,
+        endpoint: str,
+        responses: Sequence[Any],
+        started: float,
+    ) -> None:
+        """Let the planner know about the cost and latency of a call."""
+        costs = [
+            response.allowance.cost
+            for response in responses
+            if getattr(response, "allowance", None) is not None
+        ]
+        self._planner.observe(
+            endpoint,
+            sum(costs) if costs else None,
+            time.perf_counter() - started,
+        )
+
+    @staticmethod
+    def _parse_chunk(
+        parser: ResultStreamParser,
+        chunk: Optional[bytes],
+    ) -> List[Tuple[ResultKey, Any]]:
+        """Feed a chunk to a stream parser, or close it if the chunk is `None`."""
         try:
-            response_json = ujson.loads(raw_data)
-        except ujson.JSONDecodeError as exc:
-            msg = f"Unable to decode response data to json. data='{raw_data}'"
+            return parser.close() if chunk is None else parser.feed(chunk)
+        except ValueError as exc:
+            msg = "Unable to decode streamed response data to json."
             raise ResponseParseError(msg) from exc
-        return response_json
 
+    def _finish_stream(self, endpoint: str, parser: ResultStreamParser) -> None:
+        """Let the rate limiter know about the allowance of a streamed response."""
+        allowance = parser.members.get("allowance")
+        if self._rate_limiter is not None and allowance is not None:
+            self._rate_limiter.update(
+                endpoint,
+                converter.structure(allowance, Allowance),  # type: ignore[arg-type]
+            )
+
+
+class CryptoWatchClient(BaseClient, APIClient):
+    """The CryptoWatch client class.
 
-class CryptoWatchClient(APIClient):
-    """The CryptoWatch client class."""
+    Requests are sent through a ``requests`` session whose connection pool keeps
+    connections alive between requests and is shared by all threads that use the
+    client. The pool can be sized for the number of threads, and warmed up so
+    that the first requests do not pay for the TLS handshake. Pass a session to
+    share one pool between clients, and a base URL to send the requests to a
+    proxy instead of the API.
+    """
 
-    def __init__(self, api_key: Optional[str] = None) -> None:
+    def __init__(  # noqa: PLR0913
+        self,
+        api_key: Optional[str] = None,
+        *,
+        base_url: str = BASE_URL,
+        session: Optional[requests.Session] = None,
+        pool_connections: int = DEFAULT_POOLSIZE,
+        pool_maxsize: int = DEFAULT_POOLSIZE,
+        pool_block: bool = False,
+        timeout: float = DEFAULT_TIMEOUT,
+        prewarm: int = 0,
+        retry: Optional[RetryPolicy] = None,
+        hedge: Optional[HedgePolicy] = None,
+        rate_limiter: Optional[AllowanceLimiter] = None,
+        cache: Optional[ResponseCache] = None,
+        disk_cache: Optional[DiskCache] = None,
+        coalesce_requests: bool = True,
+        json_decoder: str = AUTO,
+        structure_mode: Union[StructureMode, str] = StructureMode.EAGER,
+        numeric_backend: Union[NumericBackend, str] = NumericBackend.DECIMAL,
+    ) -> None:
         api_key = api_key or settings.CW_API_KEY
         self._api_key = api_key
-        if not api_key:
-            authentication_method = NoAuthentication()
-        else:
-            authentication_method = HeaderAuthentication(
-                token=api_key,
-                parameter="X-CW-API-Key",
-                scheme=None,
-            )
+        self._base_url = base_url.rstrip("/")
+        self._timeout = timeout
+        self._pool_connections = pool_connections
+        self._pool_block = pool_block
+        self._retry = retry
+        self._hedge = hedge
+        self._latencies = LatencyTracker()
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+        self._refresh_executor: Optional[ThreadPoolExecutor] = None
+        self._rate_limiter = rate_limiter
+        self._cache = cache
+        self._disk_cache = disk_cache
+        self._structure_mode = StructureMode(structure_mode)
+        self._numeric_backend = NumericBackend(numeric_backend)
+        self._converter = get_converter(self._numeric_backend)
+        self._json_decoder = json_decoder
+        self._single_flight = SingleFlight() if coalesce_requests else None
+        self._planner = BatchPlanner()
+        self._pool_lock = threading.Lock()
 
         super().__init__(
-            response_handler=UJSONResponseHandler,
-            authentication_method=authentication_method,
+            response_handler=get_response_handler(json_decoder),
+            authentication_method=get_authentication_method(api_key),
+            error_handler=APIErrorHandler,
         )
+        self._owns_session = session is None
+        if session is None:
+            self._mount_connection_pool(pool_maxsize)
+        else:
+            self.set_session(session)
+        if prewarm:
+            self.prewarm(prewarm)
 
-    @property
-    def is_authenticated(self) -> bool:
-        """Check whether an API has been provided."""
-        return self._api_key is not None
+    def __enter__(self: ClientT) -> ClientT:
+        """Enter the client context."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        """Close the client when leaving the context."""
+        self.close()
+
+    def close(self) -> None:
+        """
+        Stop the background threads and close the connection pool.
+
+        Requests still in flight in the background are finished, but no new ones
+        are started. A session that was passed in is left open.
+        """
+        with self._pool_lock:
+            executors = (self._refresh_executor, self._hedge_executor)
+            self._refresh_executor = self._hedge_executor = None
+        for executor in executors:
+            if executor is not None:
+                executor.shutdown(wait=False)
+        if self._owns_session:
+            self.get_session().close()
+
+    def get_request_timeout(self) -> float:
+        """Get the seconds to wait for the server to respond."""
+        return self._timeout
+
+    def prewarm(self, connections: int = 1) -> None:
+        """
+        Open connections to the API so that later requests can reuse them.
+
+        The root of the API, which does not use any allowance, is requested from
+        several threads that hold on to their connection until all are open, and
+        then return them to the pool.
+
+        Args:
+            connections: The number of connections to open.
+        """
+        self._grow_connection_pool(connections)
+        session = self.get_session()
+        url = self._format_endpoint(Endpoint.root)
+        opened = threading.Barrier(connections)
+
+        def connect(_: int) -> None:
+            with session.get(url, timeout=self._timeout, stream=True) as response:
+                with contextlib.suppress(threading.BrokenBarrierError):
+                    opened.wait(self._timeout)
+                response.content  # noqa: B018
+
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            list(executor.map(connect, range(connections)))
 
     def get_info(self) -> ResponseRoot[Info]:
         """Get the allowance and status information by requesting root."""
@@ -113,8 +618,9 @@ class CryptoWatchClient(APIClient):
     def get_asset(self, asset_code: str) -> Response[Asset]:
         """Get information about a specific asset."""
         return self._make_request(
-            Endpoint.asset_detail.format(assetCode=asset_code),
+            Endpoint.asset_detail,
             Response[Asset],
+            path_params=AssetPathParams(asset_code=asset_code),
         )
 
     def list_pairs(
@@ -133,8 +639,9 @@ class CryptoWatchClient(APIClient):
     def get_pair(self, pair: str) -> Response[Pair]:
         """Get information about a specific pair."""
         return self._make_request(
-            Endpoint.pair_detail.format(pair=pair),
+            Endpoint.pair_detail,
             Response[Pair],
+            path_params=PairPathParams(pair=pair),
         )
 
     def list_markets(
@@ -153,15 +660,17 @@ class CryptoWatchClient(APIClient):
     def get_market(self, exchange: str, pair: str) -> Response[Market]:
         """Get information about a specific market."""
         return self._make_request(
-            Endpoint.market_detail.format(exchange=exchange, pair=pair),
+            Endpoint.market_detail,
             Response[Market],
+            path_params=MarketPathParams(exchange=exchange, pair=pair),
         )
 
     def get_market_price(self, exchange: str, pair: str) -> Response[MarketPrice]:
         """Get the last available price for a market."""
         return self._make_request(
-            Endpoint.market_price.format(exchange=exchange, pair=pair),
+            Endpoint.market_price,
             Response[MarketPrice],
+            path_params=MarketPathParams(exchange=exchange, pair=pair),
         )
 
     def get_all_market_prices(
@@ -187,9 +696,10 @@ class CryptoWatchClient(APIClient):
         """Get recent trades for a market."""
         params = TradeQueryParams(since=since, limit=limit)
         return self._make_request(
-            Endpoint.list_market_trades.format(exchange=exchange, pair=pair),
+            Endpoint.list_market_trades,
             Response[MarketTradeList],
             params=params,
+            path_params=MarketPathParams(exchange=exchange, pair=pair),
         )
 
     def get_market_summary(
@@ -209,8 +719,9 @@ class CryptoWatchClient(APIClient):
         - Quote volume
         """
         return self._make_request(
-            Endpoint.market_summary.format(exchange=exchange, pair=pair),
+            Endpoint.market_summary,
             Response[MarketSummary],
+            path_params=MarketPathParams(exchange=exchange, pair=pair),
         )
 
     def get_all_market_summaries(
@@ -232,6 +743,142 @@ class CryptoWatchClient(APIClient):
             params=params,
         )
 
+    def get_market_prices(
+        self,
+        markets: Iterable[MarketKey],
+        max_workers: int = DEFAULT_CONCURRENCY,
+        errors: Optional[Dict[MarketKey, Exception]] = None,
+    ) -> AllPrices:
+        """
+        Get the prices of several markets with the cheapest requests.
+
+        The markets are requested one by one in a thread pool, or the prices of all
+        markets are requested at once when that costs less of the allowance.
+
+        Args:
+            markets: The exchange and pair of each market.
+            max_workers: The number of single requests that run at the same time.
+            errors: If given, the markets whose own request fails are left out and
+                their exception is stored here by market, instead of raised.
+
+        Returns:
+            The prices keyed like :meth:`get_all_market_prices`, without the
+            markets the bulk endpoint does not list.
+        """
+        keys = list(dict.fromkeys(markets))
+        plan = self._planner.plan(
+            Endpoint.market_price,
+            Endpoint.all_market_prices,
+            len(keys),
+            max_workers,
+        )
+        if not plan.bulk:
+            responses = self._map_markets(
+                self.get_market_price,
+                Endpoint.market_price,
+                keys,
+                max_workers,
+                errors,
+            )
+            return {
+                price_key(key): r.result.price
+                for key, r in zip(keys, responses)
+                if r is not None
+            }
+
+        started = time.perf_counter()
+        pages = list(iter_pages(self.get_all_market_prices))
+        self._observe_call(Endpoint.all_market_prices, pages, started)
+        names = {price_key(key) for key in keys}
+        return {
+            name: price
+            for page in pages
+            for name, price in page.result.items()
+            if name in names
+        }
+
+    def get_market_summaries(
+        self,
+        markets: Iterable[MarketKey],
+        max_workers: int = DEFAULT_CONCURRENCY,
+        errors: Optional[Dict[MarketKey, Exception]] = None,
+    ) -> AllSummaries:
+        """
+        Get the 24h summaries of several markets with the cheapest requests.
+
+        Like :meth:`get_market_prices`, but for summaries.
+
+        Args:
+            markets: The exchange and pair of each market.
+            max_workers: The number of single requests that run at the same time.
+            errors: If given, the markets whose own request fails are left out and
+                their exception is stored here by market, instead of raised.
+
+        Returns:
+            The summaries keyed like :meth:`get_all_market_summaries`, without the
+            markets the bulk endpoint does not list.
+        """
+        keys = list(dict.fromkeys(markets))
+        plan = self._planner.plan(
+            Endpoint.market_summary,
+            Endpoint.all_market_summaries,
+            len(keys),
+            max_workers,
+        )
+        if not plan.bulk:
+            responses = self._map_markets(
+                self.get_market_summary,
+                Endpoint.market_summary,
+                keys,
+                max_workers,
+                errors,
+            )
+            return {
+                summary_key(key): r.result
+                for key, r in zip(keys, responses)
+                if r is not None
+            }
+
+        started = time.perf_counter()
+        response = self.get_all_market_summaries()
+        self._observe_call(Endpoint.all_market_summaries, [response], started)
+        names = {summary_key(key) for key in keys}
+        return {
+            name: summary for name, summary in response.result.items() if name in names
+        }
+
+    def map(
+        self,
+        method: Callable[..., T],
+        arg_list: Iterable[Any],
+        max_workers: int = DEFAULT_CONCURRENCY,
+        deadline: Optional[float] = None,
+    ) -> Iterator[MapResult[T]]:
+        """
+        Call a method of the client for each item of an argument list.
+
+        The calls run in a thread pool and share the connections of the client,
+        whose pool grows to keep a connection for each worker unless the session
+        was passed in. An exception only fails its own call, and calls that miss
+        the deadline, which counts from this call, are given up on instead of
+        waited for.
+
+        Args:
+            method: The method to call, e.g. ``client.get_market_summary``.
+            arg_list: A tuple of positional arguments, or a single argument, per
+                call.
+            max_workers: The number of calls that run at the same time.
+            deadline: The seconds after which unfinished calls are given up on, or
+                `None` to wait for all calls.
+
+        Yields:
+            The outcome of each call as it finishes, with the result or the
+            exception of the call. Calls that missed the deadline come last, with
+            a :class:`~pycwatch.lib.exceptions.DeadlineExceededError`.
+        """
+        self._grow_connection_pool(max_workers)
+        return fan_out(method, arg_list, max_workers, deadline)
+
     def get_market_order_book(  # noqa: PLR0913
         self,
         exchange: str,
@@ -243,11 +890,30 @@ class CryptoWatchClient(APIClient):
         """Get the order book for a specific market."""
         params = OrderBookQueryParams(depth=depth, span=span, limit=limit)
         return self._make_request(
-            Endpoint.market_orderbook.format(exchange=exchange, pair=pair),
+            Endpoint.market_orderbook,
             Response[OrderBook],
             params=params,
+            path_params=MarketPathParams(exchange=exchange, pair=pair),
         )
 
+    def get_columnar_order_book(  # noqa: PLR0913
+        self,
+        exchange: str,
+        pair: str,
+        depth: Optional[int] = None,
+        span: Optional[float] = None,
+        limit: Optional[int] = None,
+    ) -> Response[ColumnarOrderBook]:
+        """Get the order book for a specific market as arrays of prices and amounts."""
+        params = OrderBookQueryParams(depth=depth, span=span, limit=limit)
+        response = self.with_structure(StructureMode.RAW)._make_request(
+            Endpoint.market_orderbook,
+            Response[OrderBook],
+            params=params,
+            path_params=MarketPathParams(exchange=exchange, pair=pair),
+        )
+        return self._make_columnar_response(response, ColumnarOrderBook.from_result)
+
     def get_market_order_book_liquidity(
         self,
         exchange: str,
@@ -255,8 +921,9 @@ class CryptoWatchClient(APIClient):
     ) -> Response[OrderBookLiquidity]:
         """Get liquidity sums at several basis point levels in the order book."""
         return self._make_request(
-            Endpoint.market_orderbook_liquidity.format(exchange=exchange, pair=pair),
+            Endpoint.market_orderbook_liquidity,
             Response[OrderBookLiquidity],
+            path_params=MarketPathParams(exchange=exchange, pair=pair),
         )
 
     def calculate_quote(
@@ -268,9 +935,10 @@ class CryptoWatchClient(APIClient):
         """Get a live quote from the order book for a given buy & sell amount."""
         params = OrderBookCalculatorQueryParams(amount=amount)
         return self._make_request(
-            Endpoint.market_orderbook_calculator.format(exchange=exchange, pair=pair),
+            Endpoint.market_orderbook_calculator,
             Response[OrderBookCalculator],
             params=params,
+            path_params=MarketPathParams(exchange=exchange, pair=pair),
         )
 
     def get_ohlcv(  # noqa: PLR0913
@@ -288,9 +956,54 @@ class CryptoWatchClient(APIClient):
             periods=periods,
         )
         return self._make_request(
-            Endpoint.market_ohlc.format(exchange=exchange, pair=pair),
+            Endpoint.market_ohlc,
+            Response[OHLCVDict],
+            params=params,
+            path_params=MarketPathParams(exchange=exchange, pair=pair),
+        )
+
+    def get_ohlcv_arrays(  # noqa: PLR0913
+        self,
+        exchange: str,
+        pair: str,
+        before: Optional[int] = None,
+        after: Optional[int] = None,
+        periods: Optional[List[Union[str, int]]] = None,
+        numeric_backend: Union[NumericBackend, str] = NumericBackend.FLOAT,
+    ) -> "Response[OHLCVArrays]":
+        """
+        Get a market's OHLCV candlestick data as NumPy structured arrays.
+
+        The candles of each period are converted straight from the decoded JSON,
+        without creating an object per candle. Requires NumPy.
+
+        Args:
+            exchange: The exchange of the market.
+            pair: The pair of the market.
+            before: Only return candles opening before this time.
+            after: Only return candles opening after this time.
+            periods: Only return these periods.
+            numeric_backend: ``float`` for float64 prices and volumes, or
+                ``fixed`` for int64 in units of 1e-8.
+
+        Returns:
+            The response, with a structured array of candles for each period.
+        """
+        ohlcv_dtype(numeric_backend)
+        params = OHLCVQueryParams(
+            before=before,
+            after=after,
+            periods=periods,
+        )
+        response = self.with_structure(StructureMode.RAW)._make_request(
+            Endpoint.market_ohlc,
             Response[OHLCVDict],
             params=params,
+            path_params=MarketPathParams(exchange=exchange, pair=pair),
+        )
+        return self._make_columnar_response(
+            response,
+            functools.partial(ohlcv_arrays, numeric_backend=numeric_backend),
         )
 
     def list_exchanges(self) -> Response[ExchangeList]:
@@ -300,41 +1013,306 @@ class CryptoWatchClient(APIClient):
     def get_exchange(self, exchange: str) -> Response[Exchange]:
         """Get information about a specific exchange."""
         return self._make_request(
-            Endpoint.exchange_detail.format(exchange=exchange),
+            Endpoint.exchange_detail,
             Response[Exchange],
+            path_params=ExchangePathParams(exchange=exchange),
         )
 
     def list_exchange_markets(self, exchange: str) -> Response[ExchangeMarkets]:
         """List all markets available on a given exchange."""
         return self._make_request(
-            Endpoint.exchange_markets.format(exchange=exchange),
+            Endpoint.exchange_markets,
             Response[ExchangeMarkets],
+            path_params=ExchangePathParams(exchange=exchange),
         )
 
+    def iter_assets(self, limit: Optional[int] = None) -> Iterator[AssetMember]:
+        """Iterate over all assets, following the pagination cursor.
+
+        `limit` sets the page size. The next page is fetched while the current
+        one is being consumed.
+        """
+        for page in iter_pages(lambda cursor: self.list_assets(cursor, limit)):
+            yield from page.result
+
+    def iter_pairs(self, limit: Optional[int] = None) -> Iterator[PairMember]:
+        """Iterate over all pairs, following the pagination cursor."""
+        for page in iter_pages(lambda cursor: self.list_pairs(cursor, limit)):
+            yield from page.result
+
+    def iter_markets(self, limit: Optional[int] = None) -> Iterator[MarketMember]:
+        """Iterate over all markets, following the pagination cursor."""
+        for page in iter_pages(lambda cursor: self.list_markets(cursor, limit)):
+            yield from page.result
+
+    def iter_market_prices(
+        self,
+        limit: Optional[int] = None,
+    ) -> Iterator[Tuple[str, Price]]:
+        """Iterate over all market prices, following the pagination cursor."""
+        pages = iter_pages(lambda cursor: self.get_all_market_prices(cursor, limit))
+        for page in pages:
+            yield from page.result.items()
+
+    def stream_all_market_summaries(
+        self,
+        key_by: Optional[str] = None,
+    ) -> Iterator[Tuple[str, MarketSummary]]:
+        """Stream the 24h summaries of all markets while they are received."""
+        params = MarketSummariesQueryParams(key_by=key_by)
+        for key, summary in self._stream_request(
+            Endpoint.all_market_summaries,
+            MarketSummary,
+            params=params,
+        ):
+            yield str(key), summary
+
+    def stream_all_market_prices(self) -> Iterator[Tuple[str, Price]]:
+        """Stream the prices of all markets while they are received."""
+        for key, price in self._stream_request(Endpoint.all_market_prices, Price):
+            yield str(key), price
+
+    def stream_markets(self) -> Iterator[MarketMember]:
+        """Stream all markets while they are received."""
+        for _, market in self._stream_request(Endpoint.list_markets, MarketMember):
+            yield market
+
     def _make_request(
         self,
         endpoint: str,
         response_cls: Type[ResponseCls],
         params: Optional[attrs.AttrsInstance] = None,
+        path_params: Optional[attrs.AttrsInstance] = None,
     ) -> ResponseCls:
-        """Make a request to the API."""
-        params_dict = converter.unstructure(params) if params else None
-        return self._structure_response(
-            self.get(endpoint, params=params_dict),
+        """Make a request to the API.
+
+        Cached responses are returned right away and identical requests that are
+        in flight at the same time share a single call to the API.
+        """
+        params_dict = unstructure_params(params)
+        request_key = self._get_request_key(
+            endpoint,
             response_cls,
+            params_dict,
+            path_params,
         )
+        cached = self._get_cached(request_key)
+        if cached is not None:
+            return cast(ResponseCls, cached)
 
-    def _structure_response(
+        def send() -> ResponseCls:
+            url = self._format_endpoint(endpoint, path_params)
+            stored = self._read_disk_cache(endpoint, url, params_dict)
+            response = self._structure_response(
+                self._send_get(endpoint, url, params_dict)
+                if stored is None
+                else stored,
+                response_cls,
+            )
+            if stored is None:
+                self._update_rate_limiter(endpoint, response)
+            self._set_cached(request_key, response)
+            return response
+
+        stale = self._get_stale(request_key)
+        if stale is not None:
+            self._revalidate(request_key, send)
+            return cast(ResponseCls, stale)
+        if self._single_flight is None:
+            return send()
+        return self._single_flight.do(request_key, send)
+
+    def _revalidate(self, request_key: CacheKey, send: Callable[[], Any]) -> None:
+        """Refresh a stale response in the background, unless it already is."""
+        cache = self._cache
+        if cache is None or not cache.begin_refresh(request_key):
+            return
+
+        def refresh() -> None:
+            failed = True
+            try:
+                send()
+                failed = False
+            except Exception as exc:  # noqa: BLE001
+                # the caller has already been served
+                logger.warning("Refreshing %s failed: %r", request_key, exc)
+            finally:
+                cache.end_refresh(request_key, failed=failed)
+
+        with self._pool_lock:
+            if self._refresh_executor is None:
+                self._refresh_executor = ThreadPoolExecutor(
+                    max_workers=REFRESH_WORKERS,
+                    thread_name_prefix="pycwatch-refresh",
+                )
+            executor = self._refresh_executor
+        executor.submit(refresh)
+
+    def _send_get(
         self,
-        response: JsonType,
-        response_cls: Type[ResponseCls],
-    ) -> ResponseCls:
-        """Structure the response."""
+        endpoint: str,
+        url: str,
+        params: Optional[Dict[str, Any]],
+    ) -> Any:
+        """Send a GET request, with the retries and hedging of the client."""
+
+        def attempt() -> Any:
+            if self._rate_limiter is not None:
+                self._rate_limiter.acquire(endpoint)
+            if self._disk_cache is not None and self._disk_cache.is_cached(endpoint):
+                return self._get_and_store(endpoint, url, params)
+            # the request strategy adds the authentication to the params in place
+            return self.get(url, params=None if params is None else dict(params))
+
+        hedge = self._hedge
+        call = attempt
+        if hedge is not None:
+            call = functools.partial(self._hedged, hedge, endpoint, attempt)
+        if self._retry is None:
+            return call()
+        return retry_call(call, self._retry)
+
+    def _get_and_store(
+        self,
+        endpoint: str,
+        url: str,
+        params: Optional[Dict[str, Any]],
+    ) -> Optional[JsonType]:
+        """Send a GET request and store the undecoded body in the disk cache."""
+        params_dict = self.get_default_query_params()
+        params_dict.update(params or {})
         try:
-            return converter.structure(
-                response,
-                response_cls,
+            response = self.get_session().get(
+                url,
+                params=params_dict,
+                headers=self.get_default_headers(),
+                timeout=self.get_request_timeout(),
             )
-        except cattrs.errors.ClassValidationError as exc:
-            msg = f"Failed to structure response: '{response}'"
-            raise ResponseStructureError(msg) from exc
+        except requests.RequestException as exc:
+            msg = f"Error when contacting '{url}'"
+            raise UnexpectedError(msg) from exc
+        status_code = response.status_code
+        if status_code < 200 or status_code >= 300:  # noqa: PLR2004
+            raise self.get_error_handler().get_exception(RequestsResponse(response))
+        self._write_disk_cache(endpoint, url, params, response.content)
+        return decode_response(
+            RequestsResponse(response), get_decoder(self._json_decoder)
+        )
+
+    def _hedged(
+        self,
+        hedge: HedgePolicy,
+        endpoint: str,
+        attempt: Callable[[], T],
+    ) -> T:
+        """Make an attempt, and a duplicate if it is slower than usual."""
+
+        def timed() -> T:
+            # each attempt is timed on its own, as timing the hedged call would
+            # raise the quantile with every duplicate
+            started = time.perf_counter()
+            result = attempt()
+            self._latencies.observe(endpoint, time.perf_counter() - started)
+            return result
+
+        delay = hedge.delay(self._latencies, endpoint)
+        if delay is None:
+            return timed()
+        with self._pool_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(
+                    max_workers=hedge.max_workers,
+                    thread_name_prefix="pycwatch-hedge",
+                )
+            executor = self._hedge_executor
+        return hedged_call(timed, delay, executor)
+
+    def _map_markets(  # noqa: PLR0913
+        self,
+        method: Callable[[str, str], ResponseT],
+        endpoint: str,
+        keys: List[MarketKey],
+        max_workers: int,
+        errors: Optional[Dict[MarketKey, Exception]] = None,
+    ) -> List[Optional[ResponseT]]:
+        """Call a single market method for each market in a thread pool."""
+
+        def call(key: MarketKey) -> Optional[ResponseT]:
+            started = time.perf_counter()
+            try:
+                response = method(*key)
+            except Exception as exc:  # noqa: BLE001
+                if errors is None:
+                    raise
+                errors[key] = exc
+                return None
+            self._observe_call(endpoint, [response], started)
+            return response
+
+        if len(keys) <= 1 or max_workers <= 1:
+            return [call(key) for key in keys]
+        self._grow_connection_pool(max_workers)
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(keys))) as executor:
+            return list(executor.map(call, keys))
+
+    def _mount_connection_pool(self, pool_maxsize: int) -> None:
+        """Mount an adapter that keeps a number of connections per host alive."""
+        adapter = HTTPAdapter(
+            pool_connections=self._pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=self._pool_block,
+        )
+        session = self.get_session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+
+    def _grow_connection_pool(self, size: int) -> None:
+        """Make sure the session can keep a connection for each of several threads.
+
+        A session that was passed in is used as is. The connections of the
+        smaller pool are closed.
+        """
+        if not self._owns_session:
+            return
+        with self._pool_lock:
+            adapter = self.get_session().get_adapter(self._base_url)
+            if getattr(adapter, "_pool_maxsize", DEFAULT_POOLSIZE) < size:
+                self._mount_connection_pool(size)
+                adapter.close()
+
+    def _stream_request(
+        self,
+        endpoint: str,
+        item_cls: Type[ItemT],
+        params: Optional[attrs.AttrsInstance] = None,
+    ) -> Iterator[Tuple[ResultKey, ItemT]]:
+        """Make a request to the API and parse the result while it is received.
+
+        Streamed responses are neither cached nor coalesced.
+        """
+        params_dict = self.get_default_query_params()
+        params_dict.update(unstructure_params(params) or {})
+        if self._rate_limiter is not None:
+            self._rate_limiter.acquire(endpoint)
+        try:
+            response = self.get_session().get(
+                self._format_endpoint(endpoint),
+                params=params_dict,
+                headers=self.get_default_headers(),
+                timeout=self.get_request_timeout(),
+                stream=True,
+            )
+        except requests.RequestException as exc:
+            msg = f"Error when contacting '{endpoint}'"
+            raise UnexpectedError(msg) from exc
+        parser = ResultStreamParser(parse_float=get_parse_float(self._json_decoder))
+        with response:
+            status_code = response.status_code
+            if status_code < 200 or status_code >= 300:  # noqa: PLR2004
+                raise self.get_error_handler().get_exception(RequestsResponse(response))
+            for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+                for key, value in self._parse_chunk(parser, chunk):
+                    yield key, self._structure_item(value, item_cls)
+        for key, value in self._parse_chunk(parser, None):
+            yield key, self._structure_item(value, item_cls)
+        self._finish_stream(endpoint, parser)
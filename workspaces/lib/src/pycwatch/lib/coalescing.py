@@ -0,0 +1,117 @@
+"""Coalescing of identical concurrent requests."""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+import attrs
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Share one call between threads that make it at the same time.
+
+    The first caller for a key runs the function, callers that arrive while it is in
+    flight wait for it and receive the same result or exception.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, "Future[Any]"] = {}
+
+    def do(self, key: Hashable, func: Callable[[], T]) -> T:
+        """
+        Run a function, unless a call with the same key is already in flight.
+
+        Args:
+            key: Identifies calls that are interchangeable.
+            func: The function to run.
+
+        Returns:
+            The result of the function, possibly from a call made by another thread.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = Future()
+                leader = True
+            else:
+                leader = False
+        if not leader:
+            return call.result()  # type: ignore[no-any-return]
+
+        try:
+            result = func()
+        except BaseException as exc:
+            call.set_exception(exc)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+@attrs.define()
+class _Flight:
+    """A call in flight and the number of tasks waiting for it."""
+
+    task: "asyncio.Future[Any]"
+    waiters: int = 0
+
+
+class AsyncSingleFlight:
+    """
+    Share one call between tasks that make it at the same time.
+
+    Like :class:`SingleFlight`, but for coroutines running on one event loop. The
+    call runs in a task of its own, so a waiting task that is cancelled does not
+    cancel it for the others. It is only cancelled when every task waiting for it
+    has been cancelled.
+    """
+
+    def __init__(self) -> None:
+        self._flights: Dict[Hashable, _Flight] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        Await a coroutine function, unless a call with the same key is in flight.
+
+        Args:
+            key: Identifies calls that are interchangeable.
+            func: The coroutine function to await.
+
+        Returns:
+            The result of the call, possibly from a call made by another task.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight(asyncio.ensure_future(func()))
+            flight.task.add_done_callback(functools.partial(self._finish, key, flight))
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1:
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _finish(
+        self,
+        key: Hashable,
+        flight: _Flight,
+        task: "asyncio.Future[Any]",
+    ) -> None:
+        """Forget a finished call."""
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # the exception is raised in the waiting tasks, if any are left
+        if not task.cancelled():
+            task.exception()
@@ -1,19 +1,75 @@
 """The converter for converting between Python objects and JSON."""
 
+import enum
+import functools
 import sys
 from decimal import Decimal
-from typing import Any, Callable, Dict, List, Mapping, Type
+from typing import Any, Callable, Dict, List, Mapping, Tuple, Type, Union
 
 if sys.version_info < (3, 8):
-    from typing_extensions import Protocol
+    from typing_extensions import Protocol, get_args, get_origin
 else:
-    from typing import Protocol
+    from typing import Protocol, get_args, get_origin
 
 import attrs
+from cattrs import Converter
 from cattrs.gen import make_dict_structure_fn, make_dict_unstructure_fn, override
-from cattrs.preconf.ujson import make_converter
+from cattrs.preconf.ujson import UjsonConverter, make_converter
 
-converter = make_converter()
+FIXED_POINT_DIGITS = 8
+FIXED_POINT_SCALE = 10**FIXED_POINT_DIGITS
+
+
+class NumericBackend(str, enum.Enum):
+    """
+    How prices, amounts and other decimal numbers are represented.
+
+    ``decimal`` gives exact :class:`~decimal.Decimal` values, ``float`` is the
+    fastest, and ``fixed`` gives integers scaled by ``FIXED_POINT_SCALE``, i.e.
+    in units of 1e-8, which are compact and can be summed exactly.
+
+    The fields of the models are annotated as ``Decimal`` whichever backend is
+    used, so with ``float`` and ``fixed`` they hold ``float`` and ``int`` values
+    that static type checkers still take for ``Decimal``.
+    """
+
+    DECIMAL = "decimal"
+    FLOAT = "float"
+    FIXED = "fixed"
+
+
+# functions converting a decoded number, which is already a Decimal when the
+# response was decoded losslessly; fixed point numbers are scaled as decimals,
+# since scaling a float rounds large numbers
+_NUMBER_CONVERTERS: Dict[NumericBackend, Callable[[Any], Any]] = {
+    NumericBackend.DECIMAL: lambda v: v if type(v) is Decimal else Decimal(str(v)),
+    NumericBackend.FLOAT: float,
+    NumericBackend.FIXED: lambda v: round(
+        (v if type(v) is Decimal else Decimal(str(v))) * FIXED_POINT_SCALE
+    ),
+}
+# the same conversions, inlined into generated code
+_NUMBER_EXPRESSIONS: Dict[NumericBackend, str] = {
+    NumericBackend.DECIMAL: (
+        "({value} if type({value}) is Decimal else Decimal(str({value})))"
+    ),
+    NumericBackend.FLOAT: "float({value})",
+    NumericBackend.FIXED: (
+        "round(({value} if type({value}) is Decimal"
+        " else Decimal(str({value}))) * SCALE)"
+    ),
+}
+_NAMESPACE: Dict[str, Any] = {"Decimal": Decimal, "SCALE": FIXED_POINT_SCALE}
+
+
+def fixed_to_decimal(value: int) -> Decimal:
+    """
+    Convert a fixed point number to a decimal.
+
+    >>> fixed_to_decimal(2407950000000)
+    Decimal('24079.50000000')
+    """
+    return Decimal(value).scaleb(-FIXED_POINT_DIGITS)
 
 
 def to_cwatch_key(field_name: str) -> str:
@@ -33,7 +89,10 @@ def to_cwatch_key(field_name: str) -> str:
     )
 
 
-def _to_alias_unstructure(cls: Type[Any]) -> Callable[[Any], Dict[str, Any]]:
+def _to_alias_unstructure(
+    cls: Type[Any],
+    converter: Converter,
+) -> Callable[[Any], Dict[str, Any]]:
     """Unstructure hook using alias."""
     return make_dict_unstructure_fn(
         cls,
@@ -44,6 +103,7 @@ def _to_alias_unstructure(cls: Type[Any]) -> Callable[[Any], Dict[str, Any]]:
 
 def _to_alias_structure(
     cls: Type[Any],
+    converter: Converter,
 ) -> Callable[[Mapping[str, Any], Any], Callable[[Any, Any], Any]]:
     """Structure hook using alias."""
     return make_dict_structure_fn(
@@ -61,16 +121,117 @@ class IsList(Protocol):
         """Create an instance from a list."""
 
 
-def _structure_from_list(value: Any, type_: Type[IsList]) -> IsList:
-    """Structure hook using from_list."""
-    return type_.from_list(value)
+# expressions converting the items of a row to the types of the fields
+_ROW_FIELD_EXPRESSIONS: Dict[Any, str] = {
+    int: "int(row[{index}])",
+    str: "str(row[{index}])",
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _make_row_converters(
+    type_: Type[IsList],
+    numeric_backend: NumericBackend,
+) -> Tuple[Callable[[List[Any]], IsList], Callable[[List[List[Any]]], List[IsList]]]:
+    """
+    Generate functions that structure one row and a whole list of rows.
+
+    The items of a row are the fields of the model, in order. The conversion of
+    each field is inlined into the generated code, so a list of rows is structured
+    in a single comprehension instead of dispatching for every row and field.
+    """
+    expressions = {
+        **_ROW_FIELD_EXPRESSIONS,
+        Decimal: _NUMBER_EXPRESSIONS[numeric_backend].format(value="row[{index}]"),
+    }
+    arguments = ", ".join(
+        expressions.get(field.type, "row[{index}]").format(index=index)
+        for index, field in enumerate(attrs.fields(type_))  # type: ignore[arg-type]
+    )
+    source = (
+        f"def convert_row(row):\n"
+        f"    return cls({arguments})\n"
+        f"def convert_rows(rows):\n"
+        f"    return [cls({arguments}) for row in rows]\n"
+    )
+    namespace: Dict[str, Any] = {**_NAMESPACE, "cls": type_}
+    exec(compile(source, f"<rows {type_.__name__}>", "exec"), namespace)  # noqa: S102
+    return namespace["convert_row"], namespace["convert_rows"]
+
+
+def _is_row(type_: Any) -> bool:
+    """Check whether a type is a model that is decoded from a list."""
+    return hasattr(type_, "from_list")
+
+
+def _is_row_list(type_: Any) -> bool:
+    """Check whether a type is a list of models that are decoded from lists."""
+    args = get_args(type_)
+    return get_origin(type_) in (list, List) and bool(args) and _is_row(args[0])
+
+
+def create_converter(
+    numeric_backend: Union[NumericBackend, str] = NumericBackend.DECIMAL,
+) -> UjsonConverter:
+    """
+    Create a converter for the models of the API.
+
+    Args:
+        numeric_backend: How decimal numbers are structured.
+
+    Returns:
+        A new converter.
+    """
+    backend = NumericBackend(numeric_backend)
+    new_converter = make_converter()
+
+    def structure_from_list(value: Any, type_: Type[IsList]) -> IsList:
+        """Structure hook using from_list."""
+        convert_row, _ = _make_row_converters(type_, backend)
+        return convert_row(value)
+
+    def make_rows_structure_fn(
+        type_: Type[List[IsList]],
+    ) -> Callable[[List[List[Any]], Any], List[IsList]]:
+        """Structure hook factory converting a whole list of rows in one loop."""
+        _, convert_rows = _make_row_converters(get_args(type_)[0], backend)
+        return lambda rows, _: convert_rows(rows)
+
+    new_converter.register_unstructure_hook_factory(
+        attrs.has,
+        functools.partial(_to_alias_unstructure, converter=new_converter),
+    )
+    new_converter.register_structure_hook_factory(
+        attrs.has,
+        functools.partial(_to_alias_structure, converter=new_converter),
+    )
+    convert_number = _NUMBER_CONVERTERS[backend]
+    new_converter.register_structure_hook(Decimal, lambda v, _: convert_number(v))
+    new_converter.register_unstructure_hook(Decimal, lambda v: str(v))
+    new_converter.register_structure_hook_func(_is_row, structure_from_list)
+    new_converter.register_structure_hook_factory(_is_row_list, make_rows_structure_fn)
+    return new_converter
+
+
+@functools.lru_cache(maxsize=None)
+def _get_converter(numeric_backend: NumericBackend) -> UjsonConverter:
+    """Get the shared converter of a numeric backend."""
+    return create_converter(numeric_backend)
+
+
+def get_converter(
+    numeric_backend: Union[NumericBackend, str] = NumericBackend.DECIMAL,
+) -> UjsonConverter:
+    """
+    Get the shared converter for a numeric backend.
+
+    Args:
+        numeric_backend: How decimal numbers are structured.
+
+    Returns:
+        The converter, created on first use.
+    """
+    return _get_converter(NumericBackend(numeric_backend))
 
 
-converter.register_unstructure_hook_factory(attrs.has, _to_alias_unstructure)
-converter.register_structure_hook_factory(attrs.has, _to_alias_structure)
-converter.register_structure_hook(Decimal, lambda v, _: Decimal(str(v)))
-converter.register_unstructure_hook(Decimal, lambda v: str(v))
-converter.register_structure_hook_func(
-    lambda t: hasattr(t, "from_list"),
-    _structure_from_list,
-)
+converter = get_converter()
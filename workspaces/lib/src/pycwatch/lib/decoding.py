@@ -0,0 +1,110 @@
+"""Selectable JSON decoders that parse response bodies from bytes."""
+
+import json
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional
+
+import ujson
+from apiclient.exceptions import ResponseParseError
+from apiclient.response import Response as APIClientResponse
+from apiclient.utils.typing import JsonType
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    HAS_ORJSON = False
+else:
+    HAS_ORJSON = True
+
+Decoder = Callable[[bytes], Any]
+
+AUTO = "auto"
+DECIMAL = "decimal"
+
+
+def loads_decimal(data: bytes) -> Any:
+    """
+    Decode JSON, parsing numbers with a fraction or exponent straight to Decimal.
+
+    >>> loads_decimal(b'{"price": 24079.123456789012345, "count": 3}')
+    {'price': Decimal('24079.123456789012345'), 'count': 3}
+    """
+    return json.loads(data, parse_float=Decimal)
+
+
+# the installed decoders, fastest first, then the lossless one
+DECODERS: Dict[str, Decoder] = {}
+if HAS_ORJSON:
+    DECODERS["orjson"] = orjson.loads
+DECODERS["ujson"] = ujson.loads
+DECODERS["json"] = json.loads
+DECODERS[DECIMAL] = loads_decimal
+
+
+def available_decoders() -> List[str]:
+    """Get the names of the installed decoders, fastest first."""
+    return list(DECODERS)
+
+
+def get_decoder(name: str = AUTO) -> Decoder:
+    """
+    Get a JSON decoder by name.
+
+    Args:
+        name: One of ``orjson``, ``ujson`` or ``json``, ``decimal`` to parse
+            numbers to :class:`~decimal.Decimal` without rounding them to floats,
+            or ``auto`` to use the fastest one that is installed.
+
+    Returns:
+        A function that decodes JSON from bytes.
+    """
+    if name == AUTO:
+        return next(iter(DECODERS.values()))
+    try:
+        return DECODERS[name]
+    except KeyError:
+        msg = f"JSON decoder '{name}' is not available, use one of {list(DECODERS)}"
+        raise ValueError(msg) from None
+
+
+def get_parse_float(name: str) -> Optional[Callable[[str], Any]]:
+    """Get the function that parses JSON floats for a decoder, if it has one."""
+    return Decimal if name == DECIMAL else None
+
+
+def get_content(response: APIClientResponse) -> bytes:
+    """Get the undecoded body of a response."""
+    try:
+        original = response.get_original()
+    except NotImplementedError:
+        # responses that only provide their text
+        original = None
+    content = getattr(original, "content", None)
+    if isinstance(content, bytes):
+        return content
+    raw_data: str = response.get_raw_data()
+    return raw_data.encode()
+
+
+def decode_response(
+    response: APIClientResponse,
+    decoder: Decoder,
+) -> Optional[JsonType]:
+    """
+    Decode the body of a response without converting it to text first.
+
+    Args:
+        response: The response to decode.
+        decoder: The decoder to use.
+
+    Returns:
+        The decoded data, or `None` if the response has no body.
+    """
+    content = get_content(response)
+    if not content:
+        return None
+    try:
+        return decoder(content)
+    except ValueError as exc:
+        msg = f"Unable to decode response data to json. data={content[:100]!r}"
+        raise ResponseParseError(msg) from exc
@@ -0,0 +1,153 @@
+"""On-disk caching of response bodies, shared between processes."""
+
+import contextlib
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Callable, Mapping, Optional, Union
+from urllib.parse import urlencode
+
+from pycwatch.lib.cache import DEFAULT_TTLS, CacheStats
+
+# the time at which a body was stored precedes it, so that readers can apply
+# their own TTLs
+HEADER = struct.Struct(">d")
+TEMPORARY_PREFIX = ".tmp-"
+
+
+class DiskCache:
+    """
+    A cache of response bodies in a directory.
+
+    Bodies are stored undecoded and compressed, in a file per endpoint path and
+    query parameters, and are served for the TTL of their endpoint. Files are
+    written to a temporary file first and then moved into place, so several
+    processes can share a directory without reading partial writes. Endpoints
+    without a positive TTL are not cached. Files are left in place when they
+    expire, as readers apply their own TTLs; :meth:`prune` removes old files.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, "os.PathLike[str]"],
+        ttls: Optional[Mapping[str, float]] = None,
+        compression_level: int = 6,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.directory = Path(directory).expanduser()
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.compression_level = compression_level
+        self.stats = CacheStats()
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def is_cached(self, endpoint: str) -> bool:
+        """Check whether responses of an endpoint are cached."""
+        return self.ttls.get(endpoint, 0) > 0
+
+    def get_path(self, path: str, params: Optional[Mapping[str, Any]]) -> Path:
+        """Get the file in which the body of a request is stored."""
+        query = urlencode(sorted((params or {}).items()))
+        digest = hashlib.sha256(f"{path}?{query}".encode()).hexdigest()
+        return self.directory / digest[:2] / digest
+
+    def get(
+        self,
+        endpoint: str,
+        path: str,
+        params: Optional[Mapping[str, Any]],
+    ) -> Optional[bytes]:
+        """
+        Get a cached body.
+
+        Args:
+            endpoint: The endpoint template that is requested, for its TTL.
+            path: The path of the request URL.
+            params: The query parameters of the request.
+
+        Returns:
+            The body, or `None` if it is missing, expired or unreadable.
+        """
+        file = self.get_path(path, params)
+        try:
+            data = file.read_bytes()
+            (stored_at,) = HEADER.unpack_from(data)
+            body = None
+            # an expired body is left for the processes with longer TTLs, and
+            # for prune
+            if stored_at + self.ttls.get(endpoint, 0) > self._clock():
+                body = zlib.decompress(data[HEADER.size :])
+        except (OSError, struct.error, zlib.error):
+            body = None
+        with self._lock:
+            if body is None:
+                self.stats.misses += 1
+            else:
+                self.stats.hits += 1
+        return body
+
+    def set(
+        self,
+        endpoint: str,
+        path: str,
+        params: Optional[Mapping[str, Any]],
+        body: bytes,
+    ) -> None:
+        """Cache a body, unless the endpoint is not cached."""
+        if not self.is_cached(endpoint):
+            return
+        file = self.get_path(path, params)
+        file.parent.mkdir(parents=True, exist_ok=True)
+        data = HEADER.pack(self._clock()) + zlib.compress(body, self.compression_level)
+        descriptor, temporary = tempfile.mkstemp(
+            dir=file.parent, prefix=TEMPORARY_PREFIX
+        )
+        try:
+            with os.fdopen(descriptor, "wb") as stream:
+                stream.write(data)
+            os.replace(temporary, file)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(temporary)
+            raise
+
+    def prune(self, max_age: Optional[float] = None) -> int:
+        """
+        Remove the bodies that have expired for every endpoint.
+
+        Args:
+            max_age: The seconds after which a body is removed, the longest TTL
+                if not given. Temporary files of interrupted writes are removed
+                after the same time.
+
+        Returns:
+            The number of files removed.
+        """
+        max_age = max(self.ttls.values(), default=0) if max_age is None else max_age
+        oldest = self._clock() - max_age
+        removed = 0
+        for file in self.directory.glob("*/*"):
+            with contextlib.suppress(OSError, struct.error):
+                if file.name.startswith(TEMPORARY_PREFIX):
+                    stored_at = file.stat().st_mtime
+                else:
+                    with file.open("rb") as stream:
+                        (stored_at,) = HEADER.unpack(stream.read(HEADER.size))
+                if stored_at <= oldest:
+                    file.unlink()
+                    removed += 1
+        return removed
+
+    def clear(self) -> None:
+        """Remove all cached bodies, including those of interrupted writes."""
+        for file in self.directory.glob("*/*"):
+            with contextlib.suppress(OSError):
+                file.unlink()
+        for subdirectory in self.directory.glob("*"):
+            with contextlib.suppress(OSError):
+                subdirectory.rmdir()
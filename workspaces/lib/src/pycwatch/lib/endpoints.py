@@ -2,8 +2,10 @@
 
 from apiclient import endpoint
 
+BASE_URL = "https://api.cryptowat.ch"
 
-@endpoint(base_url="https://api.cryptowat.ch")
+
+@endpoint(base_url=BASE_URL)
 class Endpoint:
     """The endpoints supported by this client."""
 
@@ -1,5 +1,9 @@
 """Pycwatch exceptions."""
 
+from typing import Optional
+
+from apiclient.exceptions import ClientError
+
 
 class PycwatchError(Exception):
     """Base exception for pycwatch."""
@@ -7,3 +11,21 @@ class PycwatchError(Exception):
 
 class ResponseStructureError(PycwatchError):
     """Raised when the response could not be structured."""
+
+
+class DeadlineExceededError(PycwatchError):
+    """Raised when a call did not finish before its deadline."""
+
+
+class RateLimitError(PycwatchError, ClientError):
+    """Raised when the API rejects a request with status 429."""
+
+    def __init__(
+        self,
+        message: str = "",
+        status_code: Optional[int] = None,
+        info: str = "",
+        retry_after: Optional[float] = None,
+    ) -> None:
+        super().__init__(message, status_code, info)
+        self.retry_after = retry_after
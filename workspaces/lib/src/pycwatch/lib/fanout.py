@@ -0,0 +1,108 @@
+"""Fan-out of many calls over a thread pool."""
+
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Iterable,
+    Iterator,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+import attrs
+
+from pycwatch.lib.exceptions import DeadlineExceededError
+
+T = TypeVar("T")
+
+
+@attrs.frozen
+class MapResult(Generic[T]):
+    """The outcome of one call of a fan-out."""
+
+    args: Tuple[Any, ...]
+    result: Optional[T] = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        """Check whether the call returned."""
+        return self.error is None
+
+
+def _as_args(item: Any) -> Tuple[Any, ...]:
+    """Get the positional arguments of a call from an item of the argument list."""
+    return item if isinstance(item, tuple) else (item,)
+
+
+def _outcome(args: Tuple[Any, ...], future: "Future[T]") -> MapResult[T]:
+    """Get the result or exception of a finished call."""
+    error = future.exception()
+    if error is not None:
+        return MapResult(args, error=error)
+    return MapResult(args, result=future.result())
+
+
+def fan_out(
+    func: Callable[..., T],
+    arg_list: Iterable[Any],
+    max_workers: int,
+    deadline: Optional[float] = None,
+) -> Iterator[MapResult[T]]:
+    """
+    Call a function with each item of an argument list in a thread pool.
+
+    The calls start right away, and the deadline counts from now rather than
+    from when the outcomes are first iterated over.
+
+    Args:
+        func: The function to call.
+        arg_list: A tuple of positional arguments, or a single argument, per call.
+        max_workers: The number of calls that run at the same time.
+        deadline: The seconds after which the calls that have not finished are
+            given up on, or `None` to wait for all of them.
+
+    Returns:
+        The outcome of each call as it finishes. Calls that raise yield their
+        exception, calls that miss the deadline yield a
+        :class:`~pycwatch.lib.exceptions.DeadlineExceededError`.
+    """
+    calls = [_as_args(item) for item in arg_list]
+    if not calls:
+        return iter(())
+    end = None if deadline is None else time.monotonic() + deadline
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(calls))))
+    pending: Dict["Future[T]", Tuple[Any, ...]] = {
+        executor.submit(func, *args): args for args in calls
+    }
+    # the submitted calls still run, and calls still running when the outcomes
+    # are abandoned finish in the background instead of blocking
+    executor.shutdown(wait=False)
+    return _outcomes(pending, end, deadline)
+
+
+def _outcomes(
+    pending: Dict["Future[T]", Tuple[Any, ...]],
+    end: Optional[float],
+    deadline: Optional[float],
+) -> Iterator[MapResult[T]]:
+    """Yield the outcomes of submitted calls as they finish, until the deadline."""
+    try:
+        timeout = None if end is None else max(end - time.monotonic(), 0)
+        for future in as_completed(list(pending), timeout=timeout):
+            yield _outcome(pending.pop(future), future)
+    except FuturesTimeoutError:
+        for future, args in list(pending.items()):
+            future.cancel()
+            del pending[future]
+            msg = f"The call with {args} did not finish within {deadline} seconds"
+            yield MapResult(args, error=DeadlineExceededError(msg))
+    finally:
+        for future in pending:
+            future.cancel()
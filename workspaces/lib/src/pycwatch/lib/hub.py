@@ -0,0 +1,341 @@
+"""A hub that serves many market subscribers from as few requests as possible."""
+
+import asyncio
+import enum
+import logging
+import threading
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+)
+
+from pycwatch.lib.endpoints import Endpoint
+from pycwatch.lib.planning import DEFAULT_CONCURRENCY, MarketKey
+
+if TYPE_CHECKING:
+    from pycwatch.lib.async_client import AsyncCryptoWatchClient
+    from pycwatch.lib.client import BaseClient, CryptoWatchClient
+
+Callback = Callable[[MarketKey, Any], None]
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+_CLOSED = object()
+
+
+class Feed(str, enum.Enum):
+    """The kind of values a hub polls."""
+
+    PRICE = "price"
+    SUMMARY = "summary"
+
+
+class Subscription:
+    """A subscriber to the updates of one market."""
+
+    def __init__(
+        self,
+        hub: "BaseHub",
+        key: MarketKey,
+        callback: Optional[Callback] = None,
+    ) -> None:
+        self.hub = hub
+        self.key = key
+        self.callback = callback
+
+    def notify(self, value: Any) -> None:
+        """Pass a new value to the subscriber."""
+        if self.callback is not None:
+            self.callback(self.key, value)
+
+    def close(self) -> None:
+        """Stop receiving updates."""
+        self.hub.unsubscribe(self)
+
+
+class AsyncSubscription(Subscription):
+    """
+    A subscriber that can also be iterated over to receive its updates.
+
+    The iterator receives the newest value: one that was not read before the
+    next arrived is skipped. A subscription with a callback only keeps values
+    for the iterator once iteration has started.
+    """
+
+    def __init__(
+        self,
+        hub: "BaseHub",
+        key: MarketKey,
+        callback: Optional[Callback] = None,
+    ) -> None:
+        super().__init__(hub, key, callback)
+        self._queue: "asyncio.Queue[Any]" = asyncio.Queue()
+        self._iterated = False
+
+    def notify(self, value: Any) -> None:
+        """Pass a new value to the callback and to the iterator."""
+        super().notify(value)
+        if self.callback is None or self._iterated:
+            if not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(value)
+
+    def close(self) -> None:
+        """Stop receiving updates, ending the iteration."""
+        super().close()
+        self._queue.put_nowait(_CLOSED)
+
+    def __aiter__(self) -> AsyncIterator[Any]:
+        """Iterate over the new values."""
+        self._iterated = True
+        return self
+
+    async def __anext__(self) -> Any:
+        """Wait for the next value."""
+        value = await self._queue.get()
+        if value is _CLOSED:
+            raise StopAsyncIteration
+        return value
+
+
+class BaseHub:
+    """
+    Subscriptions to markets, and the choice of endpoint for each poll.
+
+    A poll requests every subscribed market individually, unless the planner of
+    the client expects one request for all markets to cost less.
+    Subscribers are only notified when the value of their market changed. A
+    market whose request fails keeps its last value, and its exception is kept
+    in ``errors`` until the next poll.
+    """
+
+    client: "BaseClient"
+
+    def __init__(self, feed: Feed = Feed.PRICE) -> None:
+        self.feed = Feed(feed)
+        self.errors: Dict[MarketKey, Exception] = {}
+        self._subscriptions: Dict[MarketKey, List[Subscription]] = {}
+        self._values: Dict[MarketKey, Any] = {}
+
+    @property
+    def keys(self) -> List[MarketKey]:
+        """The markets with at least one subscriber."""
+        return list(self._subscriptions)
+
+    def uses_bulk(self) -> bool:
+        """Check whether the next poll requests all markets at once."""
+        if self.feed is Feed.PRICE:
+            endpoints = (Endpoint.market_price, Endpoint.all_market_prices)
+        else:
+            endpoints = (Endpoint.market_summary, Endpoint.all_market_summaries)
+        plan = self.client.planner.plan(
+            *endpoints,
+            len(self._subscriptions),
+            DEFAULT_CONCURRENCY,
+        )
+        return plan.bulk
+
+    def value(self, exchange: str, pair: str) -> Any:
+        """Get the last value of a subscribed market, or `None`."""
+        return self._values.get((exchange, pair))
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Remove a subscription, and forget its market if it was the last one."""
+        subscriptions = self._subscriptions.get(subscription.key, [])
+        if subscription in subscriptions:
+            subscriptions.remove(subscription)
+        if not subscriptions:
+            self._subscriptions.pop(subscription.key, None)
+            self._values.pop(subscription.key, None)
+
+    def _add(self, subscription: Subscription) -> None:
+        """Register a subscription and pass it the last value of its market."""
+        self._subscriptions.setdefault(subscription.key, []).append(subscription)
+        value = self._values.get(subscription.key, _MISSING)
+        if value is not _MISSING:
+            subscription.notify(value)
+
+    def _from_bulk(
+        self, items: Iterable[Tuple[str, Any]]
+    ) -> Iterator[Tuple[MarketKey, Any]]:
+        """Key the values of a batch of markets by exchange and pair."""
+        # prices are keyed like "market:kraken:btceur", summaries like "kraken:btceur"
+        for name, value in items:
+            *_, exchange, pair = name.split(":")
+            yield (exchange, pair), value
+
+    def _log_errors(self) -> None:
+        """Log the markets that failed in the last poll."""
+        for (exchange, pair), error in self.errors.items():
+            logger.warning("Polling %s:%s failed: %r", exchange, pair, error)
+
+    def _publish(self, items: Iterable[Tuple[MarketKey, Any]]) -> Dict[MarketKey, Any]:
+        """Store the values of subscribed markets and notify on changes."""
+        changed = {}
+        for key, value in items:
+            subscriptions = self._subscriptions.get(key)
+            if not subscriptions or self._values.get(key, _MISSING) == value:
+                continue
+            self._values[key] = changed[key] = value
+            for subscription in list(subscriptions):
+                subscription.notify(value)
+        return changed
+
+
+class Hub(BaseHub):
+    """
+    Poll prices or summaries for many subscribers with the sync client.
+
+    >>> from pycwatch.lib import CryptoWatchClient
+    >>> hub = Hub(CryptoWatchClient())
+    >>> subscription = hub.subscribe("kraken", "btceur", print)
+    >>> hub.uses_bulk()
+    False
+    """
+
+    def __init__(
+        self,
+        client: "CryptoWatchClient",
+        feed: Feed = Feed.PRICE,
+    ) -> None:
+        super().__init__(feed)
+        self.client: "CryptoWatchClient" = client
+
+    def subscribe(self, exchange: str, pair: str, callback: Callback) -> Subscription:
+        """
+        Call a function with the value of a market whenever it changes.
+
+        Args:
+            exchange: The symbol of the exchange.
+            pair: The symbol of the pair.
+            callback: Called with the market key and its new value.
+
+        Returns:
+            The subscription, which can be closed to stop the updates.
+        """
+        subscription = Subscription(self, (exchange, pair), callback)
+        self._add(subscription)
+        return subscription
+
+    def poll(self) -> Dict[MarketKey, Any]:
+        """
+        Request the subscribed markets once and notify their subscribers.
+
+        Returns:
+            The new values of the markets that changed. The markets that failed
+            are left out, and their exceptions are in ``errors``.
+        """
+        keys = self.keys
+        self.errors = {}
+        if not keys:
+            return {}
+        errors: Dict[MarketKey, Exception] = {}
+        values: Mapping[str, Any]
+        try:
+            if self.feed is Feed.PRICE:
+                values = self.client.get_market_prices(keys, errors=errors)
+            else:
+                values = self.client.get_market_summaries(keys, errors=errors)
+        except Exception as exc:  # noqa: BLE001
+            # a request for all markets at once fails for each of them
+            errors, values = dict.fromkeys(keys, exc), {}
+        self.errors = errors
+        return self._publish(self._from_bulk(values.items()))
+
+    def run(self, interval: float, stop: Optional[threading.Event] = None) -> None:
+        """Poll every interval seconds until the event is set, logging failures."""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Polling failed")
+            self._log_errors()
+            stop.wait(interval)
+
+
+class AsyncHub(BaseHub):
+    """Poll prices or summaries for many subscribers with the async client."""
+
+    def __init__(
+        self,
+        client: "AsyncCryptoWatchClient",
+        feed: Feed = Feed.PRICE,
+    ) -> None:
+        super().__init__(feed)
+        self.client: "AsyncCryptoWatchClient" = client
+
+    def subscribe(
+        self,
+        exchange: str,
+        pair: str,
+        callback: Optional[Callback] = None,
+    ) -> AsyncSubscription:
+        """
+        Subscribe to the value of a market.
+
+        Iterate over the subscription with ``async for`` to receive the newest
+        value whenever it changes, or pass a callback.
+
+        Args:
+            exchange: The symbol of the exchange.
+            pair: The symbol of the pair.
+            callback: Called with the market key and its new value.
+
+        Returns:
+            The subscription, which can be closed to stop the updates.
+        """
+        subscription = AsyncSubscription(self, (exchange, pair), callback)
+        self._add(subscription)
+        return subscription
+
+    async def poll(self) -> Dict[MarketKey, Any]:
+        """
+        Request the subscribed markets once and notify their subscribers.
+
+        Returns:
+            The new values of the markets that changed. The markets that failed
+            are left out, and their exceptions are in ``errors``.
+        """
+        keys = self.keys
+        self.errors = {}
+        if not keys:
+            return {}
+        errors: Dict[MarketKey, Exception] = {}
+        values: Mapping[str, Any]
+        try:
+            if self.feed is Feed.PRICE:
+                values = await self.client.get_market_prices(keys, errors=errors)
+            else:
+                values = await self.client.get_market_summaries(keys, errors=errors)
+        except Exception as exc:  # noqa: BLE001
+            # a request for all markets at once fails for each of them
+            errors, values = dict.fromkeys(keys, exc), {}
+        self.errors = errors
+        return self._publish(self._from_bulk(values.items()))
+
+    async def run(self, interval: float) -> None:
+        """Poll every interval seconds until cancelled, logging failures."""
+        while True:
+            try:
+                await self.poll()
+            except Exception:
+                logger.exception("Polling failed")
+            self._log_errors()
+            await asyncio.sleep(interval)
+
+    def close(self) -> None:
+        """Close all subscriptions, ending their iterations."""
+        for subscriptions in list(self._subscriptions.values()):
+            for subscription in list(subscriptions):
+                subscription.close()
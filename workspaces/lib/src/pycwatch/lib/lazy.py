@@ -0,0 +1,291 @@
+"""Lazy and raw alternatives to structuring responses into models."""
+
+import enum
+import functools
+import sys
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+    overload,
+)
+
+if sys.version_info < (3, 8):
+    from typing_extensions import get_args, get_origin
+else:
+    from typing import get_args, get_origin
+
+import attrs
+import cattrs
+from cattrs import Converter
+
+from pycwatch.lib.conversion import converter, to_cwatch_key
+from pycwatch.lib.exceptions import ResponseStructureError
+from pycwatch.lib.models import Allowance, Cursor
+
+
+class StructureMode(str, enum.Enum):
+    """How responses are turned into Python objects."""
+
+    EAGER = "eager"
+    LAZY = "lazy"
+    RAW = "raw"
+
+
+@attrs.define()
+class RawResponse:
+    """A response whose result is left as decoded JSON."""
+
+    result: Any
+    allowance: Optional[Allowance] = None
+    cursor: Optional[Cursor] = None
+
+
+def make_raw_response(data: Any) -> RawResponse:
+    """
+    Wrap decoded response data without structuring its result.
+
+    Args:
+        data: The decoded response.
+
+    Returns:
+        The raw result, with the allowance and cursor structured if present.
+    """
+    if not isinstance(data, dict) or "result" not in data:
+        msg = f"Failed to structure response: '{data}'"
+        raise ResponseStructureError(msg)
+    return RawResponse(
+        data["result"],
+        allowance=_structure(data.get("allowance"), Optional[Allowance]),
+        cursor=_structure(data.get("cursor"), Optional[Cursor]),
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _fields(cls: Any) -> Dict[str, Tuple[str, Any, Any]]:
+    """Map the attribute names of a model to their key, type and default."""
+    origin = get_origin(cls) or cls
+    type_vars = dict(zip(getattr(origin, "__parameters__", ()), get_args(cls)))
+    return {
+        field.name: (
+            to_cwatch_key(field.name),
+            type_vars.get(field.type, field.type),
+            field.default,
+        )
+        for field in attrs.fields(origin)
+    }
+
+
+def _structure(value: Any, type_: Any, converter: Converter = converter) -> Any:
+    """Structure a value, wrapping errors like the clients do."""
+    try:
+        return converter.structure(value, type_)
+    except (cattrs.BaseValidationError, ArithmeticError, TypeError, ValueError) as exc:
+        msg = f"Failed to structure value: '{value}'"
+        raise ResponseStructureError(msg) from exc
+
+
+def lazy_structure(value: Any, type_: Any, converter: Converter = converter) -> Any:
+    """
+    Structure a value lazily.
+
+    Objects that map to models become a :class:`LazyView`, and lists and dicts of
+    them become a :class:`LazyList` or :class:`LazyDict`. Anything else, including
+    models that are decoded from lists, is structured right away.
+
+    Args:
+        value: The decoded JSON value.
+        type_: The type to structure it as.
+        converter: The converter that structures the values.
+
+    Returns:
+        The lazy or structured value.
+    """
+    origin = get_origin(type_)
+    args = get_args(type_)
+    if origin is Union and value is not None:
+        members = [arg for arg in args if arg is not type(None)]
+        if len(members) == 1:
+            return lazy_structure(value, members[0], converter)
+    elif attrs.has(origin or type_) and isinstance(value, dict):
+        return LazyView(value, type_, converter)
+    elif origin in (list, List) and args and isinstance(value, list):
+        return LazyList(value, args[0], converter)
+    elif origin in (dict, Dict) and args and isinstance(value, dict):
+        return LazyDict(value, args[-1], converter)
+    return _structure(value, type_, converter)
+
+
+class LazyView:
+    """
+    A view of a decoded JSON object with the attributes of a model.
+
+    Each attribute is structured the first time it is read, and then kept. This
+    makes reading a few fields of a large response much cheaper than structuring
+    all of it. The view is not an instance of the model; use :meth:`materialize`
+    to get one.
+    """
+
+    def __init__(
+        self,
+        data: Dict[str, Any],
+        cls: Any,
+        converter: Converter = converter,
+    ) -> None:
+        self._data = data
+        self._cls = cls
+        self._converter = converter
+
+    def __getattr__(self, name: str) -> Any:
+        """Structure an attribute of the model on first access."""
+        # copy and pickle look up special names before __init__ has run
+        if name.startswith("_"):
+            raise AttributeError(name)
+        try:
+            key, type_, default = _fields(self._cls)[name]
+        except KeyError:
+            msg = f"'{self._cls}' has no attribute '{name}'"
+            raise AttributeError(msg) from None
+        if key in self._data:
+            value = lazy_structure(self._data[key], type_, self._converter)
+        elif isinstance(default, attrs.Factory):  # type: ignore[arg-type]
+            value = default.factory()
+        elif default is not attrs.NOTHING:
+            value = default
+        else:
+            msg = f"Missing '{key}' in '{self._data}'"
+            raise ResponseStructureError(msg)
+        setattr(self, name, value)
+        return value
+
+    def __repr__(self) -> str:
+        """Show the model and the underlying data."""
+        return f"LazyView({self._cls}, {self._data!r})"
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        """Copy and pickle the data, and structure the attributes again on access.
+
+        The default converter cannot be pickled, so it is left out.
+        """
+        if self._converter is converter:
+            return LazyView, (self._data, self._cls)
+        return LazyView, (self._data, self._cls, self._converter)
+
+    @property
+    def raw(self) -> Dict[str, Any]:
+        """The decoded JSON object."""
+        return self._data
+
+    def materialize(self) -> Any:
+        """Structure the whole object into an instance of the model."""
+        return _structure(self._data, self._cls, self._converter)
+
+
+class LazyList(Sequence[Any]):
+    """A list of decoded JSON values that are structured when they are read."""
+
+    def __init__(
+        self,
+        data: List[Any],
+        item_type: Any,
+        converter: Converter = converter,
+    ) -> None:
+        self._data = data
+        self._item_type = item_type
+        self._converter = converter
+        self._items: Dict[int, Any] = {}
+
+    @overload
+    def __getitem__(self, index: int) -> Any:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Any]:
+        ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        """Structure an item on first access."""
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self._data)))]
+        if index < 0:
+            index += len(self._data)
+        if index not in self._items:
+            self._items[index] = lazy_structure(
+                self._data[index],
+                self._item_type,
+                self._converter,
+            )
+        return self._items[index]
+
+    def __len__(self) -> int:
+        """Get the number of items."""
+        return len(self._data)
+
+    def __repr__(self) -> str:
+        """Show the item type and the number of items."""
+        return f"LazyList({self._item_type}, {len(self._data)} items)"
+
+
+class LazyDict(Mapping[str, Any]):
+    """A dict of decoded JSON values that are structured when they are read."""
+
+    def __init__(
+        self,
+        data: Dict[str, Any],
+        value_type: Any,
+        converter: Converter = converter,
+    ) -> None:
+        self._data = data
+        self._value_type = value_type
+        self._converter = converter
+        self._values: Dict[str, Any] = {}
+
+    def __getitem__(self, key: str) -> Any:
+        """Structure a value on first access."""
+        if key not in self._values:
+            self._values[key] = lazy_structure(
+                self._data[key],
+                self._value_type,
+                self._converter,
+            )
+        return self._values[key]
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the keys."""
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        """Get the number of items."""
+        return len(self._data)
+
+    def __repr__(self) -> str:
+        """Show the value type and the number of items."""
+        return f"LazyDict({self._value_type}, {len(self._data)} items)"
+
+
+def make_lazy_response(
+    data: Any,
+    cls: Any,
+    converter: Converter = converter,
+) -> LazyView:
+    """
+    Wrap decoded response data in a view that structures it on access.
+
+    Args:
+        data: The decoded response.
+        cls: The response model.
+        converter: The converter that structures the values.
+
+    Returns:
+        A lazy view of the response model.
+    """
+    if not isinstance(data, dict):
+        msg = f"Failed to structure response: '{data}'"
+        raise ResponseStructureError(msg)
+    return LazyView(data, cls, converter)
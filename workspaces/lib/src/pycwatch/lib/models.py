@@ -155,8 +155,8 @@ class Cursor:
 class AllowanceBase:
     """Base class for allowance models."""
 
-    cost: int
-    remaining: int
+    cost: float
+    remaining: float
 
 
 @attrs.define()
@@ -321,6 +321,7 @@ class Market(MarketBase):
     routes: MarketRoutes
 
 
+# a float or a fixed point int instead with the other numeric backends
 Price = Decimal
 
 
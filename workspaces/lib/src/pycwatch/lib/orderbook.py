@@ -0,0 +1,461 @@
+"""A columnar order book with vectorized depth queries."""
+
+import enum
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+import attrs
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    HAS_NUMPY = False
+else:
+    HAS_NUMPY = True
+
+from pycwatch.lib.arrays import require_numpy
+from pycwatch.lib.conversion import NumericBackend, get_converter
+from pycwatch.lib.models import (
+    OrderBook,
+    OrderBookCalculator,
+    OrderBookItem,
+    OrderBookLiquidity,
+)
+
+if TYPE_CHECKING:
+    import numpy.typing as npt
+
+    FloatArray = npt.NDArray[np.float64]
+
+BPS = 10_000
+# the levels of the liquidity endpoint, in basis points
+LIQUIDITY_LEVELS = (25, 50, 75, 100, 150, 200, 250, 300, 400, 500)
+
+KeyT = TypeVar("KeyT")
+
+
+class Side(str, enum.Enum):
+    """A side of the order book."""
+
+    ASK = "ask"
+    BID = "bid"
+
+
+def _prefix_sum(values: "FloatArray") -> "FloatArray":
+    """Get the cumulative sums before each value and of all of them."""
+    sums = np.zeros(len(values) + 1)
+    np.cumsum(values, out=sums[1:])
+    return sums
+
+
+def _scalar_or_array(values: "FloatArray") -> Union[float, "FloatArray"]:
+    """Unwrap the result of a query made with a scalar."""
+    return values if values.ndim else float(values)
+
+
+@attrs.define(eq=False)
+class BookSide:
+    """
+    The levels of one side of an order book, best price first.
+
+    Next to the prices and amounts, the side keeps the cumulative amount and
+    notional before each level, so that queries are a binary search and a lookup.
+    """
+
+    side: Side
+    prices: "FloatArray"
+    amounts: "FloatArray"
+    _keys: "FloatArray" = attrs.field(init=False, repr=False)
+    _depth: "FloatArray" = attrs.field(init=False, repr=False)
+    _notional: "FloatArray" = attrs.field(init=False, repr=False)
+
+    def __attrs_post_init__(self) -> None:
+        """Precompute the search keys and cumulative sums."""
+        # asks are sorted ascending and bids descending, negating the bids makes
+        # both searchable the same way
+        self._keys = self.prices if self.side == Side.ASK else -self.prices
+        self._depth = _prefix_sum(self.amounts)
+        self._notional = _prefix_sum(self.prices * self.amounts)
+
+    def __len__(self) -> int:
+        """Get the number of levels."""
+        return len(self.prices)
+
+    @property
+    def best(self) -> float:
+        """The best price, or NaN if the side is empty."""
+        return float(self.prices[0]) if len(self.prices) else float("nan")
+
+    @property
+    def cumulative_depth(self) -> "FloatArray":
+        """The amount available up to and including each level."""
+        return self._depth[1:]
+
+    def levels_within(self, price: "npt.ArrayLike") -> "npt.NDArray[np.intp]":
+        """Count the levels with a price at or better than the given prices."""
+        keys = np.asarray(price, dtype=np.float64)
+        if self.side == Side.BID:
+            keys = -keys
+        return np.searchsorted(self._keys, keys, side="right")
+
+    def depth_at_price(self, price: "npt.ArrayLike") -> Union[float, "FloatArray"]:
+        """Get the amount available at prices at or better than the given prices."""
+        return _scalar_or_array(self._depth[self.levels_within(price)])
+
+    def fill(
+        self,
+        amount: "npt.ArrayLike",
+    ) -> Tuple["FloatArray", "FloatArray", "npt.NDArray[Any]"]:
+        """
+        Fill amounts against this side, walking the levels from the best price.
+
+        Args:
+            amount: An amount or an array of amounts of the base asset.
+
+        Returns:
+            The cost of each amount, the price of the last level it reaches, and
+            whether the side holds enough to fill it. The cost and price are only
+            meaningful where the amount was filled.
+        """
+        amounts = np.asarray(amount, dtype=np.float64)
+        if not len(self.prices):
+            nan = np.full(amounts.shape, np.nan)
+            return nan, nan, np.zeros(amounts.shape, dtype=np.bool_)
+        # the level at which each amount is completely filled
+        levels = np.searchsorted(self._depth[1:], amounts, side="left")
+        filled = levels < len(self.prices)
+        levels = np.minimum(levels, len(self.prices) - 1)
+        reach = self.prices[levels]
+        cost = self._notional[levels] + (amounts - self._depth[levels]) * reach
+        return cost, reach, filled
+
+    def vwap(self, amount: "npt.ArrayLike") -> Union[float, "FloatArray"]:
+        """
+        Get the average price of filling amounts against this side.
+
+        The result is NaN for amounts that are not positive or that exceed the
+        amount available.
+        """
+        amounts = np.asarray(amount, dtype=np.float64)
+        cost, _, filled = self.fill(amounts)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            average = np.where(filled & (amounts > 0), cost / amounts, np.nan)
+        return _scalar_or_array(average)
+
+
+def _levels_to_arrays(levels: Any) -> "FloatArray":
+    """Convert price and amount pairs to a 2 x n array."""
+    values = np.array(levels, dtype=np.float64).reshape(-1, 2)
+    return np.ascontiguousarray(values.T)
+
+
+@attrs.define(eq=False)
+class ColumnarOrderBook:
+    """
+    An order book that holds each side as arrays of prices and amounts.
+
+    Unlike :class:`~pycwatch.lib.models.OrderBook`, which holds an object per level,
+    depth, slippage and spread are computed by NumPy without a Python loop over the
+    levels. Prices and amounts are float64. Requires NumPy.
+    """
+
+    asks: BookSide
+    bids: BookSide
+    seq_num: int
+
+    @classmethod
+    def from_result(cls, result: Mapping[str, Any]) -> "ColumnarOrderBook":
+        """
+        Build the book from the decoded result of an order book request.
+
+        Args:
+            result: The result, with ``asks`` and ``bids`` as lists of price and
+                amount pairs.
+
+        Returns:
+            The columnar book.
+        """
+        require_numpy()
+        asks = _levels_to_arrays(result["asks"])
+        bids = _levels_to_arrays(result["bids"])
+        return cls(
+            asks=BookSide(Side.ASK, asks[0], asks[1]),
+            bids=BookSide(Side.BID, bids[0], bids[1]),
+            seq_num=int(result["seqNum"]),
+        )
+
+    @classmethod
+    def from_order_book(cls, book: OrderBook) -> "ColumnarOrderBook":
+        """Build the book from an order book model with decimal or float numbers."""
+
+        def pairs(items: List[OrderBookItem]) -> List[List[Any]]:
+            return [[item.price, item.amount] for item in items]
+
+        return cls.from_result(
+            {
+                "asks": pairs(book.asks),
+                "bids": pairs(book.bids),
+                "seqNum": book.seq_num,
+            },
+        )
+
+    def side(self, side: Union[Side, str]) -> BookSide:
+        """Get a side of the book."""
+        return self.asks if Side(side) == Side.ASK else self.bids
+
+    @property
+    def best_ask(self) -> float:
+        """The lowest ask price."""
+        return self.asks.best
+
+    @property
+    def best_bid(self) -> float:
+        """The highest bid price."""
+        return self.bids.best
+
+    @property
+    def mid_price(self) -> float:
+        """The price halfway between the best bid and ask."""
+        return (self.best_ask + self.best_bid) / 2
+
+    @property
+    def spread(self) -> float:
+        """The difference between the best ask and bid."""
+        return self.best_ask - self.best_bid
+
+    @property
+    def spread_bps(self) -> float:
+        """The spread in basis points of the mid price."""
+        return self.spread / self.mid_price * BPS
+
+    def cumulative_depth(self, side: Union[Side, str]) -> "FloatArray":
+        """Get the amount available up to and including each level of a side."""
+        return self.side(side).cumulative_depth
+
+    def depth_at_price(
+        self,
+        side: Union[Side, str],
+        price: "npt.ArrayLike",
+    ) -> Union[float, "FloatArray"]:
+        """
+        Get the amount available at prices at or better than the given prices.
+
+        Args:
+            side: ``ask`` for the amount that can be bought up to the prices,
+                ``bid`` for the amount that can be sold down to them.
+            price: A price or an array of prices.
+
+        Returns:
+            The amount for each price.
+        """
+        return self.side(side).depth_at_price(price)
+
+    def vwap(
+        self,
+        side: Union[Side, str],
+        amount: "npt.ArrayLike",
+    ) -> Union[float, "FloatArray"]:
+        """
+        Get the volume weighted average price of filling amounts.
+
+        Args:
+            side: ``ask`` to buy from the asks, ``bid`` to sell to the bids.
+            amount: An amount or an array of amounts of the base asset.
+
+        Returns:
+            The average price for each amount, NaN where the side is too thin.
+        """
+        return self.side(side).vwap(amount)
+
+    def imbalance(self, bps: Optional[float] = None) -> float:
+        """
+        Get the imbalance between the bid and ask amounts.
+
+        Args:
+            bps: Only count the levels within this many basis points of the best
+                price of their side, or all levels if `None`.
+
+        Returns:
+            A value between -1, when there are only asks, and 1, when there are
+            only bids.
+        """
+        if bps is None:
+            bid = float(self.bids.cumulative_depth[-1:].sum())
+            ask = float(self.asks.cumulative_depth[-1:].sum())
+        else:
+            bid = float(self.bids.depth_at_price(self.best_bid * (1 - bps / BPS)))
+            ask = float(self.asks.depth_at_price(self.best_ask * (1 + bps / BPS)))
+        total = bid + ask
+        return (bid - ask) / total if total else 0.0
+
+
+def _as_columnar(book: Union[OrderBook, ColumnarOrderBook]) -> ColumnarOrderBook:
+    """Convert an order book model to a columnar book."""
+    if isinstance(book, OrderBook):
+        return ColumnarOrderBook.from_order_book(book)
+    return book
+
+
+def _to_bps(delta: "FloatArray", reference: float) -> "FloatArray":
+    """Convert price differences to whole basis points, rounding down."""
+    # rounding first keeps floating point noise from pushing exact values down
+    return np.floor(np.round(delta / reference * BPS, 6))
+
+
+def _quote_side(
+    side: BookSide,
+    amounts: "FloatArray",
+    total_key: str,
+) -> List[Dict[str, Any]]:
+    """Quote filling amounts against one side, like the calculator endpoint."""
+    cost, reach, filled = side.fill(amounts)
+    if not filled.all() or (amounts <= 0).any():
+        msg = f"The {side.side.value}s can not fill all of the amounts {amounts}"
+        raise ValueError(msg)
+    average = cost / amounts
+    columns = {
+        "avgPrice": average,
+        "avgDelta": average - side.best,
+        "avgDeltaBps": _to_bps(average - side.best, side.best).astype(np.int64),
+        "reachPrice": reach,
+        "reachDelta": reach - side.best,
+        "reachDeltaBps": _to_bps(reach - side.best, side.best).astype(np.int64),
+        total_key: cost,
+    }
+    names = list(columns)
+    rows = zip(*(column.tolist() for column in columns.values()))
+    return [dict(zip(names, row)) for row in rows]
+
+
+def calculate_quotes(
+    book: Union[OrderBook, ColumnarOrderBook],
+    amounts: Sequence[float],
+    numeric_backend: Union[NumericBackend, str] = NumericBackend.DECIMAL,
+) -> List[OrderBookCalculator]:
+    """
+    Quote buying and selling amounts against a book that is already fetched.
+
+    This gives the same results as the calculator endpoint without a request
+    per amount. Buys walk the asks and sells walk the bids. The deltas are
+    relative to the best price of the side, and basis points are rounded down.
+    All amounts are quoted in one vectorized pass.
+
+    Args:
+        book: The order book.
+        amounts: The amounts of the base asset to quote.
+        numeric_backend: How the numbers of the quotes are represented.
+
+    Returns:
+        A quote for each amount.
+    """
+    columnar = _as_columnar(book)
+    values = np.asarray(amounts, dtype=np.float64).reshape(-1)
+    buys = _quote_side(columnar.asks, values, "spend")
+    sells = _quote_side(columnar.bids, values, "receive")
+    converter = get_converter(numeric_backend)
+    return [
+        converter.structure({"buy": buy, "sell": sell}, OrderBookCalculator)
+        for buy, sell in zip(buys, sells)
+    ]
+
+
+def calculate_quote(
+    book: Union[OrderBook, ColumnarOrderBook],
+    amount: float,
+    numeric_backend: Union[NumericBackend, str] = NumericBackend.DECIMAL,
+) -> OrderBookCalculator:
+    """Quote buying and selling one amount against a book that is already fetched."""
+    return calculate_quotes(book, [amount], numeric_backend)[0]
+
+
+def _side_liquidity(
+    sides: List[BookSide],
+    levels: "FloatArray",
+) -> Dict[str, "FloatArray"]:
+    """Sum the amounts near the best price of the same side of many books."""
+    prices = np.concatenate([side.prices for side in sides])
+    amounts = np.concatenate([side.amounts for side in sides])
+    books = np.repeat(np.arange(len(sides)), [len(side) for side in sides])
+    best = np.array([side.best for side in sides])[books]
+    # the distance of each level from the best price, in basis points
+    distance = np.abs(prices / best - 1) * BPS
+    base = np.zeros((len(sides), len(levels)))
+    quote = np.zeros((len(sides), len(levels)))
+    for column, level in enumerate(levels):
+        # a small tolerance keeps levels exactly at the limit despite rounding
+        within = distance <= level + 1e-9
+        base[:, column] = np.bincount(
+            books,
+            weights=np.where(within, amounts, 0),
+            minlength=len(sides),
+        )
+        quote[:, column] = np.bincount(
+            books,
+            weights=np.where(within, amounts * prices, 0),
+            minlength=len(sides),
+        )
+    return {"base": base, "quote": quote}
+
+
+def calculate_liquidities(
+    books: Mapping[KeyT, Union[OrderBook, ColumnarOrderBook]],
+    levels: Sequence[int] = LIQUIDITY_LEVELS,
+    numeric_backend: Union[NumericBackend, str] = NumericBackend.DECIMAL,
+) -> Dict[KeyT, OrderBookLiquidity]:
+    """
+    Compute the liquidity of many order books that are already fetched.
+
+    This gives the same results as the liquidity endpoint without a request per
+    market. For each side, the base and quote amounts of the levels within each
+    number of basis points of the best price of the side are summed. The levels
+    of all books are concatenated, so the work is vectorized across markets.
+
+    Args:
+        books: The order books, e.g. keyed by market.
+        levels: The distances from the best prices, in basis points.
+        numeric_backend: How the sums are represented.
+
+    Returns:
+        The liquidity of each book.
+    """
+    if not books:
+        return {}
+    columnar = [_as_columnar(book) for book in books.values()]
+    bps = np.asarray(levels, dtype=np.float64)
+    sums = {
+        "bid": _side_liquidity([book.bids for book in columnar], bps),
+        "ask": _side_liquidity([book.asks for book in columnar], bps),
+    }
+    converter = get_converter(numeric_backend)
+    return {
+        key: converter.structure(
+            {
+                side: {
+                    kind: dict(zip(levels, values[index].tolist()))
+                    for kind, values in side_sums.items()
+                }
+                for side, side_sums in sums.items()
+            },
+            OrderBookLiquidity,
+        )
+        for index, key in enumerate(books)
+    }
+
+
+def calculate_liquidity(
+    book: Union[OrderBook, ColumnarOrderBook],
+    levels: Sequence[int] = LIQUIDITY_LEVELS,
+    numeric_backend: Union[NumericBackend, str] = NumericBackend.DECIMAL,
+) -> OrderBookLiquidity:
+    """Compute the liquidity of an order book that is already fetched."""
+    return calculate_liquidities({None: book}, levels, numeric_backend)[None]
@@ -0,0 +1,70 @@
+"""Helpers for following the cursor of paginated endpoints."""
+
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import AsyncIterator, Awaitable, Callable, Iterator, Optional
+
+from pycwatch.lib.models import PaginatedResponse, ResultT
+
+PageFetcher = Callable[[Optional[str]], PaginatedResponse[ResultT]]
+AsyncPageFetcher = Callable[[Optional[str]], Awaitable[PaginatedResponse[ResultT]]]
+
+
+def iter_pages(
+    fetch_page: PageFetcher[ResultT],
+) -> Iterator[PaginatedResponse[ResultT]]:
+    """
+    Iterate over all pages of a paginated endpoint.
+
+    The next page is requested in a background thread while the current one is
+    being consumed, so at most two pages are held in memory at any time.
+
+    Args:
+        fetch_page: Called with the cursor of the page to fetch, `None` for the
+            first page.
+
+    Yields:
+        The pages in order.
+    """
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        page = fetch_page(None)
+        while True:
+            next_page: Optional[Future[PaginatedResponse[ResultT]]] = None
+            if page.cursor.has_more:
+                next_page = executor.submit(fetch_page, page.cursor.last)
+            yield page
+            if next_page is None:
+                return
+            page = next_page.result()
+
+
+async def aiter_pages(
+    fetch_page: AsyncPageFetcher[ResultT],
+) -> AsyncIterator[PaginatedResponse[ResultT]]:
+    """
+    Iterate over all pages of a paginated endpoint asynchronously.
+
+    Like :func:`iter_pages`, but the next page is requested in a task that runs
+    while the current page is being consumed.
+
+    Args:
+        fetch_page: Coroutine function called with the cursor of the page to
+            fetch, `None` for the first page.
+
+    Yields:
+        The pages in order.
+    """
+    page = await fetch_page(None)
+    next_page: Optional["asyncio.Future[PaginatedResponse[ResultT]]"] = None
+    try:
+        while True:
+            if page.cursor.has_more:
+                next_page = asyncio.ensure_future(fetch_page(page.cursor.last))
+            yield page
+            if next_page is None:
+                return
+            page = await next_page
+            next_page = None
+    finally:
+        if next_page is not None:
+            next_page.cancel()
@@ -0,0 +1,130 @@
+"""Planning of requests for many markets at once."""
+
+import math
+import threading
+from typing import Dict, Optional, Set, Tuple
+
+import attrs
+
+from pycwatch.lib.endpoints import Endpoint
+from pycwatch.lib.ratelimit import DEFAULT_COST, DEFAULT_COSTS
+
+# the seconds a call takes, used until one has been made; the bulk endpoints
+# return every market and take much longer than the others
+DEFAULT_LATENCIES: Dict[str, float] = {
+    Endpoint.all_market_prices: 1.5,
+    Endpoint.all_market_summaries: 2.0,
+}
+DEFAULT_LATENCY = 0.3
+DEFAULT_CONCURRENCY = 8
+
+MarketKey = Tuple[str, str]
+
+
+def price_key(market: MarketKey) -> str:
+    """Get the key of a market in the prices of all markets."""
+    exchange, pair = market
+    return f"market:{exchange}:{pair}"
+
+
+def summary_key(market: MarketKey) -> str:
+    """Get the key of a market in the summaries of all markets."""
+    exchange, pair = market
+    return f"{exchange}:{pair}"
+
+
+@attrs.frozen
+class BatchPlan:
+    """How to request a number of markets, and what it is expected to take."""
+
+    bulk: bool
+    calls: int
+    cost: float
+    latency: float
+
+
+class BatchPlanner:
+    """
+    Choose between requesting markets one by one or with a bulk endpoint.
+
+    The plan that costs less of the allowance is chosen, and the faster one when
+    both cost the same. Single requests are assumed to run concurrently.
+
+    The cost and latency of each endpoint start at the usual values and are
+    tracked as moving averages of the calls that are observed. The cost of a bulk
+    call includes all of its pages.
+    """
+
+    def __init__(self, smoothing: float = 0.2) -> None:
+        self.smoothing = smoothing
+        self._lock = threading.Lock()
+        self._costs = dict(DEFAULT_COSTS)
+        self._latencies = dict(DEFAULT_LATENCIES)
+        self._observed: Set[str] = set()
+
+    def estimate(self, endpoint: str) -> Tuple[float, float]:
+        """Get the expected cost and latency in seconds of a call to an endpoint."""
+        return (
+            self._costs.get(endpoint, DEFAULT_COST),
+            self._latencies.get(endpoint, DEFAULT_LATENCY),
+        )
+
+    def observe(self, endpoint: str, cost: Optional[float], latency: float) -> None:
+        """
+        Update the estimates of an endpoint from a call.
+
+        Args:
+            endpoint: The endpoint that was called.
+            cost: The allowance the call used, if it was reported.
+            latency: The seconds the call took.
+        """
+        with self._lock:
+            cost = self._costs.get(endpoint, DEFAULT_COST) if cost is None else cost
+            if endpoint in self._observed:
+                self._costs[endpoint] += self.smoothing * (cost - self._costs[endpoint])
+                self._latencies[endpoint] += self.smoothing * (
+                    latency - self._latencies[endpoint]
+                )
+            else:
+                self._observed.add(endpoint)
+                self._costs[endpoint] = cost
+                self._latencies[endpoint] = latency
+
+    def plan(
+        self,
+        market_endpoint: str,
+        bulk_endpoint: str,
+        count: int,
+        concurrency: int = 1,
+    ) -> BatchPlan:
+        """
+        Plan the requests for a number of markets.
+
+        >>> planner = BatchPlanner()
+        >>> planner.plan(Endpoint.market_price, Endpoint.all_market_prices, 3).bulk
+        False
+        >>> planner.plan(Endpoint.market_price, Endpoint.all_market_prices, 4).bulk
+        True
+
+        Args:
+            market_endpoint: The endpoint that returns one market.
+            bulk_endpoint: The endpoint that returns all markets.
+            count: The number of markets.
+            concurrency: The number of single requests that run at the same time.
+
+        Returns:
+            The cheaper plan.
+        """
+        market_cost, market_latency = self.estimate(market_endpoint)
+        single = BatchPlan(
+            bulk=False,
+            calls=count,
+            cost=count * market_cost,
+            latency=math.ceil(count / max(concurrency, 1)) * market_latency,
+        )
+        if count == 0:
+            return single
+        bulk_cost, bulk_latency = self.estimate(bulk_endpoint)
+        bulk = BatchPlan(bulk=True, calls=1, cost=bulk_cost, latency=bulk_latency)
+        # round the costs so that sums of credits compare equal
+        return min(single, bulk, key=lambda plan: (round(plan.cost, 9), plan.latency))
@@ -0,0 +1,356 @@
+"""A local caching proxy for the API, shared by many clients."""
+
+import asyncio
+import contextlib
+import functools
+import math
+import re
+from http import HTTPStatus
+from typing import Dict, List, Optional, Pattern, Tuple, cast
+from urllib.parse import parse_qsl, urlsplit
+
+import attrs
+from apiclient.client import DEFAULT_TIMEOUT
+
+from pycwatch.lib.cache import CacheKey, ResponseCache, make_cache_key
+from pycwatch.lib.coalescing import AsyncSingleFlight
+from pycwatch.lib.config import settings
+from pycwatch.lib.decoding import get_decoder
+from pycwatch.lib.endpoints import BASE_URL, Endpoint
+from pycwatch.lib.exceptions import RateLimitError, ResponseStructureError
+from pycwatch.lib.lazy import make_raw_response
+from pycwatch.lib.ratelimit import AllowanceLimiter
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    HAS_HTTPX = False
+else:
+    HAS_HTTPX = True
+
+DEFAULT_PORT = 8080
+# the longest a request waits for allowance before it is turned away with a 429
+DEFAULT_MAX_WAIT = 10.0
+MAX_HEADER_SIZE = 65536
+# the upstream headers that are passed on to clients
+FORWARDED_HEADERS = ("content-type", "retry-after")
+
+
+def _compile_routes() -> List[Tuple[Pattern[str], str]]:
+    """Get a pattern for the path of each endpoint, fixed paths first."""
+    templates = [
+        value
+        for name, value in vars(Endpoint).items()
+        if not name.startswith("_") and isinstance(value, str)
+    ]
+    # /markets/prices must not be taken for the markets of an exchange
+    templates.sort(key=lambda template: "{" in template)
+    routes = []
+    for template in templates:
+        path = re.sub(r"\\{\w+\\}", "[^/]+", re.escape(template[len(BASE_URL) :]))
+        routes.append((re.compile(f"{path}/?"), template))
+    return routes
+
+
+ROUTES = _compile_routes()
+
+
+def match_endpoint(path: str) -> Optional[str]:
+    """
+    Get the endpoint that a path belongs to.
+
+    >>> match_endpoint("/markets/prices") == Endpoint.all_market_prices
+    True
+    >>> match_endpoint("/markets/kraken") == Endpoint.exchange_markets
+    True
+    >>> match_endpoint("/unknown") is None
+    True
+    """
+    for pattern, endpoint in ROUTES:
+        if pattern.fullmatch(path):
+            return endpoint
+    return None
+
+
+@attrs.frozen()
+class ProxyResponse:
+    """A response of the proxy, as received from the API."""
+
+    status: int
+    body: bytes
+    headers: Tuple[Tuple[str, str], ...] = ()
+
+
+@attrs.define()
+class ProxyStats:
+    """Counters of a proxy."""
+
+    connections: int = 0
+    requests: int = 0
+    upstream_requests: int = 0
+    cache_hits: int = 0
+
+
+def _error(status: int, message: str, *headers: Tuple[str, str]) -> ProxyResponse:
+    """Build an error response in the format of the API."""
+    body = f'{{"error": "{message}"}}'.encode()
+    return ProxyResponse(status, body, (("content-type", "application/json"), *headers))
+
+
+class CryptoWatchProxy:
+    """
+    A local proxy that serves the routes of the API to many clients.
+
+    Clients send their requests to the proxy with the ``base_url`` option. The
+    proxy sends a request to the API only once for identical requests that
+    arrive at the same time, caches responses with a ``ResponseCache``, and
+    paces all upstream requests with a single ``AllowanceLimiter``, so that
+    processes sharing one API key no longer compete for its allowance.
+    Requests that would wait longer than ``max_wait`` seconds for allowance
+    are answered with a 429 and a Retry-After header. Client connections are
+    kept alive between requests.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        upstream: str = BASE_URL,
+        *,
+        api_key: Optional[str] = None,
+        cache: Optional[ResponseCache] = None,
+        rate_limiter: Optional[AllowanceLimiter] = None,
+        max_wait: float = DEFAULT_MAX_WAIT,
+        timeout: float = DEFAULT_TIMEOUT,
+        transport: Optional["httpx.AsyncBaseTransport"] = None,
+    ) -> None:
+        if not HAS_HTTPX:  # pragma: no cover
+            msg = (
+                "The proxy requires httpx, "
+                "install it with `pip install pycwatch-lib[async]`."
+            )
+            raise ImportError(msg)
+
+        api_key = api_key or settings.CW_API_KEY
+        self.upstream = upstream.rstrip("/")
+        self.cache = ResponseCache() if cache is None else cache
+        self.rate_limiter = rate_limiter
+        self.max_wait = max_wait
+        self.stats = ProxyStats()
+        self._single_flight = AsyncSingleFlight()
+        self._decoder = get_decoder()
+        self._http_client = httpx.AsyncClient(
+            headers={"X-CW-API-Key": api_key} if api_key else None,
+            timeout=timeout,
+            transport=transport,
+        )
+        self._server: Optional[asyncio.Server] = None
+        self._connections: Dict["asyncio.Task[None]", asyncio.StreamWriter] = {}
+
+    @property
+    def url(self) -> str:
+        """The base URL at which the proxy is listening."""
+        if self._server is None:
+            msg = "The proxy has not been started"
+            raise RuntimeError(msg)
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def start(
+        self,
+        host: str = "127.0.0.1",
+        port: int = DEFAULT_PORT,
+    ) -> asyncio.Server:
+        """Start listening for clients, on a free port if the port is 0."""
+        self._server = await asyncio.start_server(
+            self._handle_connection,
+            host,
+            port,
+            limit=MAX_HEADER_SIZE,
+        )
+        return self._server
+
+    async def serve_forever(
+        self,
+        host: str = "127.0.0.1",
+        port: int = DEFAULT_PORT,
+    ) -> None:
+        """Serve clients until cancelled."""
+        server = await self.start(host, port)
+        try:
+            await server.serve_forever()
+        finally:
+            await self.aclose()
+
+    async def aclose(self) -> None:
+        """Stop listening and close the client and upstream connections."""
+        if self._server is not None:
+            self._server.close()
+            # idle connections that are kept alive would keep the server open
+            for writer in self._connections.values():
+                writer.close()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self._server.wait_closed()
+        await self._http_client.aclose()
+
+    async def fetch(self, target: str) -> ProxyResponse:
+        """
+        Get the response to a request for a path and query.
+
+        Args:
+            target: The path and query of the request, e.g. ``/markets?limit=5``.
+
+        Returns:
+            The cached response, or the response of the API.
+        """
+        url = urlsplit(target)
+        endpoint = match_endpoint(url.path)
+        if endpoint is None:
+            return _error(404, "Not Found")
+        # the path tells the markets of an endpoint apart, the query is unordered
+        key = make_cache_key(
+            endpoint,
+            {"path": url.path.rstrip("/") or "/"},
+            dict(parse_qsl(url.query)),
+        )
+        if self.cache.is_cached(endpoint):
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.stats.cache_hits += 1
+                return cast(ProxyResponse, cached)
+        return await self._single_flight.do(
+            key,
+            functools.partial(self._send, endpoint, key, target),
+        )
+
+    async def _send(self, endpoint: str, key: CacheKey, target: str) -> ProxyResponse:
+        """Send a request to the API, within the allowance budget."""
+        if self.rate_limiter is not None:
+            try:
+                # a request that is turned away must not use up allowance
+                delay = self.rate_limiter.reserve(endpoint, max_wait=self.max_wait)
+            except RateLimitError as exc:
+                retry_after = ("retry-after", str(math.ceil(exc.retry_after or 0)))
+                return _error(429, "Allowance budget exhausted", retry_after)
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                self.rate_limiter.cancel(endpoint)
+                raise
+        self.stats.upstream_requests += 1
+        try:
+            upstream = await self._http_client.get(self.upstream + target)
+        except httpx.HTTPError as exc:
+            if isinstance(exc, httpx.ConnectError) and self.rate_limiter is not None:
+                # the request never reached the API
+                self.rate_limiter.cancel(endpoint)
+            return _error(502, f"Error when contacting the API: {type(exc).__name__}")
+        response = ProxyResponse(
+            upstream.status_code,
+            upstream.content,
+            tuple(
+                (name, upstream.headers[name])
+                for name in FORWARDED_HEADERS
+                if name in upstream.headers
+            ),
+        )
+        if response.status == 200:  # noqa: PLR2004
+            self._update_rate_limiter(endpoint, response.body)
+            self.cache.set(key, response)
+        return response
+
+    def _update_rate_limiter(self, endpoint: str, body: bytes) -> None:
+        """Let the rate limiter know about the allowance reported by the API."""
+        if self.rate_limiter is None:
+            return
+        with contextlib.suppress(ResponseStructureError, ValueError):
+            allowance = make_raw_response(self._decoder(body)).allowance
+            if allowance is not None:
+                self.rate_limiter.update(endpoint, allowance)
+
+    async def _handle_connection(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        """Answer the requests of a client until it closes the connection."""
+        self.stats.connections += 1
+        task = asyncio.current_task()
+        if task is not None:
+            self._connections[task] = writer
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, target, keep_alive = request
+                self.stats.requests += 1
+                if method in ("GET", "HEAD"):
+                    response = await self.fetch(target)
+                else:
+                    response = _error(405, "Method Not Allowed", ("allow", "GET, HEAD"))
+                self._write_response(writer, response, method, keep_alive=keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (
+            ConnectionError,
+            asyncio.IncompleteReadError,
+            asyncio.LimitOverrunError,
+            ValueError,
+        ):
+            # clients that hang up or send garbage are disconnected
+            pass
+        finally:
+            if task is not None:
+                self._connections.pop(task, None)
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    @staticmethod
+    async def _read_request(
+        reader: asyncio.StreamReader,
+    ) -> Optional[Tuple[str, str, bool]]:
+        """Read the method, target and whether to keep the connection alive."""
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError:
+            return None
+        request_line, *header_lines = head.decode("latin-1").split("\r\n")
+        method, target, version = request_line.split(" ", 2)
+        headers: Dict[str, str] = {}
+        for line in header_lines:
+            name, _, value = line.partition(":")
+            if name:
+                headers[name.strip().lower()] = value.strip()
+        # bodies are not expected, but must not be taken for the next request
+        length = int(headers.get("content-length", 0))
+        if length:
+            await reader.readexactly(length)
+        connection = headers.get("connection", "").lower()
+        if version == "HTTP/1.0":
+            return method, target, connection == "keep-alive"
+        return method, target, connection != "close"
+
+    @staticmethod
+    def _write_response(
+        writer: asyncio.StreamWriter,
+        response: ProxyResponse,
+        method: str,
+        *,
+        keep_alive: bool,
+    ) -> None:
+        """Write a response to a client."""
+        lines = [f"HTTP/1.1 {response.status} {_reason(response.status)}"]
+        lines.extend(f"{name}: {value}" for name, value in response.headers)
+        lines.append(f"content-length: {len(response.body)}")
+        lines.append(f"connection: {'keep-alive' if keep_alive else 'close'}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        if method != "HEAD":
+            writer.write(response.body)
+
+
+def _reason(status: int) -> str:
+    """Get the reason phrase of a status code."""
+    with contextlib.suppress(ValueError):
+        return HTTPStatus(status).phrase
+    return ""
@@ -0,0 +1,211 @@
+"""Pacing of requests based on the allowance reported by the API."""
+
+import asyncio
+import threading
+import time
+from typing import Callable, Dict, Optional, Set
+
+from pycwatch.lib.endpoints import Endpoint
+from pycwatch.lib.exceptions import RateLimitError
+from pycwatch.lib.models import Allowance, AllowanceAuthenticated
+
+ONE_DAY = 86400.0
+
+# the costs in credits observed for each endpoint, used until a call has been made
+DEFAULT_COSTS: Dict[str, float] = {
+    Endpoint.root: 0.0,
+    Endpoint.list_assets: 0.002,
+    Endpoint.asset_detail: 0.002,
+    Endpoint.list_pairs: 0.002,
+    Endpoint.pair_detail: 0.002,
+    Endpoint.list_markets: 0.003,
+    Endpoint.market_detail: 0.002,
+    Endpoint.all_market_prices: 0.015,
+    Endpoint.market_price: 0.005,
+    Endpoint.list_market_trades: 0.01,
+    Endpoint.market_summary: 0.005,
+    Endpoint.all_market_summaries: 0.015,
+    Endpoint.market_orderbook: 0.01,
+    Endpoint.market_orderbook_liquidity: 0.005,
+    Endpoint.market_orderbook_calculator: 0.015,
+    Endpoint.market_ohlc: 0.015,
+    Endpoint.list_exchanges: 0.002,
+    Endpoint.exchange_detail: 0.002,
+    Endpoint.exchange_markets: 0.002,
+}
+DEFAULT_COST = 0.015
+
+
+class AllowanceLimiter:
+    """
+    Pace outgoing requests so that an allowance budget lasts a full window.
+
+    Credits become available at a steady rate of ``budget / window`` per second,
+    and up to ``burst`` seconds worth of them can be spent at once. Each request
+    reserves its estimated cost before it is sent; when there are not enough
+    credits, the caller waits until its reservation is covered, so concurrent
+    callers are served in order.
+
+    The limiter learns from the allowance returned with each response: the cost
+    of every endpoint is tracked as a moving average, and the spending rate is
+    lowered when the remaining allowance would not last until the end of the
+    window. If no budget is given, it is taken from the remaining allowance.
+
+    The window starts when the limiter is created; use :meth:`align_window` to
+    line it up with the reset of the allowance. A request that would have to
+    wait longer than ``max_wait`` seconds is not reserved, and raises a
+    ``RateLimitError`` with the wait as its ``retry_after`` instead. Without a
+    ``max_wait``, a caller waits until the window resets once the allowance is
+    used up, which can take hours.
+
+    The same limiter can be shared by several clients, threads and event loops.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        budget: Optional[float] = None,
+        window: float = ONE_DAY,
+        burst: float = 60.0,
+        smoothing: float = 0.2,
+        max_wait: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.budget = budget
+        self.window = window
+        self.burst = burst
+        self.smoothing = smoothing
+        self.max_wait = max_wait
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._costs = dict(DEFAULT_COSTS)
+        self._observed: Set[str] = set()
+        self._remaining: Optional[float] = None
+        self._remaining_window = 0
+        self._window_start = clock()
+        self._tokens: Optional[float] = None
+        self._updated = self._window_start
+
+    @property
+    def remaining(self) -> Optional[float]:
+        """The remaining allowance as last reported by the API."""
+        return self._remaining
+
+    def estimate_cost(self, endpoint: str) -> float:
+        """Get the expected cost of a request to an endpoint."""
+        return self._costs.get(endpoint, DEFAULT_COST)
+
+    def acquire(self, endpoint: str) -> None:
+        """Block until a request to the endpoint may be sent."""
+        delay = self.reserve(endpoint)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self, endpoint: str) -> None:
+        """Wait until a request to the endpoint may be sent."""
+        delay = self.reserve(endpoint)
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                self.cancel(endpoint)
+                raise
+
+    def reserve(self, endpoint: str, max_wait: Optional[float] = None) -> float:
+        """
+        Reserve the credits for a request to an endpoint.
+
+        Args:
+            endpoint: The endpoint that will be requested.
+            max_wait: The longest wait to accept, ``max_wait`` of the limiter if
+                not given.
+
+        Returns:
+            The number of seconds to wait before sending the request.
+
+        Raises:
+            RateLimitError: The wait would be longer than ``max_wait``. Nothing
+                is reserved.
+        """
+        max_wait = self.max_wait if max_wait is None else max_wait
+        with self._lock:
+            now = self._clock()
+            time_left = self._time_left(now)
+            if self._window_index(now) != self._remaining_window:
+                # the allowance has been reset since it was last reported
+                self._remaining = None
+            if self._remaining is not None and self._remaining <= 0:
+                self._check_wait(time_left, max_wait)
+                return time_left
+            rate = self._rate(time_left)
+            if rate is None:
+                return 0.0
+            cost = self.estimate_cost(endpoint)
+            capacity = max(rate * self.burst, cost)
+            tokens = capacity if self._tokens is None else self._tokens
+            tokens = min(capacity, tokens + (now - self._updated) * rate)
+            self._tokens = tokens
+            self._updated = now
+            if tokens < cost:
+                self._check_wait((cost - tokens) / rate, max_wait)
+            self._tokens = tokens - cost
+            return 0.0 if tokens >= cost else (cost - tokens) / rate
+
+    def cancel(self, endpoint: str) -> None:
+        """Give back the credits of a reservation whose request was not sent."""
+        with self._lock:
+            if self._tokens is not None:
+                self._tokens += self.estimate_cost(endpoint)
+
+    def align_window(self, time_left: float) -> None:
+        """Line up the window with the reset of the allowance, in seconds."""
+        with self._lock:
+            now = self._clock()
+            self._window_start = now + time_left - self.window
+            self._remaining_window = self._window_index(now)
+
+    @staticmethod
+    def _check_wait(delay: float, max_wait: Optional[float]) -> None:
+        """Raise if a request would have to wait too long."""
+        if max_wait is not None and delay > max_wait:
+            msg = f"Allowance budget exhausted, retry in {delay:.1f}s"
+            raise RateLimitError(msg, retry_after=delay)
+
+    def update(self, endpoint: str, allowance: Allowance) -> None:
+        """
+        Update the cost model and remaining allowance from a response.
+
+        Args:
+            endpoint: The endpoint that was requested.
+            allowance: The allowance returned with the response.
+        """
+        with self._lock:
+            if endpoint in self._observed:
+                previous = self._costs[endpoint]
+                self._costs[endpoint] = previous + self.smoothing * (
+                    allowance.cost - previous
+                )
+            else:
+                self._observed.add(endpoint)
+                self._costs[endpoint] = allowance.cost
+            remaining = allowance.remaining
+            if isinstance(allowance, AllowanceAuthenticated):
+                remaining += allowance.remaining_paid
+            self._remaining = remaining
+            self._remaining_window = self._window_index(self._clock())
+
+    def _window_index(self, now: float) -> int:
+        """Get the number of windows that have passed since the limiter started."""
+        return int((now - self._window_start) // self.window)
+
+    def _time_left(self, now: float) -> float:
+        """Get the number of seconds until the current window ends."""
+        return self.window - (now - self._window_start) % self.window
+
+    def _rate(self, time_left: float) -> Optional[float]:
+        """Get the number of credits that may be spent per second."""
+        rates = []
+        if self.budget is not None:
+            rates.append(self.budget / self.window)
+        if self._remaining is not None:
+            rates.append(self._remaining / time_left)
+        return min(rates) if rates else None
@@ -0,0 +1,248 @@
+"""Retries with backoff and hedged requests."""
+
+import asyncio
+import email.utils
+import math
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from typing import (
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    FrozenSet,
+    Optional,
+    TypeVar,
+)
+
+import attrs
+from apiclient.exceptions import ServerError, UnexpectedError
+
+from pycwatch.lib.exceptions import RateLimitError
+
+T = TypeVar("T")
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Get the seconds to wait from a Retry-After header.
+
+    >>> parse_retry_after("3")
+    3.0
+    >>> parse_retry_after("Thu, 01 Jan 1970 00:00:00 GMT")
+    0.0
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        moment = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(moment.timestamp() - time.time(), 0.0)
+
+
+@attrs.frozen
+class RetryPolicy:
+    """
+    When and after how long to retry a failed request.
+
+    Server errors and failed connections are retried with exponential backoff and
+    full jitter: the n-th retry waits a random time of up to
+    ``backoff * 2 ** (n - 1)`` seconds, capped at ``max_backoff``. A 429 response
+    is retried after its Retry-After delay if that is not longer than
+    ``max_backoff``, and not at all without one, as the API then reports that the
+    allowance is used up. Only idempotent methods are retried.
+    """
+
+    attempts: int = 3
+    backoff: float = 0.2
+    max_backoff: float = 10.0
+    methods: FrozenSet[str] = IDEMPOTENT_METHODS
+
+    def delay(
+        self,
+        attempt: int,
+        error: BaseException,
+        method: str = "GET",
+        rng: Callable[[], float] = random.random,
+    ) -> Optional[float]:
+        """
+        Get the seconds to wait before retrying a failed attempt.
+
+        Args:
+            attempt: The number of the attempt that failed, starting at 1.
+            error: The exception of the attempt.
+            method: The HTTP method of the request.
+            rng: Returns a random number between 0 and 1.
+
+        Returns:
+            The delay, or `None` if the request should not be retried.
+        """
+        if attempt >= self.attempts or method.upper() not in self.methods:
+            return None
+        if isinstance(error, RateLimitError):
+            retry_after = error.retry_after
+            if retry_after is None or retry_after > self.max_backoff:
+                return None
+            return retry_after
+        if not isinstance(error, (ServerError, UnexpectedError)):
+            return None
+        return rng() * min(self.max_backoff, self.backoff * 2.0 ** (attempt - 1))
+
+
+def retry_call(
+    func: Callable[[], T],
+    policy: RetryPolicy,
+    method: str = "GET",
+    sleep: Callable[[float], None] = time.sleep,
+) -> T:
+    """Call a function, retrying it as long as the policy allows."""
+    attempt = 1
+    while True:
+        try:
+            return func()
+        except Exception as exc:  # noqa: BLE001
+            delay = policy.delay(attempt, exc, method)
+            if delay is None:
+                raise
+        sleep(delay)
+        attempt += 1
+
+
+async def retry_call_async(
+    func: Callable[[], Awaitable[T]],
+    policy: RetryPolicy,
+    method: str = "GET",
+) -> T:
+    """Await a coroutine function, retrying it as long as the policy allows."""
+    attempt = 1
+    while True:
+        try:
+            return await func()
+        except Exception as exc:  # noqa: BLE001
+            delay = policy.delay(attempt, exc, method)
+            if delay is None:
+                raise
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+class LatencyTracker:
+    """The latencies of the last requests to each endpoint."""
+
+    def __init__(self, window: int = 200) -> None:
+        self.window = window
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, Deque[float]] = defaultdict(
+            lambda: deque(maxlen=window),
+        )
+
+    def observe(self, endpoint: str, latency: float) -> None:
+        """Record the seconds a request took."""
+        with self._lock:
+            self._latencies[endpoint].append(latency)
+
+    def count(self, endpoint: str) -> int:
+        """Get the number of latencies recorded for an endpoint."""
+        with self._lock:
+            return len(self._latencies[endpoint])
+
+    def quantile(self, endpoint: str, q: float) -> Optional[float]:
+        """Get a quantile of the recorded latencies, or `None` without any."""
+        with self._lock:
+            latencies = sorted(self._latencies[endpoint])
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, math.ceil(q * len(latencies)) - 1)]
+
+
+@attrs.frozen
+class HedgePolicy:
+    """
+    When to send a duplicate of a request that is slower than usual.
+
+    A duplicate is sent once a request has taken longer than the given quantile of
+    the recent latencies of its endpoint, and the first response wins. Each
+    duplicate uses allowance, so with the default quantile about one in twenty
+    requests costs twice. The sync client runs hedged requests in a thread pool
+    of ``max_workers`` threads.
+    """
+
+    quantile: float = 0.95
+    min_samples: int = 20
+    min_delay: float = 0.01
+    max_workers: int = 64
+
+    def delay(self, tracker: LatencyTracker, endpoint: str) -> Optional[float]:
+        """Get the seconds after which to hedge, or `None` while learning."""
+        if tracker.count(endpoint) < self.min_samples:
+            return None
+        latency = tracker.quantile(endpoint, self.quantile)
+        return None if latency is None else max(latency, self.min_delay)
+
+
+def hedged_call(func: Callable[[], T], delay: float, executor: Executor) -> T:
+    """
+    Call a function, and call it again if it has not returned after a delay.
+
+    Args:
+        func: The function to call.
+        delay: The seconds to wait before sending the duplicate.
+        executor: Runs the calls.
+
+    Returns:
+        The result of the call that succeeds first, or the exception of the
+        duplicate if both fail.
+    """
+    first = executor.submit(func)
+    try:
+        return first.result(timeout=delay)
+    except FuturesTimeoutError:
+        pass
+    second = executor.submit(func)
+    done, pending = wait([first, second], return_when=FIRST_COMPLETED)
+    winner: "Future[T]" = done.pop()
+    if winner.exception() is not None and pending:
+        winner = pending.pop()
+    return winner.result()
+
+
+async def hedged_call_async(func: Callable[[], Awaitable[T]], delay: float) -> T:
+    """
+    Like :func:`hedged_call`, but for a coroutine function.
+
+    The calls that have not finished are cancelled when the result is returned,
+    or when the caller is cancelled.
+    """
+    attempts = [asyncio.ensure_future(func())]
+    try:
+        done, _ = await asyncio.wait(attempts, timeout=delay)
+        if done:
+            return attempts[0].result()
+        attempts.append(asyncio.ensure_future(func()))
+        done, pending = await asyncio.wait(
+            attempts,
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        winner = done.pop()
+        if winner.exception() is not None and pending:
+            winner = pending.pop()
+            await asyncio.wait({winner})
+        return winner.result()
+    finally:
+        for attempt in attempts:
+            if not attempt.done():
+                attempt.cancel()
+            elif not attempt.cancelled():
+                # retrieve the exception of a losing call, so it is not logged
+                attempt.exception()
@@ -0,0 +1,203 @@
+"""Incremental parsing of large responses."""
+
+import codecs
+import json
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+ResultKey = Union[str, int]
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+NUMBER_START = frozenset("-0123456789")
+DELIMITERS = frozenset(" \t\n\r,]}")
+
+# what the parser expects next
+_START = "start"
+_TOP_KEY = "top key"
+_TOP_COLON = "top colon"
+_TOP_VALUE = "top value"
+_TOP_NEXT = "top next"
+_ITEM_KEY = "item key"
+_ITEM_COLON = "item colon"
+_ITEM_VALUE = "item value"
+_ITEM_NEXT = "item next"
+_DONE = "done"
+
+
+class ResultStreamParser:
+    """
+    A push parser that yields the members of the result of a response.
+
+    Feed it the body of a response in chunks of any size. For each chunk, it
+    returns the members of the top level ``result`` that are complete so far, as
+    ``(key, value)`` pairs for an object and ``(index, value)`` pairs for an array.
+    The other top level members, like ``allowance`` and ``cursor``, are collected
+    in :attr:`members`. Only the member being parsed is buffered, so memory use
+    does not grow with the size of the response.
+
+    >>> parser = ResultStreamParser()
+    >>> parser.feed(b'{"result": {"a": 1, "b"')
+    [('a', 1)]
+    >>> parser.feed(b': [2]}, "allowance": {"cost": 0.1}}')
+    [('b', [2])]
+    >>> parser.close()
+    []
+    >>> parser.members
+    {'allowance': {'cost': 0.1}}
+    """
+
+    def __init__(
+        self,
+        result_key: str = "result",
+        parse_float: Optional[Callable[[str], Any]] = None,
+    ) -> None:
+        self.result_key = result_key
+        self.members: Dict[str, Any] = {}
+        self._decoder = json.JSONDecoder(parse_float=parse_float)
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._state = _START
+        self._key: Optional[str] = None
+        self._closing = "}"
+        self._index = 0
+
+    @property
+    def done(self) -> bool:
+        """Check whether the whole response has been parsed."""
+        return self._state == _DONE
+
+    def feed(self, data: bytes) -> List[Tuple[ResultKey, Any]]:
+        """
+        Parse the next chunk of the response.
+
+        Args:
+            data: The next bytes of the response body.
+
+        Returns:
+            The members of the result that have been completed by the chunk.
+        """
+        self._buffer += self._text_decoder.decode(data)
+        items: List[Tuple[ResultKey, Any]] = []
+        pos = self._parse(0, items, final=False)
+        self._buffer = self._buffer[pos:]
+        return items
+
+    def close(self) -> List[Tuple[ResultKey, Any]]:
+        """
+        Parse the rest of the buffer and check that the response is complete.
+
+        Returns:
+            The members of the result that were still buffered.
+        """
+        self._buffer += self._text_decoder.decode(b"", final=True)
+        items: List[Tuple[ResultKey, Any]] = []
+        pos = self._parse(0, items, final=True)
+        if not self.done or self._buffer[pos:].strip():
+            msg = "Incomplete JSON response"
+            raise ValueError(msg)
+        self._buffer = ""
+        return items
+
+    def _parse(  # noqa: C901, PLR0912, PLR0915
+        self,
+        pos: int,
+        items: List[Tuple[ResultKey, Any]],
+        *,
+        final: bool,
+    ) -> int:
+        """Parse as much of the buffer as possible and return the position."""
+        buffer = self._buffer
+        while True:
+            pos = WHITESPACE.match(buffer, pos).end()  # type: ignore[union-attr]
+            if pos == len(buffer) or self._state == _DONE:
+                return pos
+            char = buffer[pos]
+            if self._state == _START:
+                self._expect(char, "{")
+                self._state = _TOP_KEY
+                pos += 1
+            elif self._state in (_TOP_KEY, _ITEM_KEY):
+                if char in "}]":
+                    pos = self._close_container(char, pos)
+                    continue
+                decoded = self._decode(pos, final=final)
+                if decoded is None:
+                    return pos
+                self._key, pos = decoded
+                self._state = _TOP_COLON if self._state == _TOP_KEY else _ITEM_COLON
+            elif self._state in (_TOP_COLON, _ITEM_COLON):
+                self._expect(char, ":")
+                self._state = _TOP_VALUE if self._state == _TOP_COLON else _ITEM_VALUE
+                pos += 1
+            elif self._state == _TOP_VALUE:
+                if self._key == self.result_key and char in "{[":
+                    self._closing = "}" if char == "{" else "]"
+                    self._state = _ITEM_KEY if char == "{" else _ITEM_VALUE
+                    self._index = 0
+                    pos += 1
+                    continue
+                decoded = self._decode(pos, final=final)
+                if decoded is None:
+                    return pos
+                value, pos = decoded
+                self.members[str(self._key)] = value
+                self._state = _TOP_NEXT
+            elif self._state == _ITEM_VALUE:
+                if char == "]" and self._closing == "]":
+                    pos = self._close_container(char, pos)
+                    continue
+                decoded = self._decode(pos, final=final)
+                if decoded is None:
+                    return pos
+                value, pos = decoded
+                if self._closing == "}":
+                    items.append((str(self._key), value))
+                else:
+                    items.append((self._index, value))
+                    self._index += 1
+                self._state = _ITEM_NEXT
+            elif self._state in (_TOP_NEXT, _ITEM_NEXT):
+                if char == ",":
+                    if self._state == _TOP_NEXT:
+                        self._state = _TOP_KEY
+                    else:
+                        self._state = _ITEM_KEY if self._closing == "}" else _ITEM_VALUE
+                    pos += 1
+                else:
+                    pos = self._close_container(char, pos)
+
+    def _close_container(self, char: str, pos: int) -> int:
+        """Handle the end of the result or of the whole response."""
+        if self._state in (_TOP_KEY, _TOP_NEXT):
+            self._expect(char, "}")
+            self._state = _DONE
+        else:
+            self._expect(char, self._closing)
+            self._state = _TOP_NEXT
+        return pos + 1
+
+    def _decode(self, pos: int, *, final: bool) -> Optional[Tuple[Any, int]]:
+        """Decode the value at a position, or `None` if it is not complete yet."""
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            return None
+        # a number is only complete once it is followed by a delimiter, otherwise
+        # it may continue in the next chunk
+        if (
+            not final
+            and self._buffer[pos] in NUMBER_START
+            and (end == len(self._buffer) or self._buffer[end] not in DELIMITERS)
+        ):
+            return None
+        return value, end
+
+    def _expect(self, char: str, expected: str) -> None:
+        """Raise an error if a character is not the expected one."""
+        if char != expected:
+            msg = f"Expected '{expected}' in JSON response, got '{char}'"
+            raise ValueError(msg)
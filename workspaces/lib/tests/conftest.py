@@ -1,8 +1,15 @@
 """Fixtures and configuration for the test suite."""
+import threading
+from collections import defaultdict, deque
 from pathlib import Path
+from typing import Deque, Dict, Iterator, Tuple
 
+import httpx
 import pytest
 import vcr
+from benchmarks.replay import ReplayServer
+from vcr.persisters.filesystem import FilesystemPersister
+from vcr.serializers import yamlserializer
 
 from pycwatch.lib import CryptoWatchClient
 
@@ -17,6 +24,65 @@ api_vcr = my_vcr = vcr.VCR(
 )
 
 
+def cassette_transport(cassette_file: str) -> httpx.MockTransport:
+    """Create an httpx transport that replays the responses of a VCR cassette.
+
+    Responses recorded for the same request are played back in order.
+    """
+    requests, responses = FilesystemPersister.load_cassette(
+        BASE_DIR.joinpath("vcr_cassettes", cassette_file).as_posix(),
+        yamlserializer,
+    )
+    recorded: Dict[Tuple[str, str], Deque[Dict]] = defaultdict(deque)
+    for request, response in zip(requests, responses):
+        recorded[(request.method, request.uri)].append(response)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        queue = recorded[(request.method, str(request.url))]
+        response = queue[0] if len(queue) == 1 else queue.popleft()
+        return httpx.Response(
+            status_code=response["status"]["code"],
+            content=response["body"]["string"],
+        )
+
+    return httpx.MockTransport(handler)
+
+
+class LocalServer(ReplayServer):
+    """The replay server, serving only the cassettes that a test loads."""
+
+    def __init__(self) -> None:
+        super().__init__(responses={})
+
+
+@pytest.fixture()
+def local_server() -> Iterator[LocalServer]:
+    """Provide a local server that replays cassettes."""
+    server = LocalServer()
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class FakeClock:
+    """A clock that only moves when told to."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        """Get the current time."""
+        return self.now
+
+
+@pytest.fixture()
+def clock() -> FakeClock:
+    """Provide a fake clock."""
+    return FakeClock()
+
+
 @pytest.fixture()
 def live_client() -> CryptoWatchClient:
     """Provide the live client."""
@@ -0,0 +1,120 @@
+"""Tests for the NumPy arrays of list-encoded results."""
+
+import asyncio
+import json
+from typing import Any, Dict, Optional
+
+import httpx
+import pytest
+
+from pycwatch.lib import AsyncCryptoWatchClient, CryptoWatchClient
+from pycwatch.lib.conversion import NumericBackend
+from pycwatch.lib.exceptions import ResponseStructureError
+
+np = pytest.importorskip("numpy")
+
+from pycwatch.lib.arrays import ohlcv_array, ohlcv_arrays, ohlcv_dtype  # noqa: E402
+
+ROWS = [
+    [1692403200, 26098.1, 26200, 25900.55, 26012.34567891, 12.5, 325154.3],
+    [1692406800, 26012.3, 26050, 25950, 26001, 3.25, 84503.25],
+]
+OHLC_BODY = {
+    "result": {"3600": ROWS, "86400": []},
+    "allowance": {
+        "cost": 0.015,
+        "remaining": 9.9,
+        "upgrade": "For unlimited API access, create an account",
+    },
+}
+
+
+def test_float_array() -> None:
+    """Verify candles become a structured array of int64 and float64 columns."""
+    array = ohlcv_array(ROWS)
+
+    assert array.dtype == ohlcv_dtype()
+    assert array.dtype["close_time"] == np.int64
+    assert array.dtype["close_price"] == np.float64
+    assert array["close_time"].tolist() == [1692403200, 1692406800]
+    assert array["close_price"].tolist() == [26012.34567891, 26001.0]
+    assert array[1]["volume"] == 3.25
+
+
+def test_fixed_point_array() -> None:
+    """Verify the fixed point backend stores prices as int64 units of 1e-8."""
+    array = ohlcv_array(ROWS, NumericBackend.FIXED)
+
+    assert array.dtype["close_price"] == np.int64
+    assert array["close_price"].tolist() == [2601234567891, 2600100000000]
+    assert array["open_price"][0] == 2609810000000
+
+
+def test_empty_period() -> None:
+    """Verify a period without candles becomes an empty array."""
+    arrays = ohlcv_arrays({"60": []})
+
+    assert arrays["60"].shape == (0,)
+    assert arrays["60"].dtype == ohlcv_dtype()
+
+
+def test_decimal_backend_rejected() -> None:
+    """Verify arrays can not hold decimals."""
+    with pytest.raises(ValueError, match="not decimals"):
+        ohlcv_dtype(NumericBackend.DECIMAL)
+
+
+def test_get_ohlcv_arrays(
+    live_client: CryptoWatchClient,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Verify the client returns arrays with the allowance of the response."""
+
+    def get(endpoint: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        assert endpoint.endswith("markets/kraken/btceur/ohlc")
+        assert params == {"periods": "3600,86400"}
+        return json.loads(json.dumps(OHLC_BODY))
+
+    monkeypatch.setattr(live_client, "get", get)
+    response = live_client.get_ohlcv_arrays(
+        "kraken",
+        "btceur",
+        periods=[3600, 86400],
+        numeric_backend="fixed",
+    )
+
+    assert set(response.result) == {"3600", "86400"}
+    assert response.result["3600"]["close_time"].tolist() == [1692403200, 1692406800]
+    assert response.result["3600"].dtype["volume"] == np.int64
+    assert response.allowance.cost == pytest.approx(0.015)
+
+
+def test_get_ohlcv_arrays_invalid(
+    live_client: CryptoWatchClient,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Verify malformed candles raise a structure error."""
+    body = {**OHLC_BODY, "result": {"60": [[1, 2, 3]]}}
+    monkeypatch.setattr(live_client, "get", lambda *_, **__: body)
+
+    with pytest.raises(ResponseStructureError):
+        live_client.get_ohlcv_arrays("kraken", "btceur")
+
+
+def test_get_ohlcv_arrays_async() -> None:
+    """Verify the async client returns the same arrays."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.path.endswith("markets/kraken/btceur/ohlc")
+        return httpx.Response(200, json=OHLC_BODY)
+
+    async def fetch() -> Any:
+        async with AsyncCryptoWatchClient(
+            transport=httpx.MockTransport(handler),
+        ) as client:
+            return await client.get_ohlcv_arrays("kraken", "btceur")
+
+    response = asyncio.run(fetch())
+
+    np.testing.assert_array_equal(response.result["3600"], ohlcv_array(ROWS))
+    assert response.result["86400"].shape == (0,)
@@ -0,0 +1,71 @@
+"""Tests for the asynchronous client."""
+
+import asyncio
+from typing import List
+
+import pytest
+from apiclient.exceptions import ClientError
+
+from pycwatch.lib import AsyncCryptoWatchClient, CryptoWatchClient
+from pycwatch.lib.models import MarketPrice, Response
+from tests.conftest import api_vcr, cassette_transport
+
+MARKETS = [
+    ("kraken", "btceur"),
+    ("binance", "ethbtc"),
+    ("kraken", "ltcbtc"),
+    ("bittrex", "neoeth"),
+]
+
+
+def test_init_with_key(api_key: str) -> None:
+    """Verify that the async client can be initialized with an API key."""
+    client = AsyncCryptoWatchClient(api_key)
+    assert client._api_key == api_key
+    assert client.is_authenticated
+    assert client._http_client.headers["X-CW-API-Key"] == api_key
+
+
+def test_results_match_sync_client(live_client: CryptoWatchClient) -> None:
+    """Verify the async client structures responses like the sync client."""
+
+    async def fetch() -> List[Response[MarketPrice]]:
+        async with AsyncCryptoWatchClient(
+            transport=cassette_transport("get_market_price.yml"),
+        ) as client:
+            return await asyncio.gather(
+                *(client.get_market_price(exchange, pair) for exchange, pair in MARKETS)
+            )
+
+    with api_vcr.use_cassette("get_market_price.yml"):
+        expected = [live_client.get_market_price(*market) for market in MARKETS]
+
+    assert asyncio.run(fetch()) == expected
+
+
+def test_query_params() -> None:
+    """Verify unset query parameters are not sent."""
+
+    async def fetch() -> None:
+        async with AsyncCryptoWatchClient(
+            transport=cassette_transport("list_assets.yml"),
+        ) as client:
+            assets = await client.list_assets(limit=20)
+            assert len(assets.result) == 20
+            assets = await client.list_assets(cursor=assets.cursor.last, limit=20)
+            assert len(assets.result) == 20
+
+    asyncio.run(fetch())
+
+
+def test_error_response() -> None:
+    """Verify unsuccessful responses raise the apiclient errors."""
+
+    async def fetch() -> None:
+        async with AsyncCryptoWatchClient(
+            transport=cassette_transport("get_market_price.yml"),
+        ) as client:
+            await client.get_market_price(exchange="kraken", pair="aaabbb")
+
+    with pytest.raises(ClientError, match="404 Error: Not Found"):
+        asyncio.run(fetch())
@@ -0,0 +1,231 @@
+"""Tests for the response cache."""
+
+import asyncio
+import logging
+import time
+from typing import Callable, List, Tuple
+
+import httpx
+import pytest
+from benchmarks.replay import Fault
+
+from pycwatch.lib import AsyncCryptoWatchClient, CryptoWatchClient
+from pycwatch.lib.cache import DEFAULT_TTLS, LIVE_TTLS, ResponseCache, make_cache_key
+from pycwatch.lib.endpoints import Endpoint
+from tests.conftest import FakeClock, LocalServer, api_vcr, cassette_transport
+
+
+def wait_for(condition: Callable[[], bool]) -> None:
+    """Wait until a background refresh has done something."""
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_cache_key() -> None:
+    """Verify the key does not depend on the order of parameters."""
+    key = make_cache_key(Endpoint.list_assets, None, {"cursor": "a", "limit": 1})
+
+    assert key == make_cache_key(
+        Endpoint.list_assets,
+        {},
+        {"limit": 1, "cursor": "a"},
+    )
+    assert key != make_cache_key(Endpoint.list_assets, None, {"limit": 1})
+
+
+def test_ttl(clock: FakeClock) -> None:
+    """Verify values expire after the TTL of their endpoint."""
+    cache = ResponseCache({Endpoint.market_summary: 5}, clock=clock)
+    key = make_cache_key(Endpoint.market_summary, {"pair": "btceur"}, None)
+    cache.set(key, "summary")
+
+    clock.now = 4.9
+    assert cache.get(key) == "summary"
+    clock.now = 5
+    assert cache.get(key) is None
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+
+def test_uncached_endpoint(clock: FakeClock) -> None:
+    """Verify endpoints without a TTL are not cached."""
+    cache = ResponseCache({Endpoint.market_summary: 5}, clock=clock)
+    key = make_cache_key(Endpoint.market_price, None, None)
+    cache.set(key, "price")
+
+    assert not cache.is_cached(Endpoint.market_price)
+    assert len(cache) == 0
+
+
+def test_lru_eviction(clock: FakeClock) -> None:
+    """Verify the least recently used value is evicted first."""
+    cache = ResponseCache({Endpoint.asset_detail: 60}, maxsize=2, clock=clock)
+    keys = [make_cache_key(Endpoint.asset_detail, {"code": c}, None) for c in "abc"]
+    cache.set(keys[0], "a")
+    cache.set(keys[1], "b")
+    cache.get(keys[0])
+    cache.set(keys[2], "c")
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == "a"
+    assert cache.get(keys[2]) == "c"
+    assert cache.stats.evictions == 1
+
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_client_cache() -> None:
+    """Verify cached responses are served without a request."""
+    client = CryptoWatchClient(cache=ResponseCache())
+
+    with api_vcr.use_cassette("get_exchange.yml", record_mode="none") as cassette:
+        exchange = client.get_exchange("kraken")
+        assert client.get_exchange("kraken") is exchange
+        assert client.get_exchange("binance") is not exchange
+
+    assert cassette.play_count == 2
+    assert client.cache is not None
+    assert client.cache.stats.hits == 1
+
+
+def test_stale_values(clock: FakeClock) -> None:
+    """Verify expired values are served for as long as they may be stale."""
+    cache = ResponseCache(LIVE_TTLS, clock=clock, max_staleness=10)
+    key = make_cache_key(Endpoint.market_price, {"pair": "btceur"}, None)
+    cache.set(key, "price")
+
+    assert cache.get_stale(key) is None
+    clock.now = 5
+    assert cache.get(key) is None
+    assert cache.get_stale(key) == "price"
+    clock.now = 11
+    assert cache.get_stale(key) is None
+    assert cache.stats.stale == 1
+
+
+def test_refresh(clock: FakeClock) -> None:
+    """Verify a value is refreshed once at a time and dropped when that fails."""
+    cache = ResponseCache(LIVE_TTLS, clock=clock, max_staleness=10)
+    key = make_cache_key(Endpoint.market_price, {"pair": "btceur"}, None)
+    cache.set(key, "price")
+    clock.now = 5
+
+    assert cache.begin_refresh(key)
+    assert not cache.begin_refresh(key)
+    cache.end_refresh(key)
+    assert cache.begin_refresh(key)
+    cache.end_refresh(key, failed=True)
+    assert cache.get_stale(key) is None
+
+    cache.stale_if_error = True
+    cache.set(key, "price")
+    clock.now = 10
+    cache.end_refresh(key, failed=True)
+    assert cache.get_stale(key) == "price"
+
+
+def test_stale_mode_ttls() -> None:
+    """Verify serving stale values caches live market data unless told otherwise."""
+    assert ResponseCache().ttls == DEFAULT_TTLS
+    cache = ResponseCache(max_staleness=10)
+    for endpoint in (
+        Endpoint.market_price,
+        Endpoint.market_summary,
+        Endpoint.all_market_prices,
+        Endpoint.market_orderbook,
+    ):
+        assert cache.ttls[endpoint] == LIVE_TTLS[endpoint]
+    assert cache.ttls[Endpoint.list_markets] == DEFAULT_TTLS[Endpoint.list_markets]
+    assert ResponseCache({}, max_staleness=10).ttls == {}
+
+
+def test_client_stale_while_revalidate(
+    local_server: LocalServer,
+    clock: FakeClock,
+) -> None:
+    """Verify stale responses are returned at once and refreshed in the background."""
+    local_server.load_cassette("get_market_price.yml")
+    cache = ResponseCache(LIVE_TTLS, clock=clock, max_staleness=60)
+    client = CryptoWatchClient(base_url=local_server.url, cache=cache)
+    price = client.get_market_price("kraken", "btceur")
+
+    clock.now = 2
+    assert client.get_market_price("kraken", "btceur") is price
+    assert client.get_market_price("kraken", "btceur") is price
+    wait_for(lambda: client.get_market_price("kraken", "btceur") is not price)
+    assert len(local_server.requests) == 2
+
+    # a failed refresh drops the stale response, so the next call waits for one
+    clock.now = 4
+    local_server.faults.append(Fault(503))
+    stale = client.get_market_price("kraken", "btceur")
+    assert stale is not price
+    wait_for(lambda: len(cache) == 0)
+    assert client.get_market_price("kraken", "btceur") is not stale
+    assert len(local_server.requests) == 4
+    assert cache.stats.refresh_errors == 1
+    client.close()
+
+
+def test_client_refresh_errors(
+    local_server: LocalServer,
+    clock: FakeClock,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    """Verify failed refreshes are logged, and the client closes its threads."""
+    local_server.load_cassette("get_market_summary.yml")
+    cache = ResponseCache(clock=clock, max_staleness=60, stale_if_error=True)
+    with CryptoWatchClient(base_url=local_server.url, cache=cache) as client:
+        summary = client.get_market_summary("kraken", "btceur")
+        clock.now = 2
+        local_server.faults.append(Fault(503))
+        with caplog.at_level(logging.WARNING, logger="pycwatch.lib.client"):
+            assert client.get_market_summary("kraken", "btceur") is summary
+            wait_for(lambda: cache.stats.refresh_errors == 1)
+        executor = client._refresh_executor
+
+    assert "Refreshing" in caplog.text
+    assert "ServerError" in caplog.text
+    assert client._refresh_executor is None
+    assert executor is not None
+    with pytest.raises(RuntimeError):
+        executor.submit(print)
+
+
+def test_async_client_stale_while_revalidate(clock: FakeClock) -> None:
+    """Verify the async client serves stale order books while refreshing them."""
+    transport = cassette_transport("get_market_order_book.yml")
+    requests: List[int] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(len(requests))
+        if len(requests) == 2:
+            return httpx.Response(503, json={})
+        return transport.handle_request(request)
+
+    async def run() -> Tuple[bool, bool]:
+        cache = ResponseCache(
+            LIVE_TTLS,
+            clock=clock,
+            max_staleness=60,
+            stale_if_error=True,
+        )
+        async with AsyncCryptoWatchClient(
+            transport=httpx.MockTransport(handler),
+            cache=cache,
+        ) as client:
+            book = await client.get_market_order_book("kraken", "btceur")
+            clock.now = 2
+            # the refresh fails, and the stale order book is kept
+            failed = await client.get_market_order_book("kraken", "btceur") is book
+            await asyncio.sleep(0.01)
+            kept = await client.get_market_order_book("kraken", "btceur") is book
+            await asyncio.sleep(0.01)
+            clock.now = 2.5
+            fresh = await client.get_market_order_book("kraken", "btceur")
+            return failed and kept, fresh is not book
+
+    assert asyncio.run(run()) == (True, True)
+    assert len(requests) == 3
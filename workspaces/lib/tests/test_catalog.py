@@ -0,0 +1,229 @@
+"""Tests for the market catalog."""
+
+import asyncio
+import gzip
+from pathlib import Path
+from typing import AsyncIterator, Iterator, List
+
+import attrs
+import pytest
+
+from pycwatch.lib import CryptoWatchClient
+from pycwatch.lib.catalog import Catalog
+from pycwatch.lib.models import AssetMember, MarketMember, PairMember
+from tests.conftest import api_vcr
+
+ROUTE = "https://api.cryptowat.ch"
+BTC = AssetMember(
+    id_=60,
+    symbol="btc",
+    name="Bitcoin",
+    fiat=False,
+    sid="bitcoin",
+    route=f"{ROUTE}/assets/btc",
+)
+EUR = AssetMember(
+    id_=2,
+    symbol="eur",
+    name="Euro",
+    fiat=True,
+    sid="euro",
+    route=f"{ROUTE}/assets/eur",
+)
+ETH = AssetMember(
+    id_=77,
+    symbol="eth",
+    name="Ethereum",
+    fiat=False,
+    sid="ethereum",
+    route=f"{ROUTE}/assets/eth",
+)
+ASSETS = [BTC, EUR, ETH]
+PAIRS = [
+    PairMember(id_=232, symbol="btceur", base=BTC, quote=EUR, route="/pairs/btceur"),
+    PairMember(id_=125, symbol="etheur", base=ETH, quote=EUR, route="/pairs/etheur"),
+    PairMember(id_=9, symbol="ethbtc", base=ETH, quote=BTC, route="/pairs/ethbtc"),
+]
+MARKETS = [
+    MarketMember(
+        id_=1,
+        exchange="kraken",
+        pair="btceur",
+        active=True,
+        route="/markets/kraken/btceur",
+    ),
+    MarketMember(
+        id_=2,
+        exchange="kraken",
+        pair="etheur",
+        active=True,
+        route="/markets/kraken/etheur",
+    ),
+    MarketMember(
+        id_=3,
+        exchange="bitstamp",
+        pair="btceur",
+        active=True,
+        route="/markets/bitstamp/btceur",
+    ),
+    MarketMember(
+        id_=4,
+        exchange="kraken",
+        pair="ethbtc",
+        active=False,
+        route="/markets/kraken/ethbtc",
+    ),
+]
+
+
+@pytest.fixture()
+def catalog() -> Catalog:
+    """Provide a small catalog."""
+    return Catalog(ASSETS, PAIRS, MARKETS)
+
+
+def test_lookups(catalog: Catalog) -> None:
+    """Verify members are found by id, symbol and route."""
+    assert catalog.asset(60) is BTC
+    assert catalog.asset("eur") is EUR
+    assert catalog.pair("ethbtc") is PAIRS[2]
+    assert catalog.pair(125) is PAIRS[1]
+    assert catalog.market(3) is MARKETS[2]
+    assert catalog.market("kraken", "etheur") is MARKETS[1]
+    assert catalog.market("kraken", "xrpeur") is None
+    assert catalog.route("/markets/kraken/btceur") is MARKETS[0]
+    assert catalog.route("/pairs/btceur") is PAIRS[0]
+    assert catalog.route(f"{ROUTE}/assets/btc") is BTC
+    assert catalog.route("/nothing") is None
+    assert sorted(catalog.exchanges) == ["bitstamp", "kraken"]
+    assert repr(catalog) == "Catalog(3 assets, 3 pairs, 4 markets)"
+
+
+def test_find_pairs(catalog: Catalog) -> None:
+    """Verify pairs are found by base and quote asset."""
+    assert catalog.find_pairs(base="eth") == [PAIRS[1], PAIRS[2]]
+    assert catalog.find_pairs(quote="eur") == [PAIRS[0], PAIRS[1]]
+    assert catalog.find_pairs(base="eth", quote="btc") == [PAIRS[2]]
+    assert catalog.find_pairs() == PAIRS
+
+
+def test_find_markets(catalog: Catalog) -> None:
+    """Verify markets are found by exchange, asset and state."""
+    assert catalog.find_markets("kraken") == [MARKETS[0], MARKETS[1], MARKETS[3]]
+    assert catalog.find_markets(base="btc") == [MARKETS[0], MARKETS[2]]
+    assert catalog.find_markets("kraken", base="eth") == [MARKETS[1], MARKETS[3]]
+    assert catalog.find_markets("kraken", base="eth", active=True) == [MARKETS[1]]
+    assert catalog.find_markets(quote="btc") == [MARKETS[3]]
+    assert catalog.find_markets(active=False) == [MARKETS[3]]
+    assert catalog.find_markets("binance") == []
+
+
+def test_update(catalog: Catalog) -> None:
+    """Verify only changed members are reported and reindexed."""
+    moved = attrs.evolve(MARKETS[1], exchange="bitstamp", route="/markets/b/etheur")
+    added = MarketMember(
+        id_=5,
+        exchange="binance",
+        pair="ethbtc",
+        active=True,
+        route="/markets/binance/ethbtc",
+    )
+
+    changed = catalog.update(markets=[MARKETS[0], moved, MARKETS[2], added])
+
+    assert changed == {
+        "/markets/kraken/etheur",
+        "/markets/b/etheur",
+        "/markets/kraken/ethbtc",
+        "/markets/binance/ethbtc",
+    }
+    assert catalog.find_markets("kraken") == [MARKETS[0]]
+    assert catalog.market("kraken", "etheur") is None
+    assert catalog.market("bitstamp", "etheur") is moved
+    assert catalog.route("/markets/kraken/etheur") is None
+    assert catalog.find_markets(base="eth") == [moved, added]
+    assert catalog.asset("btc") is BTC
+    assert catalog.update(markets=catalog.markets) == set()
+
+
+def test_snapshot(catalog: Catalog, tmp_path: Path) -> None:
+    """Verify a saved snapshot loads into an equal catalog."""
+    path = tmp_path / "catalog.json.gz"
+    catalog.save(path)
+    loaded = Catalog.load(path)
+
+    assert loaded.assets == catalog.assets
+    assert loaded.pairs == catalog.pairs
+    assert loaded.markets == catalog.markets
+    assert loaded.market("kraken", "btceur") == MARKETS[0]
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_snapshot_version(tmp_path: Path) -> None:
+    """Verify snapshots of an unknown version are rejected."""
+    path = tmp_path / "catalog.json.gz"
+    path.write_bytes(gzip.compress(b'{"version": 0}'))
+
+    with pytest.raises(ValueError, match="version"):
+        Catalog.load(path)
+
+
+class FakeClient:
+    """A client that lists the members of the catalog."""
+
+    def iter_assets(self) -> Iterator[AssetMember]:
+        """Iterate over the assets."""
+        return iter(ASSETS)
+
+    def iter_pairs(self) -> Iterator[PairMember]:
+        """Iterate over the pairs."""
+        return iter(PAIRS)
+
+    def iter_markets(self) -> Iterator[MarketMember]:
+        """Iterate over the markets."""
+        return iter(MARKETS)
+
+
+class FakeAsyncClient:
+    """An async client that lists the members of the catalog."""
+
+    async def _iter(self, members: List[object]) -> AsyncIterator[object]:
+        for member in members:
+            yield member
+
+    def iter_assets(self) -> AsyncIterator[object]:
+        """Iterate over the assets."""
+        return self._iter(ASSETS)
+
+    def iter_pairs(self) -> AsyncIterator[object]:
+        """Iterate over the pairs."""
+        return self._iter(PAIRS)
+
+    def iter_markets(self) -> AsyncIterator[object]:
+        """Iterate over the markets."""
+        return self._iter(MARKETS)
+
+
+def test_fetch() -> None:
+    """Verify a catalog is built from the list endpoints of either client."""
+    catalog = Catalog.fetch(FakeClient())  # type: ignore[arg-type]
+    async_catalog = asyncio.run(
+        Catalog.fetch_async(FakeAsyncClient()),  # type: ignore[arg-type]
+    )
+
+    assert catalog.markets == async_catalog.markets == MARKETS
+    assert catalog.refresh(FakeClient()) == set()  # type: ignore[arg-type]
+
+
+def test_recorded_markets(live_client: CryptoWatchClient, tmp_path: Path) -> None:
+    """Verify the indexes agree with scanning the recorded market list."""
+    with api_vcr.use_cassette("list_markets.yml"):
+        markets = live_client.list_markets().result
+    catalog = Catalog(markets=markets)
+    path = tmp_path / "catalog.json.gz"
+    catalog.save(path)
+
+    assert catalog.find_markets("kraken") == [
+        market for market in markets if market.exchange == "kraken"
+    ]
+    assert Catalog.load(path).markets == markets
@@ -1,12 +1,17 @@
+from decimal import Decimal
+
 import attrs
 import pytest
+import requests
 from apiclient.exceptions import ResponseParseError
 from apiclient.response import Response
 
 from pycwatch.lib import CryptoWatchClient
 from pycwatch.lib.client import UJSONResponseHandler
+from pycwatch.lib.conversion import NumericBackend
 from pycwatch.lib.exceptions import ResponseStructureError
 from pycwatch.lib.models import ResponseRoot
+from tests.conftest import LocalServer, api_vcr
 
 
 def test_init_with_key(api_key: str) -> None:
@@ -59,3 +64,73 @@ def test_structuring_bad_response(live_client: CryptoWatchClient) -> None:
 
     with pytest.raises(ResponseStructureError):
         live_client._structure_response(response, ResponseRoot[ReponseCls])
+
+
+def test_numeric_backend() -> None:
+    """Verify the client structures numbers with its numeric backend."""
+    client = CryptoWatchClient(numeric_backend="float")
+
+    with api_vcr.use_cassette("get_market_summary.yml"):
+        summary = client.get_market_summary("kraken", "btceur")
+
+    assert client.numeric_backend == NumericBackend.FLOAT
+    assert isinstance(summary.result.price.last, float)
+    assert isinstance(summary.result.volume_quote, float)
+
+
+def test_base_url(local_server: LocalServer) -> None:
+    """Verify requests, streamed or not, are sent to the base URL."""
+    local_server.load_cassette("get_market_price.yml")
+    local_server.load_cassette("get_all_market_prices.yml")
+    client = CryptoWatchClient(base_url=f"{local_server.url}/")
+
+    price = client.get_market_price("kraken", "btceur").result.price
+    prices = dict(client.stream_all_market_prices())
+
+    assert client.base_url == local_server.url
+    assert price == Decimal("24063.4")
+    assert prices["market:kraken:btceur"] == Decimal("24067.9")
+    assert local_server.requests == ["/markets/kraken/btceur/price", "/markets/prices"]
+
+
+def test_connection_pool(local_server: LocalServer) -> None:
+    """Verify threads reuse the pooled connections instead of opening new ones."""
+    local_server.load_cassette("get_market_price.yml")
+    client = CryptoWatchClient(
+        base_url=local_server.url,
+        pool_maxsize=4,
+        pool_block=True,
+        timeout=2.5,
+        coalesce_requests=False,
+    )
+    markets = [("kraken", "btceur"), ("binance", "ethbtc")] * 20
+
+    results = list(client.map(client.get_market_price, markets, max_workers=4))
+
+    assert all(result.ok for result in results)
+    assert len(local_server.requests) == len(markets)
+    assert len(local_server.connections) <= 4
+    assert client.get_request_timeout() == 2.5
+
+
+def test_prewarm(local_server: LocalServer) -> None:
+    """Verify pre-warmed connections are reused by later requests."""
+    local_server.load_cassette("get_market_price.yml")
+    client = CryptoWatchClient(base_url=local_server.url, prewarm=2)
+    assert local_server.requests == ["/", "/"]
+    assert len(local_server.connections) == 2
+
+    client.get_market_price("kraken", "btceur")
+
+    assert len(local_server.connections) == 2
+
+
+def test_shared_session() -> None:
+    """Verify a session that is passed in is shared as is."""
+    session = requests.Session()
+    adapter = session.get_adapter("https://api.cryptowat.ch")
+    client = CryptoWatchClient(session=session)
+    other = CryptoWatchClient(session=session)
+
+    assert client.get_session() is other.get_session() is session
+    assert session.get_adapter("https://api.cryptowat.ch") is adapter
@@ -0,0 +1,158 @@
+"""Tests for the coalescing of concurrent requests."""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+import httpx
+import pytest
+
+from pycwatch.lib import AsyncCryptoWatchClient
+from pycwatch.lib.coalescing import AsyncSingleFlight, SingleFlight
+from pycwatch.lib.models import MarketPrice, Response
+from tests.conftest import cassette_transport
+
+
+def test_single_flight_shares_call() -> None:
+    """Verify threads calling at the same time share one call."""
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def func() -> int:
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 42
+
+    with ThreadPoolExecutor(4) as pool:
+        leader = pool.submit(flight.do, "key", func)
+        started.wait(5)
+        followers = [pool.submit(flight.do, "key", func) for _ in range(3)]
+        # give the followers time to join the call in flight
+        time.sleep(0.1)
+        release.set()
+        results = [leader.result(), *(f.result() for f in followers)]
+
+    assert results == [42] * 4
+    assert len(calls) == 1
+    # the key is released once the call has finished
+    assert flight.do("key", lambda: 0) == 0
+
+
+def test_single_flight_shares_exception() -> None:
+    """Verify the exception of a failed call is not swallowed."""
+    flight = SingleFlight()
+
+    def func() -> int:
+        raise KeyError
+
+    with pytest.raises(KeyError):
+        flight.do("key", func)
+    assert not flight._calls
+
+
+def test_async_single_flight() -> None:
+    """Verify tasks awaiting the same key share one call."""
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def func() -> int:
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 42
+
+    async def run() -> Tuple[int, ...]:
+        first = await asyncio.gather(*(flight.do("key", func) for _ in range(5)))
+        second = await flight.do("key", func)
+        return (*first, second)
+
+    assert asyncio.run(run()) == (42,) * 6
+    assert len(calls) == 2
+
+
+def test_async_single_flight_cancelled_caller() -> None:
+    """Verify cancelling one waiting task does not cancel the call for others."""
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def func() -> int:
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 42
+
+    async def run() -> List[int]:
+        leader = asyncio.ensure_future(flight.do("key", func))
+        await asyncio.sleep(0)
+        followers = [asyncio.ensure_future(flight.do("key", func)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.gather(*followers)
+
+    assert asyncio.run(run()) == [42, 42, 42]
+    assert len(calls) == 1
+
+
+def test_async_single_flight_all_cancelled() -> None:
+    """Verify the call is cancelled once every waiting task has been cancelled."""
+    flight = AsyncSingleFlight()
+    cancelled = []
+
+    async def func() -> int:
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+        return 42
+
+    async def run() -> None:
+        tasks = [asyncio.ensure_future(flight.do("key", func)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+
+    assert cancelled == [1]
+
+
+def test_async_client_coalesces_requests() -> None:
+    """Verify identical concurrent requests result in one HTTP request."""
+    transport = cassette_transport("get_market_price.yml")
+    sent: List[str] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        sent.append(request.url.path)
+        await asyncio.sleep(0.01)
+        return transport.handle_request(request)
+
+    async def fetch(*, coalesce_requests: bool) -> Tuple[Response[MarketPrice], ...]:
+        async with AsyncCryptoWatchClient(
+            transport=httpx.MockTransport(handler),
+            coalesce_requests=coalesce_requests,
+        ) as client:
+            return tuple(
+                await asyncio.gather(
+                    client.get_market_price("kraken", "btceur"),
+                    client.get_market_price("kraken", "btceur"),
+                    client.get_market_price("binance", "ethbtc"),
+                ),
+            )
+
+    first, second, third = asyncio.run(fetch(coalesce_requests=True))
+    assert first is second
+    assert third.result.price != first.result.price
+    assert len(sent) == 2
+
+    sent.clear()
+    first, second, _ = asyncio.run(fetch(coalesce_requests=False))
+    assert first is not second
+    assert len(sent) == 3
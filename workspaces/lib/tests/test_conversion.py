@@ -1,9 +1,25 @@
+from decimal import Decimal
 from typing import Any, Dict
 
 import attrs
 import pytest
 
-from pycwatch.lib.conversion import converter
+from pycwatch.lib.conversion import (
+    NumericBackend,
+    converter,
+    create_converter,
+    fixed_to_decimal,
+    get_converter,
+)
+from pycwatch.lib.models import (
+    MarketPrice,
+    MarketTradeList,
+    OHLCVDict,
+    OrderBook,
+    OrderBookArray,
+    OrderBookItem,
+    Trade,
+)
 
 
 @attrs.define()
@@ -40,3 +56,74 @@ def test_unstructuring(test_object: FakeObject) -> None:
 
     assert data["id"] == 1
     assert data["fooBar"] == "baz"
+
+
+def test_structuring_rows() -> None:
+    """Verify rows are structured with the types of their fields."""
+    trades = converter.structure([[0, 1692470072, 24079.5, 0.00133]], MarketTradeList)
+
+    assert trades == [
+        Trade(
+            id_="0",
+            timestamp=1692470072,
+            price=Decimal("24079.5"),
+            amount=Decimal("0.00133"),
+        ),
+    ]
+    assert converter.structure([1.5, 2], OrderBookItem) == OrderBookItem(
+        Decimal("1.5"),
+        Decimal("2"),
+    )
+
+
+def test_structuring_nested_rows() -> None:
+    """Verify lists of rows nested in other types use the bulk path."""
+    candles = converter.structure({"60": [[60, 1, 2, 0.5, 1.5, 10, 15]]}, OHLCVDict)
+
+    assert candles["60"][0].close_time == 60
+    assert candles["60"][0].low_price == Decimal("0.5")
+    assert converter.structure([], OrderBookArray) == []
+
+
+@pytest.mark.parametrize(
+    ("numeric_backend", "expected"),
+    [
+        ("decimal", Decimal("24079.5")),
+        ("float", 24079.5),
+        ("fixed", 2407950000000),
+    ],
+)
+def test_numeric_backend(numeric_backend: str, expected: Any) -> None:
+    """Verify every decimal field follows the numeric backend."""
+    backend_converter = get_converter(numeric_backend)
+    book = backend_converter.structure(
+        {"asks": [[24079.5, 0.00133]], "bids": [], "seqNum": 1},
+        OrderBook,
+    )
+    price = backend_converter.structure({"price": 24079.5}, MarketPrice)
+
+    assert book.asks[0].price == expected
+    assert type(book.asks[0].amount) is type(expected)
+    assert price.price == expected
+    assert get_converter(NumericBackend(numeric_backend)) is backend_converter
+
+
+def test_fixed_point_round_trip() -> None:
+    """Verify fixed point numbers convert back to the decimal they represent."""
+    amount = create_converter("fixed").structure(0.00133, Decimal)
+
+    assert amount == 133000
+    assert fixed_to_decimal(amount) == Decimal("0.00133")
+
+
+@pytest.mark.parametrize("value", [987654321.123457, "987654321.123457"])
+def test_fixed_point_precision(value: Any) -> None:
+    """Verify large numbers are scaled exactly, not through a float product."""
+    fixed_converter = create_converter("fixed")
+    book = fixed_converter.structure(
+        {"asks": [[value, value]], "bids": [], "seqNum": 1},
+        OrderBook,
+    )
+
+    assert fixed_converter.structure(value, Decimal) == 98765432112345700
+    assert book.asks[0].price == 98765432112345700
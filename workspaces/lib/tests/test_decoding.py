@@ -0,0 +1,115 @@
+"""Tests for the JSON decoders."""
+
+from decimal import Decimal
+from typing import Any
+
+import pytest
+from apiclient.exceptions import ResponseParseError
+from apiclient.response import Response
+from vcr.persisters.filesystem import FilesystemPersister
+from vcr.serializers import yamlserializer
+
+from pycwatch.lib import CryptoWatchClient
+from pycwatch.lib.client import get_response_handler
+from pycwatch.lib.decoding import (
+    DECIMAL,
+    available_decoders,
+    decode_response,
+    get_decoder,
+)
+from tests.conftest import BASE_DIR, api_vcr
+
+
+class BytesResponse(Response):
+    """A fake response that provides its body as bytes."""
+
+    class Original:
+        """A fake original response."""
+
+        def __init__(self, content: bytes) -> None:
+            self.content = content
+
+    def __init__(self, content: bytes) -> None:
+        self._original = self.Original(content)
+
+    def get_original(self) -> Any:
+        """Return the original response."""
+        return self._original
+
+
+def test_available_decoders() -> None:
+    """Verify the stdlib and ujson decoders are always available."""
+    decoders = available_decoders()
+
+    assert {"ujson", "json"} <= set(decoders)
+    assert get_decoder() is get_decoder(decoders[0])
+
+
+def test_unknown_decoder() -> None:
+    """Verify an unknown decoder is rejected."""
+    with pytest.raises(ValueError, match="not available"):
+        get_decoder("simdjson")
+
+
+@pytest.mark.parametrize(
+    "name",
+    [name for name in available_decoders() if name != DECIMAL],
+)
+def test_decode_bytes(name: str) -> None:
+    """Verify every decoder parses the body of a cassette the same way."""
+    _, responses = FilesystemPersister.load_cassette(
+        BASE_DIR.joinpath("vcr_cassettes", "get_market_summary.yml").as_posix(),
+        yamlserializer,
+    )
+    body = responses[0]["body"]["string"]
+    content = body.encode() if isinstance(body, str) else body
+    decoder = get_decoder(name)
+
+    assert decode_response(BytesResponse(content), decoder) == (
+        get_decoder("json")(content)
+    )
+    assert decode_response(BytesResponse(b""), decoder) is None
+    with pytest.raises(ResponseParseError):
+        decode_response(BytesResponse(b"foo"), decoder)
+
+
+def test_decimal_decoder() -> None:
+    """Verify numbers are decoded to decimals without rounding."""
+    response = BytesResponse(b'{"result": [[0.1, 24079.123456789012345, 7]]}')
+
+    data = decode_response(response, get_decoder(DECIMAL))
+
+    assert data == {
+        "result": [[Decimal("0.1"), Decimal("24079.123456789012345"), 7]],
+    }
+
+
+def test_decimal_client() -> None:
+    """Verify decimals decoded by the client are structured as they are."""
+    client = CryptoWatchClient(json_decoder=DECIMAL)
+
+    with api_vcr.use_cassette("get_market_order_book.yml"):
+        book = client.get_market_order_book("kraken", "btceur")
+
+    assert book.result.asks[0].price == Decimal("24093.2")
+    assert book.result.asks[0].amount == Decimal("0.06769469")
+
+
+def test_response_handler() -> None:
+    """Verify response handlers are created once per decoder."""
+    handler = get_response_handler("json")
+
+    assert handler is get_response_handler("json")
+    assert handler.decoder is get_decoder("json")
+    assert handler.get_request_data(BytesResponse(b'{"foo": 1}')) == {"foo": 1}
+
+
+def test_client_decoder() -> None:
+    """Verify the client can use a specific decoder."""
+    client = CryptoWatchClient(json_decoder="json")
+
+    with api_vcr.use_cassette("get_market_price.yml"):
+        response = client.get_market_price("kraken", "btceur")
+
+    assert client.get_response_handler().decoder is get_decoder("json")
+    assert response.result.price > 0
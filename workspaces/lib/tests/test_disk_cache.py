@@ -0,0 +1,160 @@
+"""Tests for the on-disk cache of response bodies."""
+
+import asyncio
+import os
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+import httpx
+
+from pycwatch.lib import AsyncCryptoWatchClient, CryptoWatchClient
+from pycwatch.lib.disk_cache import DiskCache
+from pycwatch.lib.endpoints import Endpoint
+from tests.conftest import FakeClock, LocalServer, cassette_transport
+
+BODY = b'{"result": [' + b'{"symbol": "btc"},' * 1000 + b'{"symbol": "eth"}]}'
+
+
+def test_round_trip(tmp_path: Path, clock: FakeClock) -> None:
+    """Verify bodies are stored compressed and served for the TTL."""
+    cache = DiskCache(tmp_path, {Endpoint.list_assets: 60}, clock=clock)
+    cache.set(Endpoint.list_assets, "/assets", {"limit": 5, "cursor": "a"}, BODY)
+    params = {"cursor": "a", "limit": 5}
+
+    assert cache.get(Endpoint.list_assets, "/assets", params) == BODY
+    assert cache.get(Endpoint.list_assets, "/assets", None) is None
+    [file] = tmp_path.glob("*/*")
+    assert file.stat().st_size < len(BODY) / 10
+
+    clock.now = 60
+    assert cache.get(Endpoint.list_assets, "/assets", params) is None
+    assert (cache.stats.hits, cache.stats.misses) == (1, 2)
+    # expired bodies are kept for readers with a longer TTL, until pruned
+    longer = DiskCache(tmp_path, {Endpoint.list_assets: 120}, clock=clock)
+    assert longer.get(Endpoint.list_assets, "/assets", params) == BODY
+    assert cache.prune(max_age=60) == 1
+    assert not list(tmp_path.glob("*/*"))
+
+
+def test_prune(tmp_path: Path, clock: FakeClock) -> None:
+    """Verify bodies and temporary files older than the longest TTL are removed."""
+    ttls = {Endpoint.list_assets: 60, Endpoint.list_markets: 120}
+    cache = DiskCache(tmp_path, ttls, clock=clock)
+    cache.set(Endpoint.list_assets, "/assets", None, BODY)
+    clock.now = 100
+    cache.set(Endpoint.list_markets, "/markets", None, BODY)
+    interrupted = tmp_path / "ab" / ".tmp-interrupted"
+    interrupted.parent.mkdir()
+    interrupted.write_bytes(BODY)
+    os.utime(interrupted, (0, 0))
+    clock.now = 150
+
+    assert cache.prune() == 2
+    assert list(tmp_path.glob("*/*")) == [cache.get_path("/markets", None)]
+    assert cache.prune(max_age=0) == 1
+
+
+def test_clear(tmp_path: Path) -> None:
+    """Verify clearing removes bodies, temporary files and subdirectories."""
+    cache = DiskCache(tmp_path)
+    cache.set(Endpoint.list_assets, "/assets", None, BODY)
+    (cache.get_path("/assets", None).parent / ".tmp-interrupted").write_bytes(BODY)
+
+    cache.clear()
+
+    assert not list(tmp_path.iterdir())
+
+
+def test_uncached_endpoint(tmp_path: Path) -> None:
+    """Verify endpoints without a TTL are not stored."""
+    cache = DiskCache(tmp_path)
+    cache.set(Endpoint.market_price, "/markets/kraken/btceur/price", None, BODY)
+
+    assert not cache.is_cached(Endpoint.market_price)
+    assert not list(tmp_path.iterdir())
+
+
+def test_unreadable_file(tmp_path: Path) -> None:
+    """Verify truncated or corrupt files count as misses."""
+    cache = DiskCache(tmp_path)
+    cache.set(Endpoint.list_assets, "/assets", None, BODY)
+    file = cache.get_path("/assets", None)
+
+    file.write_bytes(file.read_bytes()[:20])
+    assert cache.get(Endpoint.list_assets, "/assets", None) is None
+    file.write_bytes(b"")
+    assert cache.get(Endpoint.list_assets, "/assets", None) is None
+
+
+def test_concurrent_writes(tmp_path: Path) -> None:
+    """Verify readers see whole bodies while writers replace them."""
+    cache = DiskCache(tmp_path)
+    bodies = [BODY, BODY.replace(b"btc", b"ltc")]
+    cache.set(Endpoint.list_assets, "/assets", None, bodies[0])
+    read: List[Optional[bytes]] = []
+
+    def write(body: bytes) -> None:
+        for _ in range(50):
+            cache.set(Endpoint.list_assets, "/assets", None, body)
+
+    def read_all() -> None:
+        for _ in range(200):
+            read.append(cache.get(Endpoint.list_assets, "/assets", None))
+
+    threads = [threading.Thread(target=write, args=(body,)) for body in bodies]
+    threads.append(threading.Thread(target=read_all))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert set(read) <= set(bodies)
+    assert [file.name for file in tmp_path.glob("*/.*")] == []
+
+
+def test_client_disk_cache(local_server: LocalServer, tmp_path: Path) -> None:
+    """Verify clients in other processes read the bodies stored by one."""
+    local_server.load_cassette("list_exchanges.yml")
+    client = CryptoWatchClient(
+        base_url=local_server.url,
+        disk_cache=DiskCache(tmp_path),
+    )
+    exchanges = client.list_exchanges().result
+
+    # a new client stands in for another process
+    other = CryptoWatchClient(base_url=local_server.url, disk_cache=DiskCache(tmp_path))
+
+    async def run() -> None:
+        async with AsyncCryptoWatchClient(
+            base_url=local_server.url,
+            disk_cache=DiskCache(tmp_path),
+        ) as client:
+            assert (await client.list_exchanges()).result == exchanges
+
+    assert other.list_exchanges().result == exchanges
+    asyncio.run(run())
+    assert local_server.requests == ["/exchanges"]
+    assert other.disk_cache is not None
+    assert other.disk_cache.stats.hits == 1
+
+
+def test_async_client_disk_cache(tmp_path: Path) -> None:
+    """Verify the async client stores bodies too."""
+    transport = cassette_transport("get_info.yml")
+    requests: List[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.path)
+        return transport.handle_request(request)
+
+    async def run() -> None:
+        async with AsyncCryptoWatchClient(
+            transport=httpx.MockTransport(handler),
+            disk_cache=DiskCache(tmp_path, {Endpoint.root: 60}),
+        ) as client:
+            await client.get_info()
+            await client.get_info()
+
+    asyncio.run(run())
+    assert requests == ["/"]
@@ -0,0 +1,124 @@
+"""Tests for the fan-out of calls over a thread pool."""
+
+import threading
+import time
+from typing import List
+
+import requests
+from apiclient.exceptions import ClientError
+
+from pycwatch.lib import CryptoWatchClient
+from pycwatch.lib.exceptions import DeadlineExceededError
+from pycwatch.lib.fanout import MapResult, fan_out
+from tests.conftest import api_vcr
+
+
+def test_fan_out_collects_errors() -> None:
+    """Verify a failing call does not fail the others."""
+
+    def invert(value: int) -> float:
+        return 1 / value
+
+    results = list(fan_out(invert, [1, 0, (4,)], max_workers=2))
+
+    assert sorted(result.args for result in results) == [(0,), (1,), (4,)]
+    by_args = {result.args: result for result in results}
+    assert by_args[(1,)] == MapResult((1,), result=1.0)
+    assert by_args[(4,)].result == 0.25
+    assert not by_args[(0,)].ok
+    assert isinstance(by_args[(0,)].error, ZeroDivisionError)
+    assert list(fan_out(invert, [], max_workers=2)) == []
+
+
+def test_fan_out_yields_as_completed() -> None:
+    """Verify results are yielded in the order the calls finish."""
+
+    def wait(seconds: float) -> float:
+        time.sleep(seconds)
+        return seconds
+
+    results = [result.result for result in fan_out(wait, [0.2, 0.0], max_workers=2)]
+
+    assert results == [0.0, 0.2]
+
+
+def test_fan_out_deadline() -> None:
+    """Verify stragglers are given up on once the deadline is hit."""
+    release = threading.Event()
+
+    def call(value: int) -> int:
+        if value:
+            release.wait(5)
+        return value
+
+    started = time.monotonic()
+    results = list(fan_out(call, [0, 1, 2], max_workers=2, deadline=0.1))
+    elapsed = time.monotonic() - started
+    release.set()
+
+    assert elapsed < 1
+    assert results[0] == MapResult((0,), result=0)
+    assert [result.args for result in results[1:]] == [(1,), (2,)]
+    for result in results[1:]:
+        assert isinstance(result.error, DeadlineExceededError)
+
+
+def test_fan_out_deadline_starts_at_call() -> None:
+    """Verify calls start, and the deadline counts, before iteration begins."""
+    started: List[int] = []
+
+    def call(value: int) -> int:
+        started.append(value)
+        time.sleep(0.05)
+        return value
+
+    outcomes = fan_out(call, [0, 1], max_workers=2, deadline=0.2)
+    time.sleep(0.3)
+
+    assert sorted(started) == [0, 1]
+    assert sorted(result.result for result in outcomes) == [0, 1]
+    outcomes = fan_out(lambda: time.sleep(1), [()], max_workers=1, deadline=0.1)
+    time.sleep(0.2)
+    [result] = outcomes
+    assert isinstance(result.error, DeadlineExceededError)
+
+
+def test_client_map(live_client: CryptoWatchClient) -> None:
+    """Verify client methods are mapped over markets with per-market errors."""
+    markets = [("kraken", "btceur"), ("kraken", "aaabbb"), ("bittrex", "neoeth")]
+    # cassettes are not thread safe, so the calls are made in turn
+    with api_vcr.use_cassette("get_market_summary.yml"):
+        results = list(
+            live_client.map(live_client.get_market_summary, markets, max_workers=1),
+        )
+
+    assert [result.args for result in results] == markets
+    assert [result.ok for result in results] == [True, False, True]
+    assert isinstance(results[1].error, ClientError)
+
+
+def test_client_map_grows_pool() -> None:
+    """Verify the connection pool keeps a connection for each worker."""
+    client = CryptoWatchClient()
+    session = client.get_session()
+    old = session.get_adapter("https://api.cryptowat.ch")
+    old.poolmanager.connection_from_url("https://api.cryptowat.ch")
+
+    results = list(client.map(str.upper, ["a", "b"], max_workers=16))
+    client.map(str.upper, [], max_workers=4)
+
+    assert sorted(result.result for result in results) == ["A", "B"]
+    assert session.get_adapter("https://api.cryptowat.ch")._pool_maxsize == 16
+    # the pools of the replaced adapter are closed
+    assert len(old.poolmanager.pools) == 0
+
+
+def test_client_map_shared_session() -> None:
+    """Verify a session that is passed in is not remounted."""
+    session = requests.Session()
+    adapter = session.get_adapter("https://api.cryptowat.ch")
+    client = CryptoWatchClient(session=session)
+
+    list(client.map(str.upper, ["a", "b"], max_workers=16))
+
+    assert session.get_adapter("https://api.cryptowat.ch") is adapter
@@ -0,0 +1,299 @@
+"""Tests for the subscription hub."""
+
+import asyncio
+import logging
+import threading
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import pytest
+
+from pycwatch.lib import AsyncCryptoWatchClient, CryptoWatchClient
+from pycwatch.lib.hub import AsyncHub, Feed, Hub
+from pycwatch.lib.planning import BatchPlanner, MarketKey, price_key
+from tests.conftest import api_vcr, cassette_transport
+
+
+class FakeClient:
+    """A client that serves prices from a dict and records its batches."""
+
+    def __init__(self, prices: Dict[str, Decimal]) -> None:
+        self.prices = prices
+        self.planner = BatchPlanner()
+        self.batches: List[List[MarketKey]] = []
+
+    def get_market_prices(
+        self,
+        markets: List[MarketKey],
+        errors: Optional[Dict[MarketKey, Exception]] = None,
+    ) -> Dict[str, Decimal]:
+        """Get the prices of some markets, failing for unknown ones."""
+        self.batches.append(markets)
+        prices = {}
+        for market in markets:
+            try:
+                prices[price_key(market)] = self.prices[price_key(market)]
+            except KeyError as exc:
+                if errors is None:
+                    raise
+                errors[market] = exc
+        return prices
+
+
+RECORDED = [
+    ("kraken", "btceur"),
+    ("binance", "ethbtc"),
+    ("kraken", "ltcbtc"),
+    ("bittrex", "neoeth"),
+]
+PRICES = {
+    "market:kraken:btceur": Decimal(100),
+    "market:kraken:etheur": Decimal(10),
+    "market:bitstamp:btceur": Decimal(101),
+    "market:binance:ethbtc": Decimal("0.1"),
+}
+
+
+def test_notifies_on_change() -> None:
+    """Verify subscribers are notified of new values only."""
+    client = FakeClient(dict(PRICES))
+    hub = Hub(client)  # type: ignore[arg-type]
+    updates: List[Tuple[MarketKey, Any]] = []
+    hub.subscribe("kraken", "btceur", lambda *update: updates.append(update))
+    hub.subscribe("kraken", "btceur", lambda *update: updates.append(update))
+
+    assert hub.poll() == {("kraken", "btceur"): 100}
+    assert hub.poll() == {}
+    client.prices["market:kraken:btceur"] = Decimal(99)
+    assert hub.poll() == {("kraken", "btceur"): 99}
+
+    btceur = ("kraken", "btceur")
+    assert updates == [(btceur, 100), (btceur, 100), (btceur, 99), (btceur, 99)]
+    assert client.batches == [[("kraken", "btceur")]] * 3
+    assert hub.value("kraken", "btceur") == 99
+
+
+def test_subscriptions() -> None:
+    """Verify each poll requests the markets that have subscribers."""
+    client = FakeClient(dict(PRICES))
+    hub = Hub(client)  # type: ignore[arg-type]
+    updates: Dict[MarketKey, Any] = {}
+    subscriptions = [
+        hub.subscribe(*key.split(":")[1:], updates.__setitem__) for key in PRICES
+    ]
+
+    assert hub.uses_bulk()
+    hub.poll()
+    assert updates == {
+        ("kraken", "btceur"): 100,
+        ("kraken", "etheur"): 10,
+        ("bitstamp", "btceur"): 101,
+        ("binance", "ethbtc"): Decimal("0.1"),
+    }
+
+    subscriptions[0].close()
+    subscriptions[1].close()
+    hub.poll()
+    assert not hub.uses_bulk()
+    assert client.batches[-1] == [("bitstamp", "btceur"), ("binance", "ethbtc")]
+    assert hub.value("kraken", "btceur") is None
+
+
+def test_new_subscriber_gets_last_value() -> None:
+    """Verify a subscriber to a polled market receives its value right away."""
+    hub = Hub(FakeClient(dict(PRICES)))  # type: ignore[arg-type]
+    hub.subscribe("kraken", "btceur", lambda *_: None)
+    hub.poll()
+    updates: List[Tuple[MarketKey, Any]] = []
+
+    hub.subscribe("kraken", "btceur", lambda *update: updates.append(update))
+
+    assert updates == [(("kraken", "btceur"), 100)]
+
+
+def test_failed_market() -> None:
+    """Verify a market that fails does not hold back the others."""
+    hub = Hub(FakeClient(dict(PRICES)))  # type: ignore[arg-type]
+    updates: Dict[MarketKey, Any] = {}
+    hub.subscribe("kraken", "btceur", updates.__setitem__)
+    hub.subscribe("kraken", "unknown", updates.__setitem__)
+
+    assert hub.poll() == {("kraken", "btceur"): 100}
+    assert updates == {("kraken", "btceur"): 100}
+    assert list(hub.errors) == [("kraken", "unknown")]
+    assert isinstance(hub.errors["kraken", "unknown"], KeyError)
+
+
+def test_failed_poll() -> None:
+    """Verify a poll that fails as a whole reports the error for every market."""
+    client = FakeClient(dict(PRICES))
+    client.get_market_prices = lambda *_, **__: 1 / 0  # type: ignore[assignment]
+    hub = Hub(client)  # type: ignore[arg-type]
+    hub.subscribe("kraken", "btceur", lambda *_: None)
+    hub.subscribe("kraken", "etheur", lambda *_: None)
+
+    assert hub.poll() == {}
+    assert sorted(hub.errors) == [("kraken", "btceur"), ("kraken", "etheur")]
+    assert all(isinstance(e, ZeroDivisionError) for e in hub.errors.values())
+
+
+def test_run_carries_on(caplog: pytest.LogCaptureFixture) -> None:
+    """Verify run logs failed polls and keeps polling."""
+    client = FakeClient({})
+    hub = Hub(client)  # type: ignore[arg-type]
+    stop = threading.Event()
+
+    def update(*_: Any) -> None:
+        stop.set()
+
+    def raise_in_callback(*_: Any) -> None:
+        client.prices["market:kraken:btceur"] = Decimal(2)
+        raise RuntimeError
+
+    hub.subscribe("kraken", "btceur", update)
+    client.prices["market:kraken:etheur"] = Decimal(1)
+    hub.subscribe("kraken", "etheur", raise_in_callback)
+
+    with caplog.at_level(logging.WARNING, logger="pycwatch.lib.hub"):
+        hub.run(0, stop)
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert "Polling kraken:btceur failed: KeyError('market:kraken:btceur')" in messages
+    assert "Polling failed" in messages
+    assert hub.value("kraken", "btceur") == 2
+
+
+def test_recorded_prices(live_client: CryptoWatchClient) -> None:
+    """Verify the hub polls few markets one by one and many with one request."""
+    single = Hub(live_client)
+    bulk = Hub(CryptoWatchClient())
+    single.subscribe("kraken", "btceur", lambda *_: None)
+    for key in RECORDED:
+        bulk.subscribe(*key, lambda *_: None)
+
+    with api_vcr.use_cassette("get_market_price.yml"):
+        single.poll()
+    with api_vcr.use_cassette("get_all_market_prices.yml"):
+        bulk.poll()
+
+    assert not single.uses_bulk()
+    assert bulk.uses_bulk()
+    assert single.value("kraken", "btceur") == Decimal("24063.4")
+    assert bulk.value("kraken", "btceur") == Decimal("24067.9")
+
+
+def test_recorded_summaries(live_client: CryptoWatchClient) -> None:
+    """Verify summaries are keyed by market from both endpoints."""
+    single = Hub(live_client, Feed.SUMMARY)
+    bulk = Hub(CryptoWatchClient(), Feed.SUMMARY)
+    single.subscribe("kraken", "btceur", lambda *_: None)
+    for key in RECORDED:
+        bulk.subscribe(*key, lambda *_: None)
+
+    with api_vcr.use_cassette("get_market_summary.yml"):
+        single.poll()
+    with api_vcr.use_cassette("get_all_market_summaries.yml"):
+        bulk.poll()
+
+    assert single.value("kraken", "btceur").volume > 0
+    assert bulk.value("kraken", "btceur").volume > 0
+
+
+def test_async_hub() -> None:
+    """Verify async subscribers iterate over their updates until closed."""
+    transport = cassette_transport("get_market_price.yml")
+    requests: List[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.path)
+        return transport.handle_request(request)
+
+    async def run() -> Tuple[List[Any], List[Any]]:
+        async with AsyncCryptoWatchClient(
+            transport=httpx.MockTransport(handler),
+        ) as client:
+            hub = AsyncHub(client)
+            btceur = hub.subscribe("kraken", "btceur")
+            ethbtc = hub.subscribe("binance", "ethbtc")
+            await hub.poll()
+            await hub.poll()
+            hub.close()
+            return (
+                [price async for price in btceur],
+                [price async for price in ethbtc],
+            )
+
+    assert asyncio.run(run()) == ([Decimal("24063.4")], [Decimal("0.0643")])
+    assert len(requests) == 4
+    assert sorted(set(requests)) == [
+        "/markets/binance/ethbtc/price",
+        "/markets/kraken/btceur/price",
+    ]
+
+
+def test_async_subscription_queue() -> None:
+    """Verify values are only queued for iterators, and only the newest one."""
+
+    async def run() -> Tuple[int, List[Any]]:
+        hub = AsyncHub(FakeClient({}))  # type: ignore[arg-type]
+        updates: List[Any] = []
+        with_callback = hub.subscribe("kraken", "btceur", lambda *u: updates.append(u))
+        iterated = hub.subscribe("kraken", "btceur")
+        for value in range(3):
+            with_callback.notify(value)
+            iterated.notify(value)
+        queued = with_callback._queue.qsize()
+        hub.close()
+        return queued, [value async for value in iterated]
+
+    assert asyncio.run(run()) == (0, [2])
+
+
+def test_async_hub_failed_market() -> None:
+    """Verify the async hub publishes the markets that did not fail."""
+    transport = cassette_transport("get_market_price.yml")
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if "unknown" in request.url.path:
+            return httpx.Response(404, json={"error": "Market not found"})
+        return transport.handle_request(request)
+
+    async def run() -> Dict[MarketKey, Any]:
+        async with AsyncCryptoWatchClient(
+            transport=httpx.MockTransport(handler),
+        ) as client:
+            hub = AsyncHub(client)
+            hub.subscribe("kraken", "btceur")
+            hub.subscribe("kraken", "unknown")
+            changed = await hub.poll()
+            assert list(hub.errors) == [("kraken", "unknown")]
+            return changed
+
+    assert asyncio.run(run()) == {("kraken", "btceur"): Decimal("24063.4")}
+
+
+def test_async_hub_bulk() -> None:
+    """Verify the async hub requests all prices once for many subscribers."""
+    transport = cassette_transport("get_all_market_prices.yml")
+    requests: List[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.path)
+        return transport.handle_request(request)
+
+    updates: Dict[MarketKey, Any] = {}
+
+    async def run() -> None:
+        async with AsyncCryptoWatchClient(
+            transport=httpx.MockTransport(handler),
+        ) as client:
+            hub = AsyncHub(client)
+            for key in RECORDED:
+                hub.subscribe(*key, updates.__setitem__)
+            await hub.poll()
+
+    asyncio.run(run())
+
+    assert requests == ["/markets/prices"]
+    assert sorted(updates) == sorted(RECORDED)
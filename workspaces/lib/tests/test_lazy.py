@@ -0,0 +1,155 @@
+"""Tests for lazy and raw structuring."""
+
+import asyncio
+import copy
+import pickle
+from decimal import Decimal
+from typing import Any
+
+import httpx
+import pytest
+
+from pycwatch.lib import AsyncCryptoWatchClient, CryptoWatchClient
+from pycwatch.lib.cache import ResponseCache
+from pycwatch.lib.exceptions import ResponseStructureError
+from pycwatch.lib.lazy import (
+    LazyDict,
+    LazyList,
+    LazyView,
+    RawResponse,
+    StructureMode,
+    make_lazy_response,
+)
+from pycwatch.lib.models import Asset, MarketSummary, Response
+from pycwatch.lib.ratelimit import AllowanceLimiter
+from tests.conftest import api_vcr, cassette_transport
+
+
+def test_lazy_view() -> None:
+    """Verify attributes are structured on first access."""
+    data = {
+        "price": {"last": 1.5, "high": 2, "low": 1, "change": {"percentage": 0.1}},
+        "volume": 3,
+        "volumeQuote": 4.5,
+    }
+    view = LazyView(data, MarketSummary)
+
+    assert view.volume_quote == Decimal("4.5")
+    assert "price" not in vars(view)
+    assert isinstance(view.price, LazyView)
+    assert view.price.last == Decimal("1.5")
+    assert view.price is view.price
+    with pytest.raises(ResponseStructureError):
+        view.price.change.absolute  # noqa: B018
+    with pytest.raises(AttributeError):
+        view.foo  # noqa: B018
+
+
+def test_copy_lazy_view() -> None:
+    """Verify a view can be copied and pickled."""
+    data = {
+        "price": {"last": 1.5, "high": 2, "low": 1, "change": {"percentage": 0.1}},
+        "volume": 3,
+        "volumeQuote": 4.5,
+    }
+    view = LazyView(data, MarketSummary)
+    assert view.price.last == Decimal("1.5")
+
+    for other in (
+        copy.copy(view),
+        copy.deepcopy(view),
+        pickle.loads(pickle.dumps(view)),  # noqa: S301
+    ):
+        assert other.raw == view.raw
+        assert other.price.last == Decimal("1.5")
+
+
+def test_lazy_list() -> None:
+    """Verify lists of models are structured item by item."""
+    items = LazyList([{"last": "a", "hasMore": True}] * 3, Any)
+
+    assert len(items) == 3
+    assert items[-1] == {"last": "a", "hasMore": True}
+    assert items[1:] == [items[1], items[2]]
+
+
+def test_lazy_response_matches_eager() -> None:
+    """Verify a lazy response has the values of the eager one."""
+    client = CryptoWatchClient()
+
+    with api_vcr.use_cassette("get_asset.yml", allow_playback_repeats=True):
+        eager = client.get_asset("btc")
+        lazy = client.with_structure("lazy").get_asset("btc")
+
+    assert isinstance(lazy, LazyView)
+    assert lazy.allowance == eager.allowance
+    assert lazy.result.symbol == eager.result.symbol
+    assert isinstance(lazy.result.markets.base, LazyList)
+    assert lazy.result.markets.base[3].pair == eager.result.markets.base[3].pair
+    assert lazy.result.materialize() == eager.result
+    assert client.structure_mode == StructureMode.EAGER
+
+
+def test_raw_mode() -> None:
+    """Verify raw responses hold the decoded result and the allowance."""
+    limiter = AllowanceLimiter()
+    client = CryptoWatchClient(structure_mode="raw", rate_limiter=limiter)
+
+    with api_vcr.use_cassette("get_all_market_summaries.yml"):
+        response = client.get_all_market_summaries()
+
+    assert isinstance(response, RawResponse)
+    assert isinstance(response.result, dict)
+    assert response.result["kraken:btceur"]["price"]["last"] == 24072.2
+    assert response.allowance is not None
+    assert limiter.remaining == response.allowance.remaining
+
+
+def test_modes_are_cached_separately() -> None:
+    """Verify a cached response is only returned in the mode it was made in."""
+    client = CryptoWatchClient(cache=ResponseCache())
+    lazy_client = client.with_structure(StructureMode.LAZY)
+
+    with api_vcr.use_cassette("get_exchange.yml", allow_playback_repeats=True):
+        eager = client.get_exchange("kraken")
+        lazy = lazy_client.get_exchange("kraken")
+
+        assert lazy is not eager
+        assert lazy_client.get_exchange("kraken") is lazy
+        assert lazy_client.cache is client.cache
+
+
+def test_lazy_response_requires_object() -> None:
+    """Verify data that is not an object is rejected."""
+    with pytest.raises(ResponseStructureError):
+        make_lazy_response([1, 2], Response[Asset])
+
+
+def test_async_lazy_mode() -> None:
+    """Verify the async client can return lazy responses."""
+
+    async def fetch() -> Any:
+        async with AsyncCryptoWatchClient(
+            transport=cassette_transport("get_all_market_summaries.yml"),
+            structure_mode="lazy",
+        ) as client:
+            return await client.get_all_market_summaries()
+
+    response = asyncio.run(fetch())
+
+    assert isinstance(response.result, LazyDict)
+    assert response.result["kraken:btceur"].price.last == Decimal("24072.2")
+
+
+def test_raw_stream() -> None:
+    """Verify streamed members are left as decoded JSON in raw mode."""
+    body = b'{"result": {"market:kraken:btceur": 24063.4}}'
+
+    async def stream() -> Any:
+        async with AsyncCryptoWatchClient(
+            transport=httpx.MockTransport(lambda _: httpx.Response(200, content=body)),
+        ) as client:
+            raw_client = client.with_structure(StructureMode.RAW)
+            return [item async for item in raw_client.stream_all_market_prices()]
+
+    assert asyncio.run(stream()) == [("market:kraken:btceur", 24063.4)]
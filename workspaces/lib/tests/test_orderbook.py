@@ -0,0 +1,280 @@
+"""Tests for the columnar order book."""
+
+from decimal import Decimal
+from typing import Any, Dict, List, Tuple
+
+import attrs
+import pytest
+import ujson
+from apiclient.exceptions import ClientError
+from vcr.persisters.filesystem import FilesystemPersister
+from vcr.serializers import yamlserializer
+
+from pycwatch.lib import CryptoWatchClient
+from pycwatch.lib.conversion import converter
+from pycwatch.lib.models import (
+    OrderBook,
+    OrderBookCalculator,
+    OrderBookItem,
+    OrderBookLiquidity,
+    Response,
+)
+from tests.conftest import BASE_DIR, api_vcr
+
+np = pytest.importorskip("numpy")
+
+from pycwatch.lib.orderbook import (  # noqa: E402
+    ColumnarOrderBook,
+    Side,
+    calculate_liquidities,
+    calculate_liquidity,
+    calculate_quote,
+    calculate_quotes,
+)
+
+RESULT = {
+    "asks": [[101, 1], [102, 2], [104, 3]],
+    "bids": [[100, 2], [99, 1], [97, 4]],
+    "seqNum": 42,
+}
+
+
+@pytest.fixture()
+def book() -> ColumnarOrderBook:
+    """Provide a small order book."""
+    return ColumnarOrderBook.from_result(RESULT)
+
+
+def test_from_result(book: ColumnarOrderBook) -> None:
+    """Verify the levels become contiguous arrays per side."""
+    assert book.asks.prices.tolist() == [101, 102, 104]
+    assert book.bids.amounts.tolist() == [2, 1, 4]
+    assert book.asks.prices.flags["C_CONTIGUOUS"]
+    assert book.seq_num == 42
+    assert len(book.side("bid")) == 3
+
+
+def make_model(result: Dict[str, Any]) -> OrderBook:
+    """Create an order book model with decimals."""
+
+    def items(levels: List[List[float]]) -> List[OrderBookItem]:
+        return [OrderBookItem(Decimal(str(p)), Decimal(str(a))) for p, a in levels]
+
+    return OrderBook(
+        asks=items(result["asks"]),
+        bids=items(result["bids"]),
+        seq_num=result["seqNum"],
+    )
+
+
+def test_from_order_book(book: ColumnarOrderBook) -> None:
+    """Verify a model with decimals converts to the same arrays."""
+    model = make_model(RESULT)
+    converted = ColumnarOrderBook.from_order_book(model)
+
+    np.testing.assert_array_equal(converted.asks.prices, book.asks.prices)
+    np.testing.assert_array_equal(converted.bids.amounts, book.bids.amounts)
+
+
+def test_spread(book: ColumnarOrderBook) -> None:
+    """Verify the best prices, mid price and spread."""
+    assert book.best_ask == 101
+    assert book.best_bid == 100
+    assert book.mid_price == 100.5
+    assert book.spread == 1
+    assert book.spread_bps == pytest.approx(1 / 100.5 * 10_000)
+
+
+def test_cumulative_depth(book: ColumnarOrderBook) -> None:
+    """Verify the cumulative amount per level."""
+    assert book.cumulative_depth(Side.ASK).tolist() == [1, 3, 6]
+    assert book.cumulative_depth("bid").tolist() == [2, 3, 7]
+
+
+@pytest.mark.parametrize(
+    ("side", "prices", "expected"),
+    [
+        ("ask", [100, 101, 103, 104, 200], [0, 1, 3, 6, 6]),
+        ("bid", [101, 100, 98, 97, 1], [0, 2, 3, 7, 7]),
+    ],
+)
+def test_depth_at_price(
+    book: ColumnarOrderBook,
+    side: str,
+    prices: List[float],
+    expected: List[float],
+) -> None:
+    """Verify the amount at or better than each price."""
+    assert book.depth_at_price(side, prices).tolist() == expected
+    assert book.depth_at_price(side, prices[1]) == expected[1]
+
+
+def test_vwap(book: ColumnarOrderBook) -> None:
+    """Verify the average fill price, and NaN when the book is too thin."""
+    vwap = book.vwap("ask", [0.5, 1, 2, 6, 7, 0])
+
+    assert vwap[:4].tolist() == pytest.approx([101, 101, 101.5, (101 + 204 + 312) / 6])
+    assert np.isnan(vwap[4:]).all()
+    assert book.vwap("bid", 3) == pytest.approx((200 + 99) / 3)
+
+
+@pytest.mark.parametrize(
+    ("bps", "expected"),
+    [(None, (7 - 6) / 13), (150, (3 - 3) / 6), (0, (2 - 1) / 3)],
+)
+def test_imbalance(book: ColumnarOrderBook, bps: float, expected: float) -> None:
+    """Verify the imbalance over the whole book and near the best prices."""
+    assert book.imbalance(bps) == pytest.approx(expected)
+
+
+def test_empty_side() -> None:
+    """Verify queries on an empty side return zero or NaN."""
+    book = ColumnarOrderBook.from_result({"asks": [], "bids": [[1, 1]], "seqNum": 1})
+
+    assert np.isnan(book.best_ask)
+    assert book.depth_at_price("ask", 5) == 0
+    assert np.isnan(book.vwap("ask", [1])).all()
+    assert book.imbalance() == 1
+
+
+def levels(items: List[OrderBookItem]) -> Tuple[List[float], List[float]]:
+    """Split model levels into prices and amounts."""
+    return [float(item.price) for item in items], [float(item.amount) for item in items]
+
+
+def test_get_columnar_order_book(live_client: CryptoWatchClient) -> None:
+    """Verify the columnar book holds the same levels as the model."""
+    with api_vcr.use_cassette(
+        "get_market_order_book.yml",
+        allow_playback_repeats=True,
+    ):
+        model = live_client.get_market_order_book("kraken", "btceur")
+        response = live_client.get_columnar_order_book("kraken", "btceur")
+        with pytest.raises(ClientError):
+            live_client.get_columnar_order_book("kraken", "aaabbb")
+
+    book = response.result
+    assert response.allowance == model.allowance
+    assert book.seq_num == model.result.seq_num
+    assert (book.asks.prices.tolist(), book.asks.amounts.tolist()) == levels(
+        model.result.asks,
+    )
+    assert (book.bids.prices.tolist(), book.bids.amounts.tolist()) == levels(
+        model.result.bids,
+    )
+
+
+def load_calculator_quote() -> OrderBookCalculator:
+    """Load the quote for 10 BTC on kraken:btceur from the cassette."""
+    _, responses = FilesystemPersister.load_cassette(
+        BASE_DIR.joinpath("vcr_cassettes", "calculate_quote.yml").as_posix(),
+        yamlserializer,
+    )
+    data = ujson.loads(responses[0]["body"]["string"])
+    return converter.structure(data, Response[OrderBookCalculator]).result
+
+
+def test_calculate_quote_matches_endpoint() -> None:
+    """Verify the local quote matches the endpoint for a book that explains it."""
+    expected = load_calculator_quote()
+    # a book whose best prices and levels reproduce the recorded quote: the
+    # deltas are relative to the best ask and bid, and reach the second level
+    best_ask = expected.buy.reach_price - expected.buy.reach_delta
+    best_bid = expected.sell.reach_price - expected.sell.reach_delta
+    at_best_ask = (expected.buy.reach_price * 10 - expected.buy.spend) / (
+        expected.buy.reach_delta
+    )
+    at_best_bid = (expected.sell.reach_price * 10 - expected.sell.receive) / (
+        expected.sell.reach_delta
+    )
+    model = make_model(
+        {
+            "asks": [[best_ask, at_best_ask], [expected.buy.reach_price, 20]],
+            "bids": [[best_bid, at_best_bid], [expected.sell.reach_price, 20]],
+            "seqNum": 1,
+        },
+    )
+
+    quote = calculate_quote(model, 10)
+
+    for side in ("buy", "sell"):
+        actual_side = attrs.asdict(getattr(quote, side))
+        expected_side = attrs.asdict(getattr(expected, side))
+        assert actual_side.keys() == expected_side.keys()
+        for name, value in expected_side.items():
+            assert isinstance(actual_side[name], Decimal)
+            assert float(actual_side[name]) == pytest.approx(float(value), abs=1e-6)
+
+
+def test_calculate_quotes(book: ColumnarOrderBook) -> None:
+    """Verify several amounts are quoted at once."""
+    quotes = calculate_quotes(book, [1, 3], numeric_backend="float")
+
+    assert [quote.buy.spend for quote in quotes] == [101, 101 + 204]
+    assert [quote.buy.reach_price for quote in quotes] == [101, 102]
+    assert quotes[1].buy.avg_delta_bps == 66
+    assert quotes[1].buy.reach_delta_bps == 99
+    assert quotes[1].sell.receive == 200 + 99
+    assert quotes[1].sell.avg_delta == pytest.approx(299 / 3 - 100)
+    assert quotes[1].sell.avg_delta_bps == -34
+    assert quotes[1].sell.reach_delta_bps == -100
+
+
+@pytest.mark.parametrize("amount", [0, 7])
+def test_calculate_quote_unfillable(book: ColumnarOrderBook, amount: float) -> None:
+    """Verify amounts that can not be filled are rejected."""
+    with pytest.raises(ValueError, match="can not fill"):
+        calculate_quote(book, amount)
+
+
+def test_calculate_liquidity(book: ColumnarOrderBook) -> None:
+    """Verify the amounts within each distance of the best prices are summed."""
+    liquidity = calculate_liquidity(book, [0, 100, 200, 400], numeric_backend="float")
+
+    assert liquidity.ask.base == {0: 1, 100: 3, 200: 3, 400: 6}
+    assert liquidity.ask.quote == {0: 101, 100: 305, 200: 305, 400: 617}
+    assert liquidity.bid.base == {0: 2, 100: 3, 200: 3, 400: 7}
+    assert liquidity.bid.quote == {0: 200, 100: 299, 200: 299, 400: 687}
+
+
+def test_calculate_liquidity_matches_endpoint(live_client: CryptoWatchClient) -> None:
+    """Verify the liquidity of a recorded book matches the endpoint.
+
+    The bittrex:neoeth book did not change between the two recordings.
+    """
+    with api_vcr.use_cassette("get_market_order_book.yml"):
+        book = live_client.get_market_order_book("bittrex", "neoeth").result
+    with api_vcr.use_cassette("get_market_order_book_liquidity.yml"):
+        expected = live_client.get_market_order_book_liquidity(
+            "bittrex",
+            "neoeth",
+        ).result
+
+    liquidity = calculate_liquidity(book)
+
+    for side in ("bid", "ask"):
+        for kind in ("base", "quote"):
+            actual_sums = getattr(getattr(liquidity, side), kind)
+            expected_sums = getattr(getattr(expected, side), kind)
+            assert actual_sums.keys() == expected_sums.keys()
+            for level, value in expected_sums.items():
+                assert isinstance(actual_sums[level], Decimal)
+                assert float(actual_sums[level]) == pytest.approx(float(value))
+
+
+def test_calculate_liquidities(book: ColumnarOrderBook) -> None:
+    """Verify a batch of books gives the same liquidity as one book at a time."""
+    other = ColumnarOrderBook.from_result(
+        {"asks": [[10, 5], [10.1, 1]], "bids": [], "seqNum": 2},
+    )
+    books = {"a": book, "b": other, "c": make_model(RESULT)}
+
+    liquidities = calculate_liquidities(books)
+
+    assert list(liquidities) == ["a", "b", "c"]
+    for key, liquidity in liquidities.items():
+        assert isinstance(liquidity, OrderBookLiquidity)
+        assert liquidity == calculate_liquidity(books[key])
+    assert liquidities["b"].ask.base[100] == 6
+    assert liquidities["b"].bid.base[500] == 0
+    assert calculate_liquidities({}) == {}
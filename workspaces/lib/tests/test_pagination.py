@@ -0,0 +1,108 @@
+"""Tests for following pagination cursors."""
+
+import asyncio
+import itertools
+import threading
+from typing import Dict, List, Optional
+
+from pycwatch.lib import AsyncCryptoWatchClient, CryptoWatchClient
+from pycwatch.lib.models import (
+    AllowanceAnonymous,
+    AssetMember,
+    Cursor,
+    PaginatedResponse,
+)
+from pycwatch.lib.pagination import aiter_pages, iter_pages
+from tests.conftest import api_vcr, cassette_transport
+
+ALLOWANCE = AllowanceAnonymous(cost=0, remaining=10, upgrade="")
+PAGES: Dict[Optional[str], PaginatedResponse[List[int]]] = {
+    None: PaginatedResponse([1, 2], ALLOWANCE, Cursor("a", has_more=True)),
+    "a": PaginatedResponse([3, 4], ALLOWANCE, Cursor("b", has_more=True)),
+    "b": PaginatedResponse([5], ALLOWANCE, Cursor("c", has_more=False)),
+}
+
+
+def test_iter_pages() -> None:
+    """Verify all pages are returned in order."""
+    requested: List[Optional[str]] = []
+
+    def fetch_page(cursor: Optional[str]) -> PaginatedResponse[List[int]]:
+        requested.append(cursor)
+        return PAGES[cursor]
+
+    items = [item for page in iter_pages(fetch_page) for item in page.result]
+
+    assert items == [1, 2, 3, 4, 5]
+    assert requested == [None, "a", "b"]
+
+
+def test_iter_pages_prefetches() -> None:
+    """Verify the next page is requested while the current one is consumed."""
+    fetched = threading.Event()
+
+    def fetch_page(cursor: Optional[str]) -> PaginatedResponse[List[int]]:
+        if cursor == "a":
+            fetched.set()
+        return PAGES[cursor]
+
+    pages = iter_pages(fetch_page)
+    next(pages)
+
+    assert fetched.wait(timeout=5)
+    pages.close()
+
+
+def test_aiter_pages() -> None:
+    """Verify all pages are returned in order and fetched ahead of time."""
+    requested: List[Optional[str]] = []
+
+    async def fetch_page(cursor: Optional[str]) -> PaginatedResponse[List[int]]:
+        requested.append(cursor)
+        return PAGES[cursor]
+
+    async def collect() -> List[int]:
+        items = []
+        async for page in aiter_pages(fetch_page):
+            await asyncio.sleep(0)
+            # the next page has been requested before this one is done
+            assert len(requested) == min(len(items) // 2 + 2, 3)
+            items.extend(page.result)
+        return items
+
+    assert asyncio.run(collect()) == [1, 2, 3, 4, 5]
+
+
+def test_iter_assets(live_client: CryptoWatchClient) -> None:
+    """Verify the client follows the cursor of the assets endpoint."""
+    with api_vcr.use_cassette(
+        "list_assets.yml",
+        record_mode="none",
+        allow_playback_repeats=True,
+    ):
+        first_page = live_client.list_assets(limit=20)
+        second_page = live_client.list_assets(first_page.cursor.last, limit=20)
+        expected = first_page.result + second_page.result
+        assets = list(itertools.islice(live_client.iter_assets(limit=20), 40))
+
+    assert assets == expected
+
+
+def test_async_iter_assets() -> None:
+    """Verify the async client follows the cursor of the assets endpoint."""
+
+    async def collect() -> List[AssetMember]:
+        async with AsyncCryptoWatchClient(
+            transport=cassette_transport("list_assets.yml"),
+        ) as client:
+            assets = []
+            async for asset in client.iter_assets(limit=20):
+                assets.append(asset)
+                if len(assets) == 40:
+                    break
+            return assets
+
+    assets = asyncio.run(collect())
+
+    assert len(assets) == 40
+    assert len({asset.id_ for asset in assets}) == 40
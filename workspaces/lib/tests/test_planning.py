@@ -0,0 +1,128 @@
+"""Tests for the planning of requests for many markets."""
+
+import asyncio
+from decimal import Decimal
+from typing import List
+
+import httpx
+import pytest
+
+from pycwatch.lib import AsyncCryptoWatchClient, CryptoWatchClient
+from pycwatch.lib.endpoints import Endpoint
+from pycwatch.lib.models import AllPrices
+from pycwatch.lib.planning import BatchPlan, BatchPlanner
+from tests.conftest import api_vcr, cassette_transport
+
+MARKETS = [
+    ("kraken", "btceur"),
+    ("binance", "ethbtc"),
+    ("kraken", "ltcbtc"),
+    ("bittrex", "neoeth"),
+]
+
+
+def plan_prices(planner: BatchPlanner, count: int, concurrency: int = 1) -> BatchPlan:
+    """Plan the requests for the prices of a number of markets."""
+    return planner.plan(
+        Endpoint.market_price,
+        Endpoint.all_market_prices,
+        count,
+        concurrency,
+    )
+
+
+def test_plan_by_cost() -> None:
+    """Verify the plan that costs less of the allowance is chosen."""
+    planner = BatchPlanner()
+
+    assert plan_prices(planner, 0) == BatchPlan(
+        bulk=False,
+        calls=0,
+        cost=0,
+        latency=0,
+    )
+    assert plan_prices(planner, 2) == BatchPlan(
+        bulk=False,
+        calls=2,
+        cost=pytest.approx(0.01),
+        latency=pytest.approx(0.6),
+    )
+    assert plan_prices(planner, 4).bulk
+    assert plan_prices(planner, 4).cost == pytest.approx(0.015)
+
+
+def test_plan_by_latency() -> None:
+    """Verify the faster plan is chosen when both cost the same."""
+    planner = BatchPlanner()
+    assert not plan_prices(planner, 3).bulk
+
+    planner.observe(Endpoint.market_price, 0.005, 1.0)
+
+    assert plan_prices(planner, 3).bulk
+    assert not plan_prices(planner, 3, concurrency=3).bulk
+
+
+def test_observe() -> None:
+    """Verify the estimates follow the observed calls."""
+    planner = BatchPlanner(smoothing=0.5)
+
+    planner.observe(Endpoint.all_market_prices, 0.03, 2.0)
+    assert planner.estimate(Endpoint.all_market_prices) == (0.03, 2.0)
+    assert not plan_prices(planner, 5).bulk
+
+    planner.observe(Endpoint.all_market_prices, None, 1.0)
+    assert planner.estimate(Endpoint.all_market_prices) == (0.03, 1.5)
+    planner.observe(Endpoint.all_market_prices, 0.01, 1.5)
+    assert planner.estimate(Endpoint.all_market_prices) == (0.02, 1.5)
+
+
+def test_get_market_prices(live_client: CryptoWatchClient) -> None:
+    """Verify few markets are requested one by one and many with one request."""
+    # cassettes are not thread safe, so the markets are requested in turn
+    with api_vcr.use_cassette("get_market_price.yml") as cassette:
+        few = live_client.get_market_prices(MARKETS[:2], max_workers=1)
+        assert cassette.play_count == 2
+    with api_vcr.use_cassette("get_all_market_prices.yml") as cassette:
+        many = live_client.get_market_prices(MARKETS + MARKETS[:1])
+        assert cassette.play_count == 1
+
+    assert few == {
+        "market:kraken:btceur": Decimal("24063.4"),
+        "market:binance:ethbtc": Decimal("0.0643"),
+    }
+    assert sorted(many) == sorted(f"market:{e}:{p}" for e, p in MARKETS)
+    assert many["market:kraken:btceur"] == Decimal("24067.9")
+    # the recorded costs replace the defaults
+    assert live_client.planner.estimate(Endpoint.all_market_prices)[0] == 0.015
+
+
+def test_get_market_summaries(live_client: CryptoWatchClient) -> None:
+    """Verify summaries are keyed like the bulk endpoint either way."""
+    with api_vcr.use_cassette("get_market_summary.yml"):
+        few = live_client.get_market_summaries(MARKETS[:1], max_workers=1)
+    with api_vcr.use_cassette("get_all_market_summaries.yml"):
+        many = live_client.get_market_summaries(MARKETS)
+
+    assert list(few) == ["kraken:btceur"]
+    assert sorted(many) == sorted(f"{e}:{p}" for e, p in MARKETS)
+
+
+def test_async_get_market_prices() -> None:
+    """Verify the async client requests single markets concurrently."""
+    transport = cassette_transport("get_market_price.yml")
+    requests: List[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.path)
+        return transport.handle_request(request)
+
+    async def run() -> AllPrices:
+        async with AsyncCryptoWatchClient(
+            transport=httpx.MockTransport(handler),
+        ) as client:
+            return await client.get_market_prices(MARKETS[:3])
+
+    prices = asyncio.run(run())
+
+    assert len(requests) == 3
+    assert list(prices) == [f"market:{e}:{p}" for e, p in MARKETS[:3]]
@@ -0,0 +1,139 @@
+"""Tests for the local caching proxy."""
+
+import asyncio
+import contextlib
+import threading
+from typing import Iterator, List
+
+import pytest
+import requests
+from apiclient.exceptions import ClientError
+from benchmarks.replay import Fault
+
+from pycwatch.lib import CryptoWatchClient
+from pycwatch.lib.cache import ResponseCache
+from pycwatch.lib.endpoints import Endpoint
+from pycwatch.lib.exceptions import RateLimitError
+from pycwatch.lib.proxy import CryptoWatchProxy
+from pycwatch.lib.ratelimit import AllowanceLimiter
+from tests.conftest import FakeClock, LocalServer, cassette_transport
+
+
+@contextlib.contextmanager
+def running(proxy: CryptoWatchProxy) -> Iterator[CryptoWatchProxy]:
+    """Run a proxy on a free port in a background event loop."""
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(proxy.start(port=0))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        yield proxy
+    finally:
+        asyncio.run_coroutine_threadsafe(proxy.aclose(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+@pytest.fixture()
+def proxy(local_server: LocalServer) -> Iterator[CryptoWatchProxy]:
+    """Provide a proxy in front of the local server."""
+    with running(CryptoWatchProxy(local_server.url)) as proxy:
+        yield proxy
+
+
+def test_cache(local_server: LocalServer, proxy: CryptoWatchProxy) -> None:
+    """Verify clients share cached responses over kept-alive connections."""
+    local_server.load_cassette("list_exchanges.yml")
+    client = CryptoWatchClient(base_url=proxy.url)
+    other = CryptoWatchClient(base_url=proxy.url)
+
+    exchanges = client.list_exchanges().result
+
+    assert client.list_exchanges().result == exchanges
+    assert other.list_exchanges().result == exchanges
+    assert local_server.requests == ["/exchanges"]
+    assert proxy.stats.requests == 3
+    assert proxy.stats.cache_hits == 2
+    assert proxy.stats.connections == 2
+
+
+def test_dedup(local_server: LocalServer, proxy: CryptoWatchProxy) -> None:
+    """Verify identical requests in flight at the same time are sent once."""
+    local_server.load_cassette("get_market_price.yml")
+    local_server.faults.append(Fault(delay=0.3))
+    prices: List[object] = []
+
+    def get_price() -> None:
+        client = CryptoWatchClient(base_url=proxy.url)
+        prices.append(client.get_market_price("kraken", "btceur").result.price)
+
+    threads = [threading.Thread(target=get_price) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(prices) == 4
+    assert len(set(prices)) == 1
+    assert local_server.requests == ["/markets/kraken/btceur/price"]
+
+
+def test_budget(local_server: LocalServer) -> None:
+    """Verify requests beyond the allowance budget are turned away."""
+    local_server.load_cassette("get_market_price.yml")
+    proxy = CryptoWatchProxy(
+        local_server.url,
+        rate_limiter=AllowanceLimiter(budget=0.005),
+        max_wait=1,
+    )
+    with running(proxy):
+        client = CryptoWatchClient(base_url=proxy.url)
+        client.get_market_price("kraken", "btceur")
+        with pytest.raises(RateLimitError) as exc_info:
+            client.get_market_price("binance", "ethbtc")
+
+    assert exc_info.value.retry_after is not None
+    assert exc_info.value.retry_after > 1
+    assert len(local_server.requests) == 1
+
+
+def test_budget_rejections(clock: FakeClock) -> None:
+    """Verify requests that are turned away do not use up allowance."""
+    # one market price every 0.1s, and no more than 0.15s of waiting
+    limiter = AllowanceLimiter(budget=5, window=100, burst=0.1, clock=clock)
+    proxy = CryptoWatchProxy(
+        cache=ResponseCache({}),
+        rate_limiter=limiter,
+        max_wait=0.15,
+        transport=cassette_transport("get_market_price.yml"),
+    )
+
+    async def fetch() -> List[int]:
+        statuses = []
+        for _ in range(30):
+            response = await proxy.fetch("/markets/kraken/btceur/price")
+            statuses.append(response.status)
+        await proxy.aclose()
+        return statuses
+
+    statuses = asyncio.run(fetch())
+
+    assert statuses == [200, 200] + [429] * 28
+    assert proxy.stats.upstream_requests == 2
+    assert limiter.reserve(Endpoint.market_price) == pytest.approx(0.2)
+
+
+def test_errors(local_server: LocalServer, proxy: CryptoWatchProxy) -> None:
+    """Verify unknown routes, other methods and upstream errors are answered."""
+    local_server.load_cassette("get_market_price.yml")
+    client = CryptoWatchClient(base_url=proxy.url)
+
+    assert requests.get(f"{proxy.url}/unknown", timeout=5).status_code == 404
+    assert requests.post(f"{proxy.url}/assets", timeout=5).status_code == 405
+    with pytest.raises(ClientError):
+        client.get_market_price("kraken", "unknown")
+    # errors are passed on, but not cached
+    local_server.faults.append(Fault(503))
+    assert requests.get(f"{proxy.url}/exchanges", timeout=5).status_code == 503
+    assert proxy.cache.stats.hits == 0
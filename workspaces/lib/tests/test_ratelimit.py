@@ -0,0 +1,176 @@
+"""Tests for the allowance based rate limiter."""
+
+import asyncio
+from typing import List
+
+import pytest
+
+from pycwatch.lib import AsyncCryptoWatchClient, CryptoWatchClient
+from pycwatch.lib.endpoints import Endpoint
+from pycwatch.lib.exceptions import RateLimitError
+from pycwatch.lib.models import AllowanceAnonymous, AllowanceAuthenticated
+from pycwatch.lib.ratelimit import DEFAULT_COSTS, AllowanceLimiter
+from tests.conftest import FakeClock, api_vcr, cassette_transport
+
+
+def test_no_pacing_without_budget(clock: FakeClock) -> None:
+    """Verify requests are not delayed before anything is known."""
+    limiter = AllowanceLimiter(clock=clock)
+
+    assert limiter.reserve(Endpoint.market_price) == 0
+
+
+def test_budget_pacing(clock: FakeClock) -> None:
+    """Verify requests are spread out evenly once the burst has been used."""
+    # 1 credit per 100s, i.e. one market price every 0.5s and a burst of 2
+    limiter = AllowanceLimiter(budget=1, window=100, burst=1, clock=clock)
+
+    delays = [limiter.reserve(Endpoint.market_price) for _ in range(4)]
+
+    assert delays == pytest.approx([0, 0, 0.5, 1.0])
+
+    clock.now = 10
+    assert limiter.reserve(Endpoint.market_price) == 0
+
+
+def test_cost_model(clock: FakeClock) -> None:
+    """Verify the cost of an endpoint is learned from the returned allowance."""
+    limiter = AllowanceLimiter(smoothing=0.5, clock=clock)
+    assert limiter.estimate_cost(Endpoint.market_price) == (
+        DEFAULT_COSTS[Endpoint.market_price]
+    )
+
+    limiter.update(Endpoint.market_price, AllowanceAnonymous(0.01, 9, ""))
+    assert limiter.estimate_cost(Endpoint.market_price) == 0.01
+
+    limiter.update(Endpoint.market_price, AllowanceAnonymous(0.02, 9, ""))
+    assert limiter.estimate_cost(Endpoint.market_price) == pytest.approx(0.015)
+
+
+def test_remaining_allowance(clock: FakeClock) -> None:
+    """Verify the remaining allowance slows down spending until the window ends."""
+    limiter = AllowanceLimiter(window=100, burst=1, clock=clock)
+    allowance = AllowanceAuthenticated(
+        cost=0.5,
+        remaining=0.5,
+        remaining_paid=0.5,
+        account="",
+    )
+    limiter.update(Endpoint.market_price, allowance)
+
+    assert limiter.remaining == 1
+    # 1 credit left for 100s, each call costs 0.5
+    assert limiter.reserve(Endpoint.market_price) == 0
+    assert limiter.reserve(Endpoint.market_price) == pytest.approx(50)
+
+
+def test_exhausted_allowance(clock: FakeClock) -> None:
+    """Verify nothing is sent until the window resets when the allowance is gone."""
+    limiter = AllowanceLimiter(window=100, clock=clock)
+    clock.now = 40
+    limiter.update(Endpoint.market_price, AllowanceAnonymous(0.005, 0, ""))
+
+    assert limiter.reserve(Endpoint.market_price) == pytest.approx(60)
+
+    clock.now = 100
+    assert limiter.reserve(Endpoint.market_price) == 0
+
+
+def test_max_wait(clock: FakeClock) -> None:
+    """Verify requests that would wait too long are turned away, not reserved."""
+    limiter = AllowanceLimiter(budget=1, window=100, burst=1, max_wait=1, clock=clock)
+    delays = [limiter.reserve(Endpoint.market_price) for _ in range(4)]
+    assert delays[-1] == pytest.approx(1.0)
+
+    for _ in range(10):
+        with pytest.raises(RateLimitError) as exc_info:
+            limiter.reserve(Endpoint.market_price)
+        assert exc_info.value.retry_after == pytest.approx(1.5)
+
+    clock.now = 0.5
+    assert limiter.reserve(Endpoint.market_price) == pytest.approx(1.0)
+    with pytest.raises(RateLimitError):
+        limiter.acquire(Endpoint.market_price)
+
+
+def test_max_wait_exhausted(clock: FakeClock) -> None:
+    """Verify a used up allowance raises instead of waiting for the reset."""
+    limiter = AllowanceLimiter(window=100, clock=clock)
+    limiter.update(Endpoint.market_price, AllowanceAnonymous(0.005, 0, ""))
+
+    with pytest.raises(RateLimitError) as exc_info:
+        limiter.reserve(Endpoint.market_price, max_wait=10)
+
+    assert exc_info.value.retry_after == pytest.approx(100)
+
+
+def test_cancel(clock: FakeClock) -> None:
+    """Verify a cancelled reservation gives its credits back."""
+    limiter = AllowanceLimiter(budget=1, window=100, burst=1, clock=clock)
+    limiter.reserve(Endpoint.market_price)
+    limiter.reserve(Endpoint.market_price)
+
+    assert limiter.reserve(Endpoint.market_price) == pytest.approx(0.5)
+    limiter.cancel(Endpoint.market_price)
+    assert limiter.reserve(Endpoint.market_price) == pytest.approx(0.5)
+
+
+def test_cancelled_acquire(clock: FakeClock) -> None:
+    """Verify the reservation of a cancelled wait is given back."""
+    limiter = AllowanceLimiter(budget=1, window=1, burst=0.001, clock=clock)
+    limiter.reserve(Endpoint.market_price)
+
+    async def acquire() -> None:
+        task = asyncio.ensure_future(limiter.acquire_async(Endpoint.market_price))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(acquire())
+
+    assert limiter.reserve(Endpoint.market_price) == pytest.approx(0.005)
+
+
+def test_align_window(clock: FakeClock) -> None:
+    """Verify the window can be lined up with the reset of the allowance."""
+    limiter = AllowanceLimiter(window=100, clock=clock)
+    limiter.align_window(30)
+    limiter.update(Endpoint.market_price, AllowanceAnonymous(0.005, 0, ""))
+
+    assert limiter.reserve(Endpoint.market_price) == pytest.approx(30)
+
+    clock.now = 30
+    assert limiter.reserve(Endpoint.market_price) == 0
+
+
+def test_client_updates_limiter() -> None:
+    """Verify the sync client reports the allowance of each response."""
+    limiter = AllowanceLimiter()
+    client = CryptoWatchClient(rate_limiter=limiter)
+
+    with api_vcr.use_cassette("get_market_order_book.yml"):
+        client.get_market_order_book("kraken", "btceur")
+
+    assert client.rate_limiter is limiter
+    assert limiter.remaining == pytest.approx(9.79)
+    assert limiter.estimate_cost(Endpoint.market_orderbook) == 0.01
+
+
+def test_async_client_updates_limiter() -> None:
+    """Verify the async client reports the allowance of each response."""
+    limiter = AllowanceLimiter()
+
+    async def fetch() -> List[float]:
+        async with AsyncCryptoWatchClient(
+            transport=cassette_transport("get_market_price.yml"),
+            rate_limiter=limiter,
+        ) as client:
+            remaining = []
+            for market in [("kraken", "btceur"), ("binance", "ethbtc")]:
+                await client.get_market_price(*market)
+                assert limiter.remaining is not None
+                remaining.append(limiter.remaining)
+            return remaining
+
+    assert asyncio.run(fetch()) == pytest.approx([9.895, 9.89])
@@ -0,0 +1,85 @@
+"""Tests for the replay server shared by the tests and the benchmarks."""
+
+import json
+import threading
+from typing import Iterator
+
+import pytest
+from benchmarks.replay import Fault, ReplayConfig, ReplayServer, load_responses
+
+from pycwatch.lib import CryptoWatchClient
+from pycwatch.lib.exceptions import RateLimitError
+
+PRICE = "/markets/kraken/btceur/price"
+
+
+@pytest.fixture()
+def server() -> Iterator[ReplayServer]:
+    """Provide a replay server for the price cassette that is not serving."""
+    server = ReplayServer(responses={})
+    server.load_cassette("get_market_price.yml")
+    yield server
+    server.server_close()
+
+
+def test_load_responses() -> None:
+    """Verify responses are keyed by their path and query, and by their path."""
+    responses = load_responses()
+    calculator = "/markets/kraken/btceur/orderbook/calculator"
+    assert responses[f"{calculator}?amount=10"][0] == 200
+    # the path alone serves the first response recorded at it
+    assert responses[calculator] == responses[f"{calculator}?amount=10"]
+
+
+def test_respond(server: ReplayServer) -> None:
+    """Verify requests are answered by their path when their query is unknown."""
+    status, _, body = server.respond(f"{PRICE}?unknown=1")
+    assert status == 200
+    assert json.loads(body)["result"]["price"] > 0
+    assert server.respond("/unknown")[0] == 404
+    assert server.requests == [f"{PRICE}?unknown=1", "/unknown"]
+
+
+def test_allowance(server: ReplayServer) -> None:
+    """Verify the allowance is tracked and requests are rejected once it is spent."""
+    server.remaining = 0.008
+    _, _, body = server.respond(PRICE)
+    allowance = json.loads(body)["allowance"]
+    assert allowance["remaining"] == pytest.approx(0.008 - allowance["cost"])
+    assert server.remaining == pytest.approx(allowance["remaining"])
+    # errors cost nothing, and requests the allowance cannot pay for are rejected
+    server.faults.append(Fault(503))
+    assert server.respond(PRICE)[0] == 503
+    assert server.remaining == pytest.approx(allowance["remaining"])
+    assert server.respond(PRICE)[:2] == (429, {})
+
+
+def test_fault(server: ReplayServer) -> None:
+    """Verify queued faults answer the next request instead of the response."""
+    server.faults.append(Fault(429, {"Retry-After": "3"}))
+    assert server.respond(PRICE) == (429, {"Retry-After": "3"}, b"{}")
+    assert server.respond(PRICE)[0] == 200
+
+
+def test_error_rate() -> None:
+    """Verify the error rate fails requests with a 503."""
+    server = ReplayServer(ReplayConfig(error_rate=1.0), responses={})
+    try:
+        assert server.respond(PRICE)[0] == 503
+    finally:
+        server.server_close()
+
+
+def test_client(server: ReplayServer) -> None:
+    """Verify the client reads the tracked allowance and raises once it is spent."""
+    server.remaining = 0.008
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    try:
+        client = CryptoWatchClient(base_url=server.url, coalesce_requests=False)
+        response = client.get_market_price("kraken", "btceur")
+        assert response.allowance.remaining == pytest.approx(server.remaining)
+        with pytest.raises(RateLimitError):
+            client.get_market_price("kraken", "btceur")
+        client.close()
+    finally:
+        server.shutdown()
@@ -0,0 +1,214 @@
+"""Tests for retries and hedged requests."""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from typing import List
+
+import httpx
+import pytest
+from apiclient.exceptions import ClientError, ServerError, UnexpectedError
+from benchmarks.replay import Fault
+
+from pycwatch.lib import AsyncCryptoWatchClient, CryptoWatchClient
+from pycwatch.lib.endpoints import Endpoint
+from pycwatch.lib.exceptions import RateLimitError
+from pycwatch.lib.resilience import (
+    HedgePolicy,
+    LatencyTracker,
+    RetryPolicy,
+    hedged_call,
+    hedged_call_async,
+    parse_retry_after,
+    retry_call,
+)
+from tests.conftest import LocalServer, cassette_transport
+
+PRICE_PATH = "/markets/kraken/btceur/price"
+
+
+def test_retry_delay() -> None:
+    """Verify the backoff grows, is jittered and stops after the attempts."""
+    policy = RetryPolicy(attempts=4, backoff=0.5, max_backoff=1.5)
+    server_error = ServerError("", status_code=503)
+
+    assert policy.delay(1, server_error, rng=lambda: 1.0) == 0.5
+    assert policy.delay(2, server_error, rng=lambda: 1.0) == 1.0
+    assert policy.delay(3, server_error, rng=lambda: 1.0) == 1.5
+    assert policy.delay(3, server_error, rng=lambda: 0.5) == 0.75
+    assert policy.delay(4, server_error) is None
+    assert policy.delay(1, UnexpectedError("")) is not None
+    assert policy.delay(1, ClientError("", status_code=404)) is None
+    assert policy.delay(1, server_error, method="POST") is None
+
+
+def test_retry_delay_rate_limited() -> None:
+    """Verify rate limited requests wait for Retry-After, if there is one."""
+    policy = RetryPolicy(max_backoff=5)
+
+    assert policy.delay(1, RateLimitError(status_code=429, retry_after=2)) == 2
+    assert policy.delay(1, RateLimitError(status_code=429, retry_after=60)) is None
+    assert policy.delay(1, RateLimitError(status_code=429)) is None
+
+
+def test_parse_retry_after() -> None:
+    """Verify both forms of Retry-After are understood."""
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("-1") == 0.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after("Sun, 32 Foo 2020") is None
+    assert parse_retry_after("Fri, 01 Jan 2100 00:00:00 GMT") > 0
+
+
+def test_retry_call() -> None:
+    """Verify a call is retried until it succeeds."""
+    errors = [ServerError("", status_code=502), UnexpectedError("")]
+    sleeps: List[float] = []
+
+    def call() -> str:
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    assert retry_call(call, RetryPolicy(), sleep=sleeps.append) == "ok"
+    assert len(sleeps) == 2
+
+
+def test_latency_tracker() -> None:
+    """Verify quantiles are taken over the recent latencies only."""
+    tracker = LatencyTracker(window=10)
+    for latency in range(20):
+        tracker.observe("price", latency / 10)
+
+    assert tracker.count("price") == 10
+    assert tracker.quantile("price", 0.5) == 1.4
+    assert tracker.quantile("price", 0.95) == 1.9
+    assert tracker.quantile("other", 0.95) is None
+    assert HedgePolicy(min_samples=10).delay(tracker, "price") == 1.9
+    assert HedgePolicy(min_samples=11).delay(tracker, "price") is None
+
+
+def test_hedged_call() -> None:
+    """Verify a duplicate is sent when the first call is slow."""
+    delays = [0.5, 0.0]
+
+    def call() -> float:
+        delay = delays.pop(0)
+        time.sleep(delay)
+        return delay
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        assert hedged_call(call, 0.01, executor) == 0.0
+
+
+def test_hedged_call_async_cancelled() -> None:
+    """Verify both calls are cancelled when the caller is cancelled."""
+    calls: List["asyncio.Future[None]"] = []
+
+    async def call() -> None:
+        calls.append(asyncio.get_running_loop().create_future())
+        await calls[-1]
+
+    async def run() -> None:
+        caller = asyncio.ensure_future(hedged_call_async(call, 0.01))
+        await asyncio.sleep(0.05)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await asyncio.sleep(0)
+        assert len(calls) == 2
+        assert all(call.cancelled() for call in calls)
+
+    asyncio.run(run())
+
+
+def test_client_retry(local_server: LocalServer) -> None:
+    """Verify server errors are retried and client errors are not."""
+    local_server.load_cassette("get_market_price.yml")
+    client = CryptoWatchClient(
+        base_url=local_server.url,
+        retry=RetryPolicy(backoff=0.01),
+    )
+    local_server.faults.extend([Fault(503), Fault(500)])
+
+    price = client.get_market_price("kraken", "btceur").result.price
+
+    assert price == Decimal("24063.4")
+    assert local_server.requests == [PRICE_PATH] * 3
+
+    local_server.faults.extend([Fault(503)] * 3)
+    with pytest.raises(ServerError):
+        client.get_market_price("kraken", "btceur")
+    with pytest.raises(ClientError):
+        client.get_market_price("kraken", "unknown")
+    assert len(local_server.requests) == 7
+
+
+def test_client_rate_limited(local_server: LocalServer) -> None:
+    """Verify 429 responses are retried only when they say when."""
+    local_server.load_cassette("get_market_price.yml")
+    client = CryptoWatchClient(
+        base_url=local_server.url,
+        retry=RetryPolicy(),
+    )
+    local_server.faults.append(Fault(429, {"Retry-After": "0"}))
+
+    assert client.get_market_price("kraken", "btceur").result.price
+    assert len(local_server.requests) == 2
+
+    local_server.faults.append(Fault(429))
+    with pytest.raises(RateLimitError) as exc_info:
+        client.get_market_price("kraken", "btceur")
+    assert exc_info.value.retry_after is None
+    assert len(local_server.requests) == 3
+
+
+def test_client_hedge(local_server: LocalServer) -> None:
+    """Verify a slow request is answered by its duplicate."""
+    local_server.load_cassette("get_market_price.yml")
+    client = CryptoWatchClient(
+        base_url=local_server.url,
+        hedge=HedgePolicy(min_samples=1, min_delay=0.05),
+        coalesce_requests=False,
+    )
+    client.get_market_price("kraken", "btceur")
+    local_server.faults.append(Fault(delay=1.0))
+
+    started = time.perf_counter()
+    price = client.get_market_price("kraken", "btceur").result.price
+
+    assert price == Decimal("24063.4")
+    assert time.perf_counter() - started < 0.5
+    assert local_server.requests == [PRICE_PATH] * 3
+    assert client.latencies.count(Endpoint.market_price) == 2
+
+
+def test_async_client_retry_and_hedge() -> None:
+    """Verify the async client retries and hedges too."""
+    transport = cassette_transport("get_market_price.yml")
+    statuses = [503]
+    delays = [0.0, 1.0]
+    requests: List[str] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.path)
+        if statuses:
+            return httpx.Response(statuses.pop(0), json={})
+        await asyncio.sleep(delays.pop(0) if delays else 0.0)
+        return transport.handle_request(request)
+
+    async def run() -> float:
+        async with AsyncCryptoWatchClient(
+            transport=httpx.MockTransport(handler),
+            retry=RetryPolicy(backoff=0.01),
+            hedge=HedgePolicy(min_samples=1, min_delay=0.05),
+            coalesce_requests=False,
+        ) as client:
+            await client.get_market_price("kraken", "btceur")
+            started = time.perf_counter()
+            await client.get_market_price("kraken", "btceur")
+            return time.perf_counter() - started
+
+    assert asyncio.run(run()) < 0.5
+    assert requests == [PRICE_PATH] * 4
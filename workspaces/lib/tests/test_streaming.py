@@ -0,0 +1,151 @@
+"""Tests for streaming large responses."""
+
+import asyncio
+import json
+import random
+from decimal import Decimal
+from typing import Any, List, Tuple
+
+import httpx
+import pytest
+from apiclient.exceptions import ResponseParseError
+from vcr.persisters.filesystem import FilesystemPersister
+from vcr.serializers import yamlserializer
+
+from pycwatch.lib import AsyncCryptoWatchClient, CryptoWatchClient
+from pycwatch.lib.endpoints import Endpoint
+from pycwatch.lib.models import MarketMember
+from pycwatch.lib.ratelimit import AllowanceLimiter
+from pycwatch.lib.streaming import ResultKey, ResultStreamParser
+from tests.conftest import BASE_DIR, api_vcr, cassette_transport
+
+
+def load_body(cassette_file: str) -> bytes:
+    """Load the body of the first response of a cassette."""
+    _, responses = FilesystemPersister.load_cassette(
+        BASE_DIR.joinpath("vcr_cassettes", cassette_file).as_posix(),
+        yamlserializer,
+    )
+    body = responses[0]["body"]["string"]
+    return body.encode() if isinstance(body, str) else body
+
+
+def parse(body: bytes) -> List[Tuple[ResultKey, Any]]:
+    """Parse a whole body at once."""
+    parser = ResultStreamParser()
+    return parser.feed(body) + parser.close()
+
+
+@pytest.mark.parametrize(
+    "cassette_file",
+    ["get_all_market_prices.yml", "get_market_order_book.yml", "list_exchanges.yml"],
+)
+def test_parse_in_chunks(cassette_file: str) -> None:
+    """Verify chunks of any size are parsed like the whole body."""
+    body = load_body(cassette_file)
+    expected = json.loads(body)
+    rng = random.Random(0)
+    parser = ResultStreamParser()
+    items = []
+    pos = 0
+    while pos < len(body):
+        size = rng.randint(1, 500)
+        items.extend(parser.feed(body[pos : pos + size]))
+        pos += size
+    items.extend(parser.close())
+
+    result = expected.pop("result")
+    if isinstance(result, dict):
+        assert dict(items) == result
+    else:
+        assert items == list(enumerate(result))
+    assert parser.members == expected
+
+
+def test_split_number() -> None:
+    """Verify a number is not yielded before it is complete."""
+    parser = ResultStreamParser()
+
+    assert parser.feed(b'{"result": [12') == []
+    assert parser.feed(b"3.") == []
+    assert parser.feed(b"5e1, nul") == [(0, 1235.0)]
+    assert parser.feed(b"l]}") == [(1, None)]
+    assert parser.close() == []
+    assert parser.done
+
+
+def test_split_multibyte_character() -> None:
+    """Verify characters split between chunks are decoded."""
+    body = '{"result": {"é": "€"}}'.encode()
+    parser = ResultStreamParser()
+
+    items = [item for byte in body for item in parser.feed(bytes([byte]))]
+
+    assert items == [("é", "€")]
+
+
+@pytest.mark.parametrize("body", [b'{"result": {"a": 1', b'{"result": [1}', b"[]"])
+def test_invalid_response(body: bytes) -> None:
+    """Verify an incomplete or malformed response raises an error."""
+    with pytest.raises(ValueError, match="JSON"):
+        parse(body)
+
+
+def test_stream_all_market_summaries() -> None:
+    """Verify streamed summaries match the buffered response."""
+    limiter = AllowanceLimiter()
+    client = CryptoWatchClient(rate_limiter=limiter)
+
+    with api_vcr.use_cassette(
+        "get_all_market_summaries.yml",
+        allow_playback_repeats=True,
+    ):
+        streamed = dict(client.stream_all_market_summaries())
+        assert limiter.remaining is not None
+        assert streamed == client.get_all_market_summaries().result
+
+    assert limiter.estimate_cost(Endpoint.all_market_summaries) == 0.015
+
+
+def test_stream_parse_error() -> None:
+    """Verify a truncated streamed response raises a parse error."""
+    body = load_body("get_all_market_prices.yml")
+
+    async def stream() -> None:
+        async with AsyncCryptoWatchClient(
+            transport=httpx.MockTransport(
+                lambda _: httpx.Response(200, content=body[:-10]),
+            ),
+        ) as client:
+            async for _ in client.stream_all_market_prices():
+                pass
+
+    with pytest.raises(ResponseParseError):
+        asyncio.run(stream())
+
+
+def test_async_stream_markets() -> None:
+    """Verify the async client streams markets in order."""
+    expected = json.loads(load_body("list_markets.yml"))["result"]
+
+    async def stream() -> List[MarketMember]:
+        async with AsyncCryptoWatchClient(
+            transport=cassette_transport("list_markets.yml"),
+        ) as client:
+            return [market async for market in client.stream_markets()]
+
+    markets = asyncio.run(stream())
+
+    assert len(markets) == len(expected)
+    assert markets[0].id_ == expected[0]["id"]
+    assert markets[-1].pair == expected[-1]["pair"]
+
+
+def test_parse_float() -> None:
+    """Verify floats can be parsed to decimals while streaming."""
+    parser = ResultStreamParser(parse_float=Decimal)
+
+    assert parser.feed(b'{"result": {"a": 0.1, "b": 2}}') == [
+        ("a", Decimal("0.1")),
+        ("b", 2),
+    ]